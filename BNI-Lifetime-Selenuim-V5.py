@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 import time
 import os
+import sys
 import getpass
+import argparse
+import threading
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -11,20 +14,39 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
-from webdriver_manager.chrome import ChromeDriverManager
-from datetime import datetime
+from datetime import datetime, timedelta
 import csv
-import json
-import re
 
-# Google Sheets API imports
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GOOGLE_SHEETS_AVAILABLE = True
-except ImportError:
+from bni.archive import ARCHIVE_SPREADSHEET_ENV, archive_history
+from bni.browser import BrowserManager, apply_low_memory_options
+from bni.change_detector import TYFCBChangeDetector, UNCHANGED_MODES
+from bni.checkpoint import RunCheckpoint, resume_requested
+from bni.report_diff import ReportFingerprintStore
+from bni.selector_cache import SelectorRegistry, heuristic
+from bni.sheets_auth import authorize_sheets_client, sheets_available
+from bni.tracing import start_run, get_tracer, traced, instrument_driver, instrument_sheets_client
+from bni.sheets_scheduler import append_cells_request, schedule_sheets_client, update_cells_request
+from bni.sheets_spool import SheetsSpool
+from bni.birt import LXML_AVAILABLE, parse_birt_report, rows_to_records, total_row_amount
+from bni.diagnostics import get_diagnostics
+from bni.dashboard import read_dashboard_snapshot, sheet_values, SHEET_COLUMNS
+from bni.latest_index import (LATEST_HEADERS, LATEST_TAB, latest_index_requests, latest_index_stale,
+                               mark_latest_stale, open_tab, rebuild_latest_tab)
+from bni.handoff import claim_handoff_row, touch_handoff, write_handoff
+from bni.parsing import SHEETS_EPOCH, amount_text, parse_amount, sheet_number, sheets_serial
+from bni.report_crawler import ReportCrawler, ReportRowSink, configured_reports
+from bni.report_window import (resolve_report_window, record_successful_run, format_window_date,
+                               match_date_range_fields, sum_amounts)
+from bni.warmup import warm_up
+from bni.work_queue import LeaseQueue, account_key, load_roster, parse_shard, shard_accounts
+
+# Google Sheets API (gspread / google-auth ถูก import ตอนเชื่อมต่อจริง - ดู bni/sheets_auth.py)
+GOOGLE_SHEETS_AVAILABLE = sheets_available()
+if not GOOGLE_SHEETS_AVAILABLE:
     print("Google Sheets API ไม่พร้อมใช้งาน กรุณาติดตั้ง: pip install gspread google-auth")
-    GOOGLE_SHEETS_AVAILABLE = False
+
+# URL ของ BNI Connect (เปลี่ยนได้ด้วย BNI_BASE_URL เช่น ชี้ไปที่ fixture server ของ benchmark)
+BNI_BASE_URL = os.getenv('BNI_BASE_URL', 'https://www.bniconnectglobal.com').rstrip('/')
 
 def setup_google_sheets():
     """
@@ -35,29 +57,13 @@ def setup_google_sheets():
         return None
 
     try:
-        # ลองใช้ environment variable ก่อน (สำหรับ GitHub Actions)
-        credentials_json = os.getenv('GOOGLE_SHEETS_CREDENTIALS')
-        if credentials_json:
-            credentials_info = json.loads(credentials_json)
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-        else:
-            # ถ้าไม่มี env variable ให้ใช้ไฟล์ local
-            credentials_file = "google-sheets-credentials.json"
-            if not os.path.exists(credentials_file):
-                print(f"ไม่พบไฟล์ {credentials_file} กรุณาวางไฟล์ credentials ไว้ในโฟลเดอร์เดียวกัน")
-                return None
-
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
-            credentials = Credentials.from_service_account_file(credentials_file, scopes=scope)
+        # ลองใช้ environment variable ก่อน (สำหรับ GitHub Actions) ถ้าไม่มีให้ใช้ไฟล์ local
+        client, _ = authorize_sheets_client()
+        if not client:
+            return None
 
-        client = gspread.authorize(credentials)
+        instrument_sheets_client(client)
+        schedule_sheets_client(client)
         print("เชื่อมต่อ Google Sheets สำเร็จ")
         return client
 
@@ -65,137 +71,401 @@ def setup_google_sheets():
         print(f"ไม่สามารถเชื่อมต่อ Google Sheets: {str(e)}")
         return None
 
-def save_to_google_sheet(tyfcb_received, tyfcb_given_data=None):
+_target_spreadsheet = None
+_target_lock = threading.Lock()
+
+def open_target_spreadsheet():
+    """
+    เชื่อมต่อ Google Sheets และเปิด spreadsheet ที่ใช้บันทึกข้อมูล (เปิดครั้งเดียวต่อ process)
+    """
+    global _target_spreadsheet
+    import gspread
+    # warm-up และ thread ของ spool อาจเรียกพร้อมกัน - เชื่อมต่อครั้งเดียว
+    with _target_lock:
+        if _target_spreadsheet is None:
+            client = setup_google_sheets()
+            if not client:
+                raise RuntimeError("เชื่อมต่อ Google Sheets ไม่ได้")
+
+            # ชื่อ Google Sheet (สามารถเปลี่ยนได้)
+            sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'BNI TYFCB Data')
+            try:
+                _target_spreadsheet = client.open(sheet_name)
+            except gspread.SpreadsheetNotFound:
+                raise RuntimeError(f"ไม่พบ Google Sheet ชื่อ '{sheet_name}' กรุณาสร้างก่อน")
+        return _target_spreadsheet
+
+def warm_up_google_sheets():
+    """
+    ยืนยันตัวตนและเปิด spreadsheet ตั้งแต่เริ่มโปรแกรม - credential ผิดหรือไม่พบ Sheet จะ raise ทันที
+    ส่วนปัญหาเครือข่ายชั่วคราวไม่หยุดการ scrape (ข้อมูลรอใน spool แล้วส่งภายหลัง)
+    """
+    import gspread
+    try:
+        return open_target_spreadsheet()
+    except gspread.exceptions.APIError as e:
+        if e.response.status_code < 500:
+            raise
+        print(f"⚠️  Google Sheets ไม่พร้อมชั่วคราว ({e}) - ทำงานต่อและส่งข้อมูลภายหลัง")
+    except OSError as e:
+        print(f"⚠️  เชื่อมต่อ Google Sheets ไม่ได้ชั่วคราว ({e}) - ทำงานต่อและส่งข้อมูลภายหลัง")
+    return None
+
+@traced("save_to_google_sheet")
+def save_to_google_sheet(tyfcb_received, tyfcb_given_data=None, dashboard_metrics=None, username=None):
     """
     บันทึกข้อมูล TYFCB ลง Google Sheets
 
+    ถ้าค่าเหมือนกับ snapshot ที่บันทึกครั้งล่าสุดของ Running User เดียวกัน
+    จะไม่เพิ่มแถวใหม่ (ตั้ง FORCE_WRITE=true เพื่อบังคับเขียน)
+
+    ข้อมูลถูกบันทึกลง spool ในเครื่องก่อนแล้วคืนค่าทันที การเขียนลง Sheet จริง
+    ทำใน thread เบื้องหลังผ่าน write_spooled_rows (ถ้า Sheets ล่มจะค้างไว้ส่งรอบหน้า)
+
     Parameters:
     -----------
     tyfcb_received : str
         ยอดเงิน TYFCB Received
     tyfcb_given_data : dict
         ข้อมูล TYFCB Given (optional)
+    dashboard_metrics : dict
+        ตัวเลขอื่นบน dashboard จาก read_dashboard_snapshot (optional) - เขียนเป็นคอลัมน์ต่อท้าย
+    username : str
+        บัญชีที่ใช้ล็อกอิน (optional) - บันทึกเป็นเจ้าของแถวใน handoff.json
     """
     try:
-        client = setup_google_sheets()
-        if not client:
-            return False
-
-        # ชื่อ Google Sheet (สามารถเปลี่ยนได้)
-        sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'BNI TYFCB Data')
-
-        try:
-            spreadsheet = client.open(sheet_name)
-        except gspread.SpreadsheetNotFound:
-            print(f"ไม่พบ Google Sheet ชื่อ '{sheet_name}' กรุณาสร้างก่อน")
-            return False
-
-        # ใช้ worksheet แรก หรือสร้างใหม่
-        try:
-            worksheet = spreadsheet.sheet1
-        except:
-            worksheet = spreadsheet.add_worksheet(title="TYFCB Data", rows="1000", cols="10")
-
-        # ตรวจสอบว่ามี header หรือไม่
-        try:
-            headers = worksheet.row_values(1)
-            if not headers:
-                # สร้าง header
-                header_row = [
-                    'Timestamp',
-                    'TYFCB Received',
-                    'Running User',
-                    'Chapter',
-                    'Total Given Amount',
-                    'Records Count'
-                ]
-                worksheet.insert_row(header_row, 1)
-        except:
-            pass
-
         # เตรียมข้อมูลที่จะบันทึก - ใช้ serial number สำหรับ Google Sheets
-        from datetime import datetime
-        import time
-
         # ใช้ Unix timestamp แล้วแปลงเป็น Google Sheets serial number
         # Google Sheets ใช้ serial date จาก 1899-12-30 เป็น day 1
         now = datetime.now()
 
-        # คำนวณ serial number สำหรับ Google Sheets
-        # Google Sheets epoch: December 30, 1899
-        sheets_epoch = datetime(1899, 12, 30)
-        days_since_epoch = (now - sheets_epoch).total_seconds() / (24 * 60 * 60)
-
         # ใช้ serial number แทน string
-        timestamp = days_since_epoch
+        timestamp = sheets_serial(now)
 
-        # ดึงค่าตัวเลขจาก TYFCB Received และแปลงเป็นตัวเลข
-        tyfcb_amount_clean = re.sub(r'[^\d,.]', '', tyfcb_received) if tyfcb_received else '0'
-        try:
-            # แปลงเป็นตัวเลข เพื่อป้องกัน apostrophe prefix
-            tyfcb_amount = float(tyfcb_amount_clean.replace(',', ''))
+        # ดึงค่าตัวเลขจาก TYFCB Received และแปลงเป็นตัวเลข (เพื่อป้องกัน apostrophe prefix)
+        received_text = amount_text(tyfcb_received) if tyfcb_received else '0'
+        received_value = parse_amount(received_text)
+        if received_value is not None:
+            tyfcb_amount = sheet_number(received_value)
             print(f"💰 แปลง TYFCB Received: '{tyfcb_received}' → {tyfcb_amount}")
-        except ValueError:
+        else:
             print(f"⚠️  ไม่สามารถแปลง TYFCB Received เป็นตัวเลข: '{tyfcb_received}' - ใช้เป็น string")
-            tyfcb_amount = str(tyfcb_amount_clean)
+            tyfcb_amount = received_text
 
         # แปลง Total Given Amount เป็นตัวเลขเช่นกัน
         total_amount = ''
         if tyfcb_given_data and tyfcb_given_data.get('total_amount'):
-            total_amount_clean = re.sub(r'[^\d,.]', '', str(tyfcb_given_data['total_amount']))
-            try:
-                total_amount = float(total_amount_clean.replace(',', '')) if total_amount_clean else 0
+            given_text = amount_text(tyfcb_given_data['total_amount'])
+            given_value = parse_amount(given_text or '0')
+            if given_value is not None:
+                total_amount = sheet_number(given_value)
                 print(f"💰 แปลง Total Given Amount: '{tyfcb_given_data['total_amount']}' → {total_amount}")
-            except ValueError:
+            else:
                 print(f"⚠️  ไม่สามารถแปลง Total Given Amount เป็นตัวเลข - ใช้เป็น string")
-                total_amount = str(total_amount_clean)
+                total_amount = given_text
+
+        running_user = tyfcb_given_data.get('running_user', '') if tyfcb_given_data else ''
+        chapter = tyfcb_given_data.get('chapter', '') if tyfcb_given_data else ''
+        records_count = len(tyfcb_given_data.get('report_data', [])) if tyfcb_given_data else 0
 
         row_data = [
             timestamp,                  # Google Sheets serial number
             tyfcb_amount,              # number
-            tyfcb_given_data.get('running_user', '') if tyfcb_given_data else '',  # string
-            tyfcb_given_data.get('chapter', '') if tyfcb_given_data else '',       # string
+            running_user,              # string
+            chapter,                   # string
             total_amount,              # number
-            len(tyfcb_given_data.get('report_data', [])) if tyfcb_given_data else 0  # number
+            records_count              # number
         ]
+        if dashboard_metrics:
+            # Referrals Given/Received, Visitors, One to Ones, CEU
+            row_data += sheet_values(dashboard_metrics)
 
-        # เพิ่มข้อมูลใหม่
-        worksheet.append_row(row_data)
+        # ตรวจสอบว่าข้อมูลเปลี่ยนจากครั้งล่าสุดหรือไม่ (ไม่รวม Timestamp)
+        detector = TYFCBChangeDetector()
+        snapshot_values = {
+            'tyfcb_received': tyfcb_amount,
+            'chapter': chapter,
+            'total_given_amount': total_amount,
+            'records_count': records_count
+        }
+        if dashboard_metrics:
+            snapshot_values['dashboard'] = {key: dashboard_metrics.get(key) for _, key in SHEET_COLUMNS}
+        force_write = os.getenv('FORCE_WRITE', 'false').lower() == 'true'
+        unchanged_mode = os.getenv('TYFCB_UNCHANGED_MODE', 'skip').lower()
+        if unchanged_mode not in UNCHANGED_MODES:
+            unchanged_mode = 'skip'
 
-        # หา row ที่เพิ่มไป
-        last_row_num = len(worksheet.get_all_values())
+        if not force_write and not detector.has_changed(running_user, snapshot_values):
+            snapshot = detector.get_snapshot(running_user)
+            print(f"⏭️  ข้อมูล TYFCB ของ {running_user or 'ผู้ใช้'} ไม่เปลี่ยนแปลงจากครั้งล่าสุด "
+                  f"({snapshot.get('last_written')}) - ไม่เพิ่มแถวใหม่")
 
-        # Format timestamp cell ให้เป็น datetime format
-        try:
-            cell_range = f'A{last_row_num}'
-            worksheet.format(cell_range, {
-                'numberFormat': {
-                    'type': 'DATE_TIME',
-                    'pattern': 'mm/dd/yyyy hh:mm:ss'
-                }
-            })
-            print(f"✅ Format timestamp cell {cell_range} เป็น datetime สำเร็จ")
-        except Exception as format_error:
-            print(f"⚠️  ไม่สามารถ format timestamp cell: {format_error}")
+            if unchanged_mode == 'touch' and (snapshot.get('row_number') or running_user):
+                # อัปเดตเฉพาะ Timestamp ของแถวเดิม แทนการเพิ่มแถวซ้ำ (ไม่มีเลขแถว = แถวล่าสุดของผู้ใช้)
+                queue_sheet_write('touch', {'row_number': snapshot.get('row_number'), 'timestamp': timestamp,
+                                            'running_user': running_user})
+                print(f"🔄 อัปเดต Timestamp ของแถว {snapshot.get('row_number') or 'ล่าสุด'} แทนการเพิ่มแถวใหม่")
 
-        # ตรวจสอบว่า cell เป็น datetime หรือไม่
-        try:
-            # อ่านค่ากลับมาเพื่อยืนยันว่าเป็น datetime
-            cell_value = worksheet.acell(f'A{last_row_num}').value
-            print(f"🔍 ค่าที่บันทึกใน cell A{last_row_num}: '{cell_value}' (type: {type(cell_value).__name__})")
-        except Exception as check_error:
-            print(f"⚠️  ไม่สามารถตรวจสอบค่า cell: {check_error}")
+            detector.record_heartbeat(running_user)
+            # แถวเดิมใน Sheet ยังเป็นค่าปัจจุบัน - ระบุบัญชีของแถวใน handoff ให้ฝั่งอ่านตรวจว่าครบ roster
+            claim_handoff_row(running_user, username, handoff_roster(username))
+            return True
+
+        # จำ snapshot ไว้เปรียบเทียบในรอบถัดไป - บันทึกก่อนส่งเข้า spool เพื่อไม่ให้ทับเลขแถว
+        # ที่ thread เบื้องหลังบันทึกหลังส่งสำเร็จ
+        detector.record_write(running_user, snapshot_values)
+        # บันทึกลง spool ในเครื่องก่อน แล้วให้ thread เบื้องหลังส่งไป Google Sheets
+        queue_sheet_write('append', {
+            'row': row_data,
+            'running_user': running_user,
+            'account': username,
+            'snapshot': snapshot_values
+        })
 
-        print(f"✅ บันทึกข้อมูลลง Google Sheets สำเร็จ")
+        print(f"💾 บันทึกข้อมูลลง spool แล้ว - กำลังส่งไป Google Sheets เบื้องหลัง")
         print(f"   Timestamp: {timestamp:.6f} (Google Sheets serial number)")
         print(f"   TYFCB Received: {tyfcb_amount}")
 
         return True
 
     except Exception as e:
-        print(f"❌ ไม่สามารถบันทึกลง Google Sheets: {str(e)}")
+        print(f"❌ ไม่สามารถบันทึกข้อมูล TYFCB: {str(e)}")
         return False
 
+def handoff_roster(username=None):
+    """รายชื่อบัญชีทั้งหมดของการรันนี้ (roster หรือบัญชีเดียวที่ล็อกอิน) สำหรับ handoff.json"""
+    roster = [account["username"] for account in load_roster()]
+    return roster or ([username] if username else None)
+
+@traced("sheets_flush")
+def write_spooled_rows(entries):
+    """
+    ส่งรายการจาก spool ไปยัง Google Sheets เป็นชุดเดียว คืนค่า list ของ id ที่เขียนสำเร็จ
+
+    รายการ append ที่เคยส่งแล้วแต่ยังไม่ถูก ack (replayed - ค้างจากการรันก่อน หรือ flush ก่อนหน้าล้ม
+    หลัง append สำเร็จ) จะถูกตรวจกับ Timestamp + Running User ที่มีอยู่ใน Sheet ก่อน
+    เพื่อไม่ให้เพิ่มแถวซ้ำ แถวที่พบแล้วจะทำขั้นตอนที่เหลือ (snapshot, index) ด้วยเลขแถวเดิม
+    """
+    spreadsheet = open_target_spreadsheet()
+
+    # ใช้ worksheet แรก หรือสร้างใหม่
+    try:
+        worksheet = spreadsheet.sheet1
+    except:
+        worksheet = spreadsheet.add_worksheet(title="TYFCB Data", rows="1000", cols="10")
+
+    acked = []
+    indexed = []
+    written = []  # [(entry, เลขแถว)] ของแถวที่อยู่ใน Sheet แล้ว
+    appends = [entry for entry in entries if entry['kind'] == 'append']
+    touches = [entry for entry in entries if entry['kind'] == 'touch']
+
+    if appends:
+        # ตรวจสอบว่ามี header หรือไม่
+        try:
+            headers = worksheet.row_values(1)
+            header_row = [
+                'Timestamp',
+                'TYFCB Received',
+                'Running User',
+                'Chapter',
+                'Total Given Amount',
+                'Records Count'
+            ]
+            if any(len(entry['payload']['row']) > len(header_row) for entry in appends):
+                header_row += [column for column, _ in SHEET_COLUMNS]
+            if not headers:
+                # สร้าง header
+                worksheet.insert_row(header_row, 1)
+            elif len(headers) < len(header_row) and headers == header_row[:len(headers)]:
+                # Sheet เดิมยังไม่มีคอลัมน์ของ metric อื่นบน dashboard - เพิ่มต่อท้าย
+                worksheet.update(range_name='A1', values=[header_row])
+        except:
+            pass
+
+        # รายการที่เคยส่งแล้วอาจเขียนไปแล้วแต่ยังไม่ได้ ack
+        if any(entry['replayed'] for entry in appends):
+            existing = {}
+            values = worksheet.get_values('A:C', value_render_option='UNFORMATTED_VALUE')
+            for row_number, row in enumerate(values, start=1):
+                try:
+                    existing[(round(float(row[0]), 6), str(row[2]).strip().lower())] = row_number
+                except (ValueError, IndexError):
+                    continue
+            fresh = []
+            for entry in appends:
+                row = entry['payload']['row']
+                row_number = existing.get((round(float(row[0]), 6), str(row[2]).strip().lower()))
+                if entry['replayed'] and row_number:
+                    print(f"⏭️  แถวของ {row[2]} ({entry['created_at']}) อยู่ใน Sheet แล้ว (แถว {row_number}) - ไม่เขียนซ้ำ")
+                    written.append((entry, row_number))
+                else:
+                    fresh.append(entry)
+            appends = fresh
+
+    # แถวใหม่ การแก้ Timestamp (touch) และ index TYFCB Latest ถูกส่งใน spreadsheets.batchUpdate เดียว
+    # (Sheets ทำทั้งชุดหรือไม่ทำเลย - index ไม่ชี้ไปที่แถวที่ไม่ได้เขียน และไม่มี request แยกที่ตามมาทีหลัง)
+    requests = []
+    if appends:
+        # appendCells ต่อท้ายหลังแถวสุดท้ายที่มีข้อมูล (ไม่ทับแถวของ runner อื่น) พร้อม format คอลัมน์ Timestamp
+        # เลขแถวของแถวใหม่ไม่อยู่ในผลลัพธ์ - โหมด touch หาแถวล่าสุดของผู้ใช้จากคอลัมน์ C แทน
+        requests.append(append_cells_request(worksheet.id, [entry['payload']['row'] for entry in appends],
+                                             date_columns=(0,)))
+
+    touched = []
+    touch_handoffs = []
+    relocated = {}
+    if touches:
+        # เลขแถวใน snapshot อาจเก่าหรือไม่มี (เช่น --archive ย้ายแถวเก่าออกทำให้แถวเลื่อน) - ตรวจ Running User
+        # ในคอลัมน์ C ก่อนแก้ Timestamp และใช้แถวล่าสุดของผู้ใช้ถ้าไม่ตรง
+        users = [str(value).strip().lower() for value in worksheet.col_values(3)]
+        for entry in touches:
+            payload = entry['payload']
+            row_number = payload.get('row_number')
+            user_key = str(payload.get('running_user') or '').strip().lower()
+            if user_key and (not row_number or row_number > len(users) or users[row_number - 1] != user_key):
+                matches = [index for index, user in enumerate(users, start=1) if user == user_key]
+                if not matches:
+                    print(f"⚠️  ไม่พบแถวของ {payload['running_user']} ใน Sheet - ไม่อัปเดต Timestamp")
+                    acked.append(entry['id'])
+                    continue
+                if row_number:
+                    print(f"🔎 แถว {row_number} ไม่ใช่ของ {payload['running_user']} แล้ว - ใช้แถว {matches[-1]} แทน")
+                row_number = relocated[user_key] = matches[-1]
+            requests.append(update_cells_request(worksheet.id, row_number, [payload['timestamp']], date_columns=(0,)))
+            if payload.get('running_user'):
+                touched.append((payload['running_user'], row_number, payload['timestamp']))
+                touch_handoffs.append((payload['running_user'], payload['timestamp']))
+            acked.append(entry['id'])
+
+    # index TYFCB Latest - ถ้ายังไม่มีแท็บ ถูกทำเครื่องหมาย stale หรืออ่านไม่ได้ จะสร้างใหม่จาก Sheet หลัก
+    # หลังเขียนสำเร็จ (ต้องอ่าน Sheet หลักที่มีแถวใหม่แล้ว) - ทำเครื่องหมาย stale ก่อน เผื่อหยุดก่อนสร้างเสร็จ
+    indexed += [(row_number, entry['payload']['row']) for entry, row_number in written]
+    indexed += [(None, entry['payload']['row']) for entry in appends]
+    rebuild_index = False
+    if indexed or touched:
+        try:
+            index_tab, created = open_tab(spreadsheet, LATEST_TAB, LATEST_HEADERS)
+            if created:
+                mark_latest_stale(spreadsheet, "สร้างแท็บใหม่")
+                rebuild_index = True
+            elif latest_index_stale():
+                rebuild_index = True
+            else:
+                index_requests, rebuild_index = latest_index_requests(index_tab, indexed, touched)
+                requests += index_requests
+        except Exception as e:
+            print(f"⚠️  ไม่สามารถอ่านแท็บ {LATEST_TAB}: {e} - จะสร้างใหม่หลังเขียน Sheet หลัก")
+            mark_latest_stale(spreadsheet, e)
+            rebuild_index = True
+
+    if requests:
+        spreadsheet.batch_update({"requests": requests})
+        if appends:
+            print(f"✅ บันทึกข้อมูลลง Google Sheets สำเร็จ ({len(appends)} แถว)")
+
+    written += [(entry, None) for entry in appends]
+    if written:
+        # เก็บเลขแถวไว้ใน snapshot สำหรับโหมด touch (None = แถวล่าสุดของผู้ใช้ในคอลัมน์ C)
+        detector = TYFCBChangeDetector()
+        for entry, row_number in written:
+            payload = entry['payload']
+            row = payload['row']
+            detector.record_write(payload['running_user'], payload['snapshot'], row_number=row_number)
+            # ส่งต่อแถวที่อยู่ใน Sheet แล้วให้ monitor / form submitter โดยไม่ต้องอ่าน Sheet ทั้งแผ่น
+            write_handoff(payload['running_user'], row[1], row[3], row[4], row[5],
+                          SHEETS_EPOCH + timedelta(days=row[0]), account=payload.get('account'),
+                          roster=handoff_roster(payload.get('account')))
+            acked.append(entry['id'])
+    for running_user, timestamp in touch_handoffs:
+        touch_handoff(running_user, SHEETS_EPOCH + timedelta(days=timestamp))
+    if relocated:
+        TYFCBChangeDetector().relocate_rows(relocated)
+
+    # แถวถูกเขียนแล้ว - ถ้าสร้าง index ใหม่ไม่สำเร็จจะไม่ส่งแถวซ้ำ แต่ทำเครื่องหมายว่า index ไม่ตรง
+    # (ฝั่งอ่านใช้ Sheet หลักแทน และ flush ถัดไปสร้าง index ใหม่)
+    if rebuild_index:
+        try:
+            rebuild_latest_tab(spreadsheet, worksheet)
+            print(f"📇 สร้างแท็บ {LATEST_TAB} ใหม่จาก Sheet หลัก")
+        except Exception as e:
+            print(f"⚠️  ไม่สามารถสร้างแท็บ {LATEST_TAB}: {e} - จะสร้างใหม่ใน flush ถัดไป")
+            mark_latest_stale(spreadsheet, e)
+
+    return acked
+
+@traced("archive")
+def archive_history_sheet():
+    """
+    ย้ายแถวที่เก่ากว่า TYFCB_ARCHIVE_HORIZON_DAYS ไปแท็บรายปีและเขียนแท็บ TYFCB Latest ใหม่ (--archive)
+    แล้วอัปเดตเลขแถวใน snapshot ที่โหมด touch ใช้ เพราะแถวที่เหลือเลื่อนขึ้น
+    """
+    try:
+        spreadsheet = open_target_spreadsheet()
+        archive_spreadsheet = None
+        archive_key = os.getenv(ARCHIVE_SPREADSHEET_ENV)
+        if archive_key:
+            client = setup_google_sheets()
+            if not client:
+                return False
+            archive_spreadsheet = client.open_by_key(archive_key)
+
+        summary = archive_history(spreadsheet, archive_spreadsheet=archive_spreadsheet)
+        if summary["aborted"]:
+            return False
+        if summary["row_numbers"] is not None:
+            TYFCBChangeDetector().relocate_rows(summary["row_numbers"])
+        return True
+
+    except Exception as e:
+        print(f"❌ ไม่สามารถย้ายแถวเก่าไป archive: {str(e)}")
+        return False
+
+_sheets_spool = None
+# True ระหว่าง persist_results - เก็บรายการทุกบัญชีไว้ใน spool แล้วส่งไป Sheets ครั้งเดียวตอนปิด spool
+_batch_sheet_writes = False
+
+def get_sheets_spool(start=True):
+    """คืนค่า spool ของ Google Sheets (เริ่ม thread เบื้องหลังเมื่อ start=True ยกเว้น SHEETS_WRITE_BEHIND=false)"""
+    global _sheets_spool
+    if _sheets_spool is None:
+        _sheets_spool = SheetsSpool("tyfcb_data", write_spooled_rows)
+    if start and not _sheets_spool.running and os.getenv('SHEETS_WRITE_BEHIND', 'true').lower() != 'false':
+        _sheets_spool.start()
+    return _sheets_spool
+
+def queue_sheet_write(kind, payload):
+    """บันทึกรายการลง spool - ถ้าปิด write-behind จะส่งไป Sheets ทันที (ยกเว้นระหว่าง persist_results)"""
+    spool = get_sheets_spool(start=not _batch_sheet_writes)
+    spool.submit(kind, payload)
+    if not spool.running and not _batch_sheet_writes:
+        spool.drain()
+
+def close_sheets_spool():
+    """รอให้ส่งข้อมูลที่ค้างใน spool ไป Sheets ก่อนจบโปรแกรม (สูงสุด SHEETS_FLUSH_TIMEOUT วินาที)"""
+    if _sheets_spool is None:
+        return True
+    try:
+        timeout = float(os.getenv('SHEETS_FLUSH_TIMEOUT', '120'))
+    except ValueError:
+        timeout = 120.0
+    return _sheets_spool.close(timeout)
+
+_browser_manager = None
+
+def get_browser_manager():
+    """คืนค่าตัวจัดการ Chrome ที่ใช้ร่วมกันทุกบัญชีใน process (recycle ตาม BNI_CHROME_MAX_SESSIONS / BNI_CHROME_MAX_RSS_MB)"""
+    global _browser_manager
+    if _browser_manager is None:
+        _browser_manager = BrowserManager(lambda: instrument_driver(setup_driver()))
+    return _browser_manager
+
+def close_browser_manager():
+    """ปิด Chrome ที่ยังเปิดค้างและแสดง peak RSS ของแต่ละบัญชี"""
+    if _browser_manager is not None:
+        _browser_manager.close()
+
+@traced("setup_driver")
 def setup_driver():
     """
     ตั้งค่า WebDriver สำหรับ Chrome
@@ -227,6 +497,8 @@ def setup_driver():
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    # ลดหน่วยความจำของ Chrome สำหรับการรันยาว (ปิดด้วย BNI_CHROME_LOW_MEMORY=false)
+    apply_low_memory_options(chrome_options)
     
     # เพิ่ม experimental options เพื่อซ่อนการใช้ automation
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -234,6 +506,7 @@ def setup_driver():
     
     # ติดตั้ง WebDriver อัตโนมัติ
     try:
+        from webdriver_manager.chrome import ChromeDriverManager
         service = Service(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         return driver
@@ -255,9 +528,13 @@ def setup_driver():
             print(f"ไม่สามารถตั้งค่า WebDriver ด้วยวิธีสำรองได้: {str(e2)}")
             raise Exception("ไม่สามารถเริ่มต้น Chrome WebDriver ได้ โปรดตรวจสอบการติดตั้ง Chrome และ ChromeDriver")
 
+@traced("report_extract")
 def get_tyfcb_given_report_data(driver):
     """
     ดึงข้อมูลจากรายงาน TYFCB Given Report ที่อยู่ใน iframe ซ้อน
+
+    ปกติจะแยกข้อมูลจาก page_source ของ iframe ซ้อนด้วย lxml ในรอบเดียว
+    ถ้าใช้ lxml ไม่ได้จะถอยไปอ่านจาก DOM ผ่าน WebDriver (extract_report_from_dom)
     """
     report_data = {
         "running_user": "",
@@ -268,9 +545,6 @@ def get_tyfcb_given_report_data(driver):
     }
     
     try:
-        # บันทึกภาพหน้าจอก่อนเข้า iframe
-        # driver.save_screenshot("before_iframe.png") # Disabled file save
-        
         # หา iframe ทั้งหมดในหน้า
         all_iframes = driver.find_elements(By.TAG_NAME, "iframe")
         print(f"พบ iframe ทั้งหมด {len(all_iframes)} อัน")
@@ -280,11 +554,6 @@ def get_tyfcb_given_report_data(driver):
             driver.switch_to.frame(all_iframes[0])
             print("สลับไปยัง iframe แรกสำเร็จ")
             
-            # บันทึกโค้ด HTML ของ iframe หลัก
-            # with open("iframe_main_content.html", "w", encoding="utf-8") as f:
-            #     f.write(driver.page_source)
-            # print("บันทึกโค้ด HTML ของ iframe หลักไว้ที่ iframe_main_content.html สำหรับตรวจสอบ") # Disabled file save
-            
             # ตรวจสอบว่ามี iframe ซ้อนหรือไม่
             inner_iframes = driver.find_elements(By.TAG_NAME, "iframe")
             print(f"พบ iframe ซ้อนทั้งหมด {len(inner_iframes)} อัน")
@@ -293,137 +562,32 @@ def get_tyfcb_given_report_data(driver):
                 # สลับไปยัง iframe ซ้อน
                 driver.switch_to.frame(inner_iframes[0])
                 print("สลับไปยัง iframe ซ้อนสำเร็จ")
-                
-                # บันทึกโค้ด HTML ของ iframe ซ้อน
-                # with open("iframe_nested_content.html", "w", encoding="utf-8") as f:
-                #     f.write(driver.page_source)
-                # print("บันทึกโค้ด HTML ของ iframe ซ้อนไว้ที่ iframe_nested_content.html สำหรับตรวจสอบ") # Disabled file save
-                
-                # ตรวจสอบโครงสร้าง HTML
-                page_source = driver.page_source
-                print(f"ได้โค้ด HTML ของ iframe ซ้อน ความยาว: {len(page_source)} ตัวอักษร")
-                
-                # ดึงข้อมูล Running User จาก iframe ซ้อน
-                try:
-                    # วิธีที่ 1: หาจาก reporttoolbar
-                    running_user_elements = driver.find_elements(By.XPATH, "//div[text()='Running User']")
-                    if running_user_elements:
-                        # หาค่าที่อยู่ใน div params_1
-                        params_elements = driver.find_elements(By.XPATH, "//div[@id='params_1']")
-                        if params_elements:
-                            report_data["running_user"] = params_elements[0].text
-                            print(f"Running User: {report_data['running_user']}")
-                except Exception as e:
-                    print(f"ไม่สามารถดึงข้อมูล Running User: {str(e)}")
-                
-                # ดึง Run At จาก iframe ซ้อน
-                try:
-                    # วิธีที่ 1: หาจาก reporttoolbar
-                    run_at_elements = driver.find_elements(By.XPATH, "//div[text()='Run At']")
-                    if run_at_elements:
-                        # หาค่าที่อยู่ใน div params_2
-                        params_elements = driver.find_elements(By.XPATH, "//div[@id='params_2']")
-                        if params_elements:
-                            report_data["run_at"] = params_elements[0].text
-                            print(f"Run At: {report_data['run_at']}")
-                except Exception as e:
-                    print(f"ไม่สามารถดึงข้อมูล Run At: {str(e)}")
-                
-                # ดึง Chapter จาก iframe ซ้อน
-                try:
-                    # วิธีที่ 1: หาจาก reporttoolbar
-                    chapter_elements = driver.find_elements(By.XPATH, "//div[text()='Chapter']")
-                    if chapter_elements:
-                        # หาค่าที่อยู่ใน div params_5
-                        params_elements = driver.find_elements(By.XPATH, "//div[@id='params_5']")
-                        if params_elements:
-                            report_data["chapter"] = params_elements[0].text
-                            print(f"Chapter: {report_data['chapter']}")
-                except Exception as e:
-                    print(f"ไม่สามารถดึงข้อมูล Chapter: {str(e)}")
-                
-                # ดึงข้อมูลตาราง
-                try:
-                    # วิธีที่ 1: หาตารางที่มี ID __bookmark_3
-                    tables = driver.find_elements(By.ID, "__bookmark_3")
-                    
-                    if not tables:
-                        # วิธีที่ 2: หาตารางทั้งหมดและเลือกตารางที่ดูเหมือนจะมีข้อมูล
-                        tables = driver.find_elements(By.TAG_NAME, "table")
-                        print(f"พบตารางทั้งหมด {len(tables)} ตาราง")
-                        
-                        # กรองเฉพาะตารางที่มีแถวมากกว่า 1 แถว
-                        data_tables = []
-                        for table in tables:
-                            rows = table.find_elements(By.TAG_NAME, "tr")
-                            if len(rows) > 1:
-                                data_tables.append(table)
-                        
-                        if data_tables:
-                            # เลือกตารางที่มีแถวมากที่สุด (น่าจะเป็นตารางข้อมูลหลัก)
-                            table = max(data_tables, key=lambda t: len(t.find_elements(By.TAG_NAME, "tr")))
-                        else:
-                            print("ไม่พบตารางที่มีข้อมูล")
-                            table = None
-                    else:
-                        table = tables[0]
-                    
-                    if table:
-                        print(f"พบตารางข้อมูล")
-                        
-                        # ดึงแถวทั้งหมดจากตาราง
-                        rows = table.find_elements(By.TAG_NAME, "tr")
-                        print(f"พบแถวทั้งหมด {len(rows)} แถว")
-                        
-                        # ข้ามแถวแรก (เป็นหัวตาราง)
-                        header_row = None
-                        data_rows = []
-                        total_row = None
-                        
-                        for i, row in enumerate(rows):
-                            # ตรวจสอบว่าเป็นแถวหัวตาราง
-                            if i == 0 or row.find_elements(By.TAG_NAME, "th"):
-                                header_row = row
-                                continue
-                            
-                            # ตรวจสอบว่าเป็นแถวรวม
-                            if "total_row" in row.get_attribute("id") or "Total" in row.text:
-                                total_row = row
-                            else:
-                                data_rows.append(row)
-                        
-                        # ดึงข้อมูลจากแถวข้อมูล
-                        for row in data_rows:
-                            cells = row.find_elements(By.TAG_NAME, "td")
-                            if len(cells) >= 6:  # ตรวจสอบว่ามีคอลัมน์ครบตามที่คาดหวัง
-                                row_data = {
-                                    "date": cells[0].text.strip(),
-                                    "thank_you_to": cells[1].text.strip(),
-                                    "amount": cells[2].text.strip(),
-                                    "new_repeat": cells[3].text.strip() if len(cells) > 3 else "",
-                                    "inside_outside": cells[4].text.strip() if len(cells) > 4 else "",
-                                    "comments": cells[5].text.strip() if len(cells) > 5 else "",
-                                    "status": cells[6].text.strip() if len(cells) > 6 else ""
-                                }
-                                report_data["report_data"].append(row_data)
-                        
-                        print(f"ดึงข้อมูลตารางสำเร็จ: พบ {len(report_data['report_data'])} รายการ")
-                        
-                        # ดึงข้อมูลแถวรวม
-                        if total_row:
-                            total_cells = total_row.find_elements(By.TAG_NAME, "td")
-                            if len(total_cells) > 2:
-                                report_data["total_amount"] = total_cells[2].text.strip()
-                                print(f"Total Amount: {report_data['total_amount']}")
-                        
-                        # บันทึกภาพหน้าจอของตาราง
-                        # table.screenshot("table_screenshot.png") # Disabled file save
-                        print("ข้ามการบันทึกภาพตารางเพื่อลดการสร้างไฟล์ที่ไม่จำเป็น")
-                except Exception as e:
-                    print(f"ไม่สามารถดึงข้อมูลตาราง: {str(e)}")
-                    # บันทึกหน้าจอเพื่อตรวจสอบ
-                    # driver.save_screenshot("table_error.png") # Disabled file save
-                
+
+                # แยกข้อมูลทั้งหมดจาก HTML ในรอบเดียวด้วย lxml แทนการเรียก WebDriver ทีละ element
+                # (ดึง page_source เฉพาะเมื่อใช้ lxml ได้ และเก็บ reference ไว้ใน ring buffer ของ diagnostics)
+                parsed = None
+                if LXML_AVAILABLE:
+                    try:
+                        page_source = driver.page_source
+                        get_diagnostics().snapshot("tyfcb_given_report", page_source)
+                        parsed = parse_birt_report(page_source)
+                    except Exception as e:
+                        print(f"⚠️  แยกข้อมูลจาก HTML ไม่สำเร็จ: {str(e)}")
+
+                if parsed and (parsed["rows"] or parsed["total"]):
+                    report_data["running_user"] = parsed["running_user"]
+                    report_data["run_at"] = parsed["run_at"]
+                    report_data["chapter"] = parsed["chapter"]
+                    report_data["report_data"] = rows_to_records(parsed["rows"])
+                    report_data["total_amount"] = total_row_amount(parsed)
+                    print(f"Running User: {report_data['running_user']}")
+                    print(f"Run At: {report_data['run_at']}")
+                    print(f"Chapter: {report_data['chapter']}")
+                    print(f"ดึงข้อมูลตารางสำเร็จ: พบ {len(report_data['report_data'])} รายการ")
+                    print(f"Total Amount: {report_data['total_amount']}")
+                else:
+                    extract_report_from_dom(driver, report_data)
+
                 # สลับกลับไปยัง iframe หลัก
                 driver.switch_to.default_content()
                 driver.switch_to.frame(all_iframes[0])
@@ -451,6 +615,178 @@ def get_tyfcb_given_report_data(driver):
     
     return report_data
 
+def extract_report_from_dom(driver, report_data):
+    """
+    ดึงข้อมูลรายงานจาก DOM ของ iframe ซ้อนทีละ element ผ่าน WebDriver
+    (ใช้เมื่อแยกข้อมูลจาก HTML ด้วย lxml ไม่ได้)
+    """
+    # ดึงข้อมูล Running User จาก iframe ซ้อน
+    try:
+        # วิธีที่ 1: หาจาก reporttoolbar
+        running_user_elements = driver.find_elements(By.XPATH, "//div[text()='Running User']")
+        if running_user_elements:
+            # หาค่าที่อยู่ใน div params_1
+            params_elements = driver.find_elements(By.XPATH, "//div[@id='params_1']")
+            if params_elements:
+                report_data["running_user"] = params_elements[0].text
+                print(f"Running User: {report_data['running_user']}")
+    except Exception as e:
+        print(f"ไม่สามารถดึงข้อมูล Running User: {str(e)}")
+
+    # ดึง Run At จาก iframe ซ้อน
+    try:
+        # วิธีที่ 1: หาจาก reporttoolbar
+        run_at_elements = driver.find_elements(By.XPATH, "//div[text()='Run At']")
+        if run_at_elements:
+            # หาค่าที่อยู่ใน div params_2
+            params_elements = driver.find_elements(By.XPATH, "//div[@id='params_2']")
+            if params_elements:
+                report_data["run_at"] = params_elements[0].text
+                print(f"Run At: {report_data['run_at']}")
+    except Exception as e:
+        print(f"ไม่สามารถดึงข้อมูล Run At: {str(e)}")
+
+    # ดึง Chapter จาก iframe ซ้อน
+    try:
+        # วิธีที่ 1: หาจาก reporttoolbar
+        chapter_elements = driver.find_elements(By.XPATH, "//div[text()='Chapter']")
+        if chapter_elements:
+            # หาค่าที่อยู่ใน div params_5
+            params_elements = driver.find_elements(By.XPATH, "//div[@id='params_5']")
+            if params_elements:
+                report_data["chapter"] = params_elements[0].text
+                print(f"Chapter: {report_data['chapter']}")
+    except Exception as e:
+        print(f"ไม่สามารถดึงข้อมูล Chapter: {str(e)}")
+
+    # ดึงข้อมูลตาราง
+    try:
+        # วิธีที่ 1: หาตารางที่มี ID __bookmark_3
+        tables = driver.find_elements(By.ID, "__bookmark_3")
+
+        if not tables:
+            # วิธีที่ 2: หาตารางทั้งหมดและเลือกตารางที่ดูเหมือนจะมีข้อมูล
+            tables = driver.find_elements(By.TAG_NAME, "table")
+            print(f"พบตารางทั้งหมด {len(tables)} ตาราง")
+
+            # กรองเฉพาะตารางที่มีแถวมากกว่า 1 แถว
+            data_tables = []
+            for table in tables:
+                rows = table.find_elements(By.TAG_NAME, "tr")
+                if len(rows) > 1:
+                    data_tables.append(table)
+
+            if data_tables:
+                # เลือกตารางที่มีแถวมากที่สุด (น่าจะเป็นตารางข้อมูลหลัก)
+                table = max(data_tables, key=lambda t: len(t.find_elements(By.TAG_NAME, "tr")))
+            else:
+                print("ไม่พบตารางที่มีข้อมูล")
+                table = None
+        else:
+            table = tables[0]
+
+        if table:
+            print(f"พบตารางข้อมูล")
+
+            # ดึงแถวทั้งหมดจากตาราง
+            rows = table.find_elements(By.TAG_NAME, "tr")
+            print(f"พบแถวทั้งหมด {len(rows)} แถว")
+
+            # ข้ามแถวแรก (เป็นหัวตาราง)
+            header_row = None
+            total_row = None
+
+            for i, row in enumerate(rows):
+                # ตรวจสอบว่าเป็นแถวหัวตาราง
+                if i == 0 or row.find_elements(By.TAG_NAME, "th"):
+                    header_row = row
+                    continue
+
+                # ตรวจสอบว่าเป็นแถวรวม
+                if "total_row" in row.get_attribute("id") or "Total" in row.text:
+                    total_row = row
+                    continue
+
+                # ดึงข้อมูลจากแถวข้อมูล
+                cells = row.find_elements(By.TAG_NAME, "td")
+                if len(cells) >= 6:  # ตรวจสอบว่ามีคอลัมน์ครบตามที่คาดหวัง
+                    row_data = {
+                        "date": cells[0].text.strip(),
+                        "thank_you_to": cells[1].text.strip(),
+                        "amount": cells[2].text.strip(),
+                        "new_repeat": cells[3].text.strip() if len(cells) > 3 else "",
+                        "inside_outside": cells[4].text.strip() if len(cells) > 4 else "",
+                        "comments": cells[5].text.strip() if len(cells) > 5 else "",
+                        "status": cells[6].text.strip() if len(cells) > 6 else ""
+                    }
+                    report_data["report_data"].append(row_data)
+
+            print(f"ดึงข้อมูลตารางสำเร็จ: พบ {len(report_data['report_data'])} รายการ")
+
+            # ดึงข้อมูลแถวรวม
+            if total_row:
+                total_cells = total_row.find_elements(By.TAG_NAME, "td")
+                if len(total_cells) > 2:
+                    report_data["total_amount"] = total_cells[2].text.strip()
+                    print(f"Total Amount: {report_data['total_amount']}")
+
+            # บันทึกภาพหน้าจอของตาราง
+            # table.screenshot("table_screenshot.png") # Disabled file save
+            print("ข้ามการบันทึกภาพตารางเพื่อลดการสร้างไฟล์ที่ไม่จำเป็น")
+    except Exception as e:
+        print(f"ไม่สามารถดึงข้อมูลตาราง: {str(e)}")
+        # บันทึกหน้าจอเพื่อตรวจสอบ
+        # driver.save_screenshot("table_error.png") # Disabled file save
+
+def fill_report_date_range(driver, date_from, date_to):
+    """
+    กรอกช่อง From/To ใน popup ของ Review ก่อนคลิก Go
+    คืนค่า True ถ้ากรอกได้ครบทั้งสองช่อง
+    """
+    from_text = format_window_date(date_from)
+    to_text = format_window_date(date_to)
+
+    # ช่องวันที่ใน popup (MUI dialog) - เอาเฉพาะ input ที่มองเห็น
+    inputs = driver.find_elements(By.XPATH, "//div[@role='dialog' or @role='presentation']//input[not(@type='hidden') and not(@type='checkbox')]")
+    inputs = [field for field in inputs if field.is_displayed()]
+
+    # ระบุช่อง From/To จาก name, id, placeholder, aria-label และ <label> ของแต่ละช่อง
+    describe_script = """
+        const input = arguments[0];
+        const labels = Array.from(input.labels || []).map(label => label.textContent);
+        return [input.name, input.id, input.placeholder, input.getAttribute('aria-label')].concat(labels).join(' ');
+    """
+    descriptions = [driver.execute_script(describe_script, field) for field in inputs]
+    matched = match_date_range_fields(descriptions)
+    if matched:
+        fields = [inputs[matched[0]], inputs[matched[1]]]
+    elif len(inputs) == 2:
+        # ไม่มีชื่อหรือ label ที่ระบุได้ แต่ popup มีแค่สองช่อง - ถือว่าเป็น From, To ตามลำดับ
+        fields = inputs
+    else:
+        print(f"ไม่พบช่อง From/To ใน popup (พบ {len(inputs)} ช่อง: {descriptions})")
+        return False
+
+    # ตั้งค่าผ่าน native setter เพื่อให้ React รับรู้การเปลี่ยนแปลง
+    set_value_script = """
+        const input = arguments[0];
+        const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+        setter.call(input, arguments[1]);
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+        input.dispatchEvent(new Event('change', {bubbles: true}));
+        return input.value;
+    """
+    for field, value in zip(fields, (from_text, to_text)):
+        current = driver.execute_script(set_value_script, field, value)
+        if current != value:
+            # สำรอง: พิมพ์ทับด้วยคีย์บอร์ด
+            field.send_keys(Keys.CONTROL, "a")
+            field.send_keys(value)
+
+    print(f"กรอกช่วงวันที่รายงาน: {from_text} - {to_text}")
+    return True
+
+@traced("export")
 def export_tyfcb_given_report(driver):
     """
     คลิกปุ่ม Export เพื่อดาวน์โหลดรายงาน TYFCB Given เป็นไฟล์ Excel
@@ -509,337 +845,616 @@ def export_tyfcb_given_report(driver):
     
     return False
 
-def login_and_get_tyfcb(username, password):
+@traced("extra_reports")
+def crawl_extra_reports(driver, username):
     """
-    ล็อกอินและดึงข้อมูล TYFCB Received และ TYFCB Given
+    ดึงรายงานเพิ่มเติมตาม BNI_EXTRA_REPORTS ต่อจากรายงาน TYFCB Given ใน iframe เดิม
+    (ไม่ต้องกลับไป dashboard แล้ว Review -> Go ใหม่ทุกรายงาน)
+    แถวของทุกรายงานถูกเขียนลง reports.jsonl ในโฟลเดอร์ของการรันทันทีที่ดึงเสร็จ
     """
-    driver = None
+    reports = configured_reports()
+    if not reports:
+        return {}
+
+    print(f"\n=== ดึงรายงานเพิ่มเติม {len(reports)} รายงานใน iframe เดิม ===")
+    sink = ReportRowSink(username)
+    totals = {}
+    for report_type, data in ReportCrawler(driver).crawl(reports):
+        sink.write(report_type, data["rows"])
+        totals[report_type] = data["total_amount"]
+        print(f"✅ {report_type}: {len(data['rows'])} แถว" +
+              (f" (Total {data['total_amount']})" if data["total_amount"] else ""))
+    print(f"บันทึกแถวของรายงานเพิ่มเติมที่ {sink.path}")
+    return totals
+
+# ขั้นตอนของการรัน ตามลำดับ - checkpoint บันทึกหลังแต่ละขั้นตอน
+SCRAPER_STAGES = ("login", "dashboard", "report", "export", "persist")
+
+def login_to_bni(driver, username, password):
+    """
+    ล็อกอินเข้า BNI Connect คืนค่า (สำเร็จหรือไม่, ข้อความเมื่อไม่สำเร็จ)
+    """
+    # 1. เข้าสู่หน้าล็อกอิน
+    print("\nกำลังเข้าสู่หน้าล็อกอิน...")
+    driver.get(f"{BNI_BASE_URL}/login")
+    time.sleep(3)
+    
+    # 2. กรอกข้อมูลล็อกอิน
+    print("\nกำลังกรอกข้อมูลล็อกอิน...")
     try:
-        print("\nกำลังเริ่มต้น WebDriver...")
-        driver = setup_driver()
+        # ค้นหาฟิลด์ username
+        username_field = driver.find_element(By.NAME, "username")
+        username_field.clear()
+        username_field.send_keys(username)
         
-        # 1. เข้าสู่หน้าล็อกอิน
-        print("\nกำลังเข้าสู่หน้าล็อกอิน...")
-        driver.get("https://www.bniconnectglobal.com/login")
-        time.sleep(3)
+        # ค้นหาฟิลด์ password
+        password_field = driver.find_element(By.NAME, "password")
+        password_field.clear()
+        password_field.send_keys(password)
         
-        # 2. กรอกข้อมูลล็อกอิน
-        print("\nกำลังกรอกข้อมูลล็อกอิน...")
+        # คลิกปุ่มล็อกอิน - ลองหลายวิธี
         try:
-            # ค้นหาฟิลด์ username
-            username_field = driver.find_element(By.NAME, "username")
-            username_field.clear()
-            username_field.send_keys(username)
-            
-            # ค้นหาฟิลด์ password
-            password_field = driver.find_element(By.NAME, "password")
-            password_field.clear()
-            password_field.send_keys(password)
-            
-            # คลิกปุ่มล็อกอิน - ลองหลายวิธี
-            try:
-                # หาปุ่มที่มีข้อความเกี่ยวกับล็อกอิน
-                login_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Login') or contains(text(), 'Sign In') or contains(text(), 'Sign-in') or contains(text(), 'เข้าสู่ระบบ')]")
-                if login_buttons:
-                    # ใช้ JavaScript คลิก
-                    driver.execute_script("arguments[0].click();", login_buttons[0])
+            # หาปุ่มที่มีข้อความเกี่ยวกับล็อกอิน
+            login_buttons = driver.find_elements(By.XPATH, "//button[contains(text(), 'Login') or contains(text(), 'Sign In') or contains(text(), 'Sign-in') or contains(text(), 'เข้าสู่ระบบ')]")
+            if login_buttons:
+                # ใช้ JavaScript คลิก
+                driver.execute_script("arguments[0].click();", login_buttons[0])
+            else:
+                # ลองค้นหาปุ่ม submit ในฟอร์ม
+                submit_buttons = driver.find_elements(By.CSS_SELECTOR, "form button[type='submit']")
+                if submit_buttons:
+                    driver.execute_script("arguments[0].click();", submit_buttons[0])
                 else:
-                    # ลองค้นหาปุ่ม submit ในฟอร์ม
-                    submit_buttons = driver.find_elements(By.CSS_SELECTOR, "form button[type='submit']")
-                    if submit_buttons:
-                        driver.execute_script("arguments[0].click();", submit_buttons[0])
-                    else:
-                        # ใช้วิธีส่งคีย์ Enter ที่ฟิลด์ password
-                        password_field.send_keys(Keys.RETURN)
-            except Exception as e:
-                print(f"ไม่สามารถคลิกปุ่มล็อกอิน: {str(e)}")
-                # ลองกด Enter ที่ฟิลด์ password
-                password_field.send_keys(Keys.RETURN)
-            
-            # รอให้ล็อกอินเสร็จและเปลี่ยนเส้นทาง
-            print("\nกำลังรอการล็อกอินและเปลี่ยนเส้นทาง...")
-            time.sleep(10)
-            
-            # ตรวจสอบว่าล็อกอินสำเร็จโดยดูที่ URL
-            current_url = driver.current_url
-            if "login" in current_url:
-                print("\nล็อกอินไม่สำเร็จ ยังอยู่ที่หน้าล็อกอิน")
-                if driver:
-                    driver.quit()
-                return False, "ล็อกอินไม่สำเร็จ กรุณาตรวจสอบชื่อผู้ใช้และรหัสผ่าน", None
-            
+                    # ใช้วิธีส่งคีย์ Enter ที่ฟิลด์ password
+                    password_field.send_keys(Keys.RETURN)
         except Exception as e:
-            print(f"\nเกิดข้อผิดพลาดในการล็อกอิน: {str(e)}")
-            if driver:
-                driver.quit()
-            return False, f"เกิดข้อผิดพลาดในการล็อกอิน: {str(e)}", None
+            print(f"ไม่สามารถคลิกปุ่มล็อกอิน: {str(e)}")
+            # ลองกด Enter ที่ฟิลด์ password
+            password_field.send_keys(Keys.RETURN)
         
-        # 3. เข้าสู่หน้า Dashboard
-        print("\nล็อกอินสำเร็จ! กำลังเข้าสู่หน้า Dashboard...")
-        driver.get("https://www.bniconnectglobal.com/web/dashboard")
-        time.sleep(7)
+        # รอให้ล็อกอินเสร็จและเปลี่ยนเส้นทาง
+        print("\nกำลังรอการล็อกอินและเปลี่ยนเส้นทาง...")
+        time.sleep(10)
         
-        # 4. ค้นหาและคลิกที่ Lifetime
-        print("\nกำลังค้นหาและคลิกที่ Lifetime...")
-        try:
+        # ตรวจสอบว่าล็อกอินสำเร็จโดยดูที่ URL
+        current_url = driver.current_url
+        if "login" in current_url:
+            print("\nล็อกอินไม่สำเร็จ ยังอยู่ที่หน้าล็อกอิน")
+            return False, "ล็อกอินไม่สำเร็จ กรุณาตรวจสอบชื่อผู้ใช้และรหัสผ่าน"
+        
+    except Exception as e:
+        print(f"\nเกิดข้อผิดพลาดในการล็อกอิน: {str(e)}")
+        return False, f"เกิดข้อผิดพลาดในการล็อกอิน: {str(e)}"
+
+    return True, None
+
+def open_lifetime_dashboard(driver, selector_registry):
+    """
+    เข้าหน้า Dashboard แล้วเลือกมุมมอง Lifetime
+    """
+    # 3. เข้าสู่หน้า Dashboard
+    driver.get(f"{BNI_BASE_URL}/web/dashboard")
+    time.sleep(7)
+    
+    # 4. ค้นหาและคลิกที่ Lifetime (ลองวิธีที่สำเร็จล่าสุดก่อน)
+    print("\nกำลังค้นหาและคลิกที่ Lifetime...")
+    try:
+        label, lifetime_elements = selector_registry.find("bni.lifetime", [
             # วิธีที่ 1: ค้นหาด้วยข้อความ Lifetime
-            lifetime_elements = driver.find_elements(By.XPATH, "//p[contains(text(), 'Lifetime')]")
-            if lifetime_elements:
-                for element in lifetime_elements:
-                    print(f"พบ Lifetime element: {element.text}")
-                    try:
-                        driver.execute_script("arguments[0].click();", element)
-                        print("คลิก Lifetime สำเร็จ")
-                        break
-                    except:
-                        print("ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
-            else:
-                print("ไม่พบข้อความ Lifetime")
-                
-                # วิธีที่ 2: ค้นหาด้วย attribute isbackground
-                lifetime_elements = driver.find_elements(By.XPATH, "//*[@isbackground='true']")
-                if lifetime_elements:
-                    for element in lifetime_elements:
-                        if "Lifetime" in element.text:
-                            print(f"พบ Lifetime จาก isbackground: {element.text}")
-                            try:
-                                driver.execute_script("arguments[0].click();", element)
-                                print("คลิก Lifetime จาก isbackground สำเร็จ")
-                                break
-                            except:
-                                print("ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
-                else:
-                    print("ไม่พบ element ที่มี isbackground='true'")
-            
-            # รอให้หน้าเว็บอัปเดตหลังคลิก Lifetime
-            time.sleep(5)
-            
-        except Exception as e:
-            print(f"เกิดข้อผิดพลาดในการคลิก Lifetime: {str(e)}")
+            ("ข้อความ Lifetime", lambda: driver.find_elements(By.XPATH, "//p[contains(text(), 'Lifetime')]")),
+            # วิธีที่ 2: ค้นหาด้วย attribute isbackground
+            ("isbackground", lambda: [element for element in driver.find_elements(By.XPATH, "//*[@isbackground='true']")
+                                      if "Lifetime" in element.text]),
+        ])
+        if lifetime_elements:
+            for element in lifetime_elements:
+                print(f"พบ Lifetime element ({label}): {element.text}")
+                try:
+                    driver.execute_script("arguments[0].click();", element)
+                    print("คลิก Lifetime สำเร็จ")
+                    break
+                except:
+                    print("ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
+        else:
+            print("ไม่พบ Lifetime element")
         
-        # 5. ค้นหา TYFCB Received
+        # รอให้หน้าเว็บอัปเดตหลังคลิก Lifetime
+        time.sleep(5)
+        
+    except Exception as e:
+        print(f"เกิดข้อผิดพลาดในการคลิก Lifetime: {str(e)}")
+
+def read_dashboard_metrics(driver, selector_registry):
+    """
+    อ่าน TYFCB Received และ metric อื่นบน dashboard คืนค่า (tyfcb_received, dashboard_metrics)
+    """
+    # 5. อ่านทุก metric บน dashboard (TYFCB, Referrals, Visitors, One to Ones, CEU) ใน WebDriver call เดียว
+    print("\nกำลังอ่านข้อมูลทุก metric บน dashboard...")
+    tyfcb_received = "ไม่พบข้อมูล TYFCB Received"
+    dashboard_metrics = None
+    dashboard_raw = {}
+    try:
+        dashboard_metrics, dashboard_raw = read_dashboard_snapshot(driver)
+        for key, value in dashboard_metrics.items():
+            print(f"   {key}: {value}")
+    except Exception as e:
+        print(f"ไม่สามารถอ่าน metric บน dashboard: {str(e)}")
+
+    def find_received_near_label():
+        # หาจากข้อความ TYFCB และจากนั้นหาตัวเลขใกล้ๆ
+        for indicator in driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Received')]"):
+            print(f"พบข้อความเกี่ยวกับ TYFCB Received: {indicator.text}")
+            try:
+                parent_div = indicator.find_element(By.XPATH, "./ancestor::div[contains(@class, 'MuiBox-root')][1]")
+                money_spans = parent_div.find_elements(By.XPATH, ".//span[contains(text(), '฿')]")
+                if money_spans:
+                    return money_spans[0].text
+            except Exception as e:
+                print(f"ไม่สามารถหาข้อมูลเงินใกล้ TYFCB Received: {str(e)}")
+        return None
+
+    def find_first_baht_value():
+        # หาจากสัญลักษณ์สกุลเงินบาทโดยตรง ใช้ค่าแรกที่พบ
+        values = [element.text for element in driver.find_elements(By.XPATH, "//span[contains(text(), '฿')]")]
+        print(f"พบข้อมูลเงินทั้งหมด: {values}")
+        return values[0] if values else None
+
+    if dashboard_raw.get("tyfcb_received"):
+        tyfcb_received = dashboard_raw["tyfcb_received"]
+        print(f"พบข้อมูลเงิน TYFCB Received (dashboard snapshot): {tyfcb_received}")
+    else:
+        # ถอยไปหาทีละ element เมื่อ snapshot ไม่พบ TYFCB Received
         print("\nกำลังค้นหาข้อมูล TYFCB Received...")
-        tyfcb_received = "ไม่พบข้อมูล TYFCB Received"
         try:
-            # ค้นหาด้วยหลายวิธี
-            
-            # วิธีที่ 1: หาจากข้อความ TYFCB และจากนั้นหาตัวเลขใกล้ๆ
-            tyfcb_indicators = driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Received')]")
-            if tyfcb_indicators:
-                for indicator in tyfcb_indicators:
-                    print(f"พบข้อความเกี่ยวกับ TYFCB Received: {indicator.text}")
-                    try:
-                        # หาตัวเลขใกล้ๆ
-                        parent_div = indicator.find_element(By.XPATH, "./ancestor::div[contains(@class, 'MuiBox-root')][1]")
-                        money_spans = parent_div.find_elements(By.XPATH, ".//span[contains(text(), '฿')]")
-                        if money_spans:
-                            for span in money_spans:
-                                print(f"พบข้อมูลเงิน TYFCB Received: {span.text}")
-                                tyfcb_received = span.text
-                                break
-                    except Exception as e:
-                        print(f"ไม่สามารถหาข้อมูลเงินใกล้ TYFCB Received: {str(e)}")
-                        continue
-            
-            # วิธีที่ 2: หาจากสัญลักษณ์สกุลเงินบาทโดยตรง
-            if tyfcb_received == "ไม่พบข้อมูล TYFCB Received":
-                money_elements = driver.find_elements(By.XPATH, "//span[contains(text(), '฿')]")
-                if money_elements:
-                    values = [element.text for element in money_elements]
-                    print(f"พบข้อมูลเงินทั้งหมด: {values}")
-                    if values:
-                        tyfcb_received = values[0]  # ใช้ค่าแรกที่พบ
-            
+            label, value = selector_registry.find("bni.tyfcb_received", [
+                ("ข้อความ TYFCB Received", find_received_near_label),
+                heuristic("สัญลักษณ์ ฿ แรก", find_first_baht_value),
+            ])
+            if value:
+                print(f"พบข้อมูลเงิน TYFCB Received ({label}): {value}")
+                tyfcb_received = value
+
         except Exception as e:
             print(f"เกิดข้อผิดพลาดในการดึงข้อมูล TYFCB Received: {str(e)}")
-        
-        # 6. คลิกที่ปุ่ม Review ของ TYFCB Given
-        print("\nกำลังค้นหาและคลิกที่ปุ่ม Review ของ TYFCB Given...")
-        tyfcb_given_report = "ไม่พบข้อมูล TYFCB Given Report"
+
+    return tyfcb_received, dashboard_metrics
+
+def open_tyfcb_given_report(driver, selector_registry, username, baseline_at=None):
+    """
+    คลิก Review ของ TYFCB Given กรอกช่วงวันที่ แล้วคลิก Go และรอให้รายงานแสดง
+    baseline_at คือเวลาของฐานแถวรายงานแบบครบปี (ไม่มีฐานจะดึงทั้งปี)
+    คืนค่า (พบ TYFCB Given หรือไม่, ช่วงวันที่ที่ใช้หรือ None)
+    """
+    given_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Given')]")
+    if not given_elements:
+        print("ไม่พบข้อความ TYFCB Given")
+        return False, None
+
+    given_element = given_elements[0]
+    print(f"พบข้อความ TYFCB Given: {given_element.text}")
+
+    # หาปุ่ม Review ที่อยู่ใกล้ๆ
+    try:
+        label, review_elements = selector_registry.find("bni.review_button", [
+            # วิธีที่ 1: หาจากข้อความ Review โดยตรง
+            ("ข้อความ Review", lambda: driver.find_elements(By.XPATH, "//div[contains(text(), 'Review')]")),
+            # วิธีที่ 2: หาจาก class ตามที่เห็นในรูป
+            ("class css-13xuqvq", lambda: [element for element in driver.find_elements(By.CSS_SELECTOR, "div.MuiBox-root.css-13xuqvq")
+                                           if "Review" in element.text]),
+        ])
+        for review_element in review_elements or []:
+            print(f"พบปุ่ม Review ({label}): {review_element.text}")
+            try:
+                driver.execute_script("arguments[0].click();", review_element)
+                print("คลิกปุ่ม Review สำเร็จ")
+                break
+            except Exception as e:
+                print(f"ไม่สามารถคลิกปุ่ม Review นี้: {str(e)}")
+                continue
+
+    except Exception as e:
+        print(f"เกิดข้อผิดพลาดในการหาปุ่ม Review: {str(e)}")
+
+    # รอให้ popup ปรากฏ
+    print("\nรอให้ popup ปรากฏ...")
+    time.sleep(3)
+
+    # กรอกช่วงวันที่ตั้งแต่การรันที่สำเร็จครั้งล่าสุด (ถ้าไม่มีจะใช้ค่าเริ่มต้น 1 ปีของ BNI)
+    report_window = resolve_report_window(username, baseline_at=baseline_at)
+    if report_window:
         try:
-            # ค้นหาข้อความ TYFCB Given
-            given_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Given')]")
-            if given_elements:
-                given_element = given_elements[0]
-                print(f"พบข้อความ TYFCB Given: {given_element.text}")
-                
-                # หาปุ่ม Review ที่อยู่ใกล้ๆ
-                try:
-                    # วิธีที่ 1: หาจากข้อความ Review โดยตรง
-                    review_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Review')]")
-                    if review_elements:
-                        for review_element in review_elements:
-                            # ตรวจสอบว่าอยู่ใกล้กับ TYFCB Given หรือไม่
-                            print(f"พบปุ่ม Review: {review_element.text}")
-                            try:
-                                driver.execute_script("arguments[0].click();", review_element)
-                                print("คลิกปุ่ม Review สำเร็จ")
-                                break
-                            except Exception as e:
-                                print(f"ไม่สามารถคลิกปุ่ม Review นี้: {str(e)}")
-                                continue
-                    else:
-                        # วิธีที่ 2: หาจาก class ตามที่เห็นในรูป
-                        review_elements = driver.find_elements(By.CSS_SELECTOR, "div.MuiBox-root.css-13xuqvq")
-                        if review_elements:
-                            for review_element in review_elements:
-                                if "Review" in review_element.text:
-                                    print(f"พบปุ่ม Review จาก class: {review_element.text}")
-                                    try:
-                                        driver.execute_script("arguments[0].click();", review_element)
-                                        print("คลิกปุ่ม Review จาก class สำเร็จ")
-                                        break
-                                    except Exception as e:
-                                        print(f"ไม่สามารถคลิกปุ่ม Review จาก class นี้: {str(e)}")
-                                        continue
-                
-                except Exception as e:
-                    print(f"เกิดข้อผิดพลาดในการหาปุ่ม Review: {str(e)}")
-                
-                # รอให้ popup ปรากฏ
-                print("\nรอให้ popup ปรากฏ...")
-                time.sleep(3)
-                
-                # คลิกปุ่ม Go เท่านั้น (ไม่มีการกรอกวันที่)
-                print("\nกำลังค้นหาและคลิกปุ่ม Go โดยตรง...")
-                try:
-                    # บันทึกภาพหน้าจอก่อนการคลิกปุ่ม Go
-                    # driver.save_screenshot("popup_before_go.png") # Disabled file save
-                    
-                    # วิธีที่ 1: หาปุ่มที่มีข้อความแน่นอนว่า "Go"
-                    go_button = driver.find_element(By.XPATH, "//button[text()='Go']")
-                    driver.execute_script("arguments[0].click();", go_button)
-                    print("คลิกปุ่ม 'Go' สำเร็จ (วิธีที่ 1)")
-                except Exception as e:
-                    print(f"ไม่สามารถคลิกปุ่ม Go ด้วยวิธีที่ 1: {str(e)}")
-                    try:
-                        # วิธีที่ 2: หาปุ่มสีแดงในป็อปอัพ
-                        go_buttons = driver.find_elements(By.CSS_SELECTOR, "button.MuiButton-contained")
-                        if go_buttons:
-                            for button in go_buttons:
-                                if button.is_displayed():
-                                    driver.execute_script("arguments[0].click();", button)
-                                    print(f"คลิกปุ่ม MuiButton-contained ที่พบ: {button.text}")
-                                    break
-                        else:
-                            # วิธีที่ 3: หาปุ่มทั้งหมดและพิมพ์ออกมาเพื่อตรวจสอบ
-                            all_buttons = driver.find_elements(By.TAG_NAME, "button")
-                            print(f"พบปุ่มทั้งหมด {len(all_buttons)} ปุ่ม")
-                            for idx, button in enumerate(all_buttons):
-                                if button.is_displayed():
-                                    button_text = button.text.strip()
-                                    print(f"ปุ่มที่ {idx+1}: '{button_text}'")
-                                    if button_text.lower() == "go":
-                                        driver.execute_script("arguments[0].click();", button)
-                                        print(f"คลิกปุ่ม '{button_text}' สำเร็จ")
-                                        break
-                            else:
-                                # วิธีที่ 4: ใช้ JavaScript โดยตรง
-                                try:
-                                    driver.execute_script("document.querySelector('button.MuiButton-contained').click();")
-                                    print("คลิกปุ่ม MuiButton-contained ด้วย JavaScript โดยตรง")
-                                except Exception as js_error:
-                                    print(f"ไม่สามารถคลิกปุ่มด้วย JavaScript โดยตรง: {str(js_error)}")
-                    except Exception as e2:
-                        print(f"เกิดข้อผิดพลาดในการคลิกปุ่ม Go: {str(e2)}")
-                
-                # รอให้รายงานแสดง
-                print("\nรอให้รายงานแสดง...")
-                time.sleep(10)
-
-                # ถ่ายภาพหน้าจอของรายงาน
-                # driver.save_screenshot("tyfcb_given_report.png") # Disabled file save
-                print("ข้ามการบันทึกภาพรายงาน TYFCB Given เพื่อลดการสร้างไฟล์ที่ไม่จำเป็น")
-
-                # ดึงข้อมูลจากรายงาน - ทำก่อนคลิก Export
-                tyfcb_given_data = get_tyfcb_given_report_data(driver)
-
-                # ทำการสร้างรายงานสรุปจากข้อมูลที่ดึงได้
-                report_summary = f"Running User: {tyfcb_given_data['running_user']}\n"
-                report_summary += f"Run At: {tyfcb_given_data['run_at']}\n"
-                report_summary += f"Chapter: {tyfcb_given_data['chapter']}\n\n"
-                report_summary += "รายการ TYFCB Given:\n"
-                report_summary += "-" * 80 + "\n"
-                report_summary += "{:<12} {:<25} {:>10} {:<10} {:<15} {:<30}\n".format(
-                    "วันที่", "Thank you to", "จำนวนเงิน", "ประเภท", "แหล่งที่มา", "หมายเหตุ")
-                report_summary += "-" * 80 + "\n"
-
-                for item in tyfcb_given_data["report_data"]:
-                    report_summary += "{:<12} {:<25} {:>10} {:<10} {:<15} {:<30}\n".format(
-                        item["date"],
-                        item["thank_you_to"][:25],
-                        item["amount"],
-                        item["new_repeat"],
-                        item["inside_outside"],
-                        item["comments"][:30]
-                    )
-
-                if "total_amount" in tyfcb_given_data and tyfcb_given_data["total_amount"]:
-                    report_summary += "-" * 80 + "\n"
-                    report_summary += "{:<12} {:<25} {:>10}\n".format(
-                        "", "Total", tyfcb_given_data["total_amount"])
-
-                tyfcb_given_report = report_summary
-
-                # บันทึกข้อมูลเป็นไฟล์ CSV - ยกเลิกการบันทึกไฟล์เพื่อลดการสร้างไฟล์ที่ไม่จำเป็น
-                # try:
-                #     # ใช้ utf-8-sig แทน utf-8 เพื่อให้แสดงภาษาไทยได้ถูกต้อง
-                #     with open("tyfcb_given_report.csv", "w", encoding="utf-8-sig", newline='') as f:
-                #         writer = csv.writer(f)
-                #         # เพิ่มคอลัมน์ Thank you From หลังจาก Date
-                #         writer.writerow(["Date", "Thank you From", "Thank you to", "Amount", "New/Repeat", "Inside/Outside", "Comments", "Status"])
-                #         for item in tyfcb_given_data["report_data"]:
-                #             writer.writerow([
-                #                 item["date"],
-                #                 tyfcb_given_data['running_user'], # เพิ่มชื่อ Running User
-                #                 item["thank_you_to"],
-                #                 item["amount"],
-                #                 item["new_repeat"],
-                #                 item["inside_outside"],
-                #                 item["comments"],
-                #                 item["status"]
-                #             ])
-                #     print("บันทึกข้อมูลรายงานเป็นไฟล์ CSV เรียบร้อย")
-                # except Exception as e:
-                #     print(f"ไม่สามารถบันทึกไฟล์ CSV: {str(e)}")
-                print("ข้อมูล CSV พร้อมประมวลผลแล้ว (ไม่มีการบันทึกไฟล์)")
-
-                # คลิกปุ่ม Export เพื่อดาวน์โหลดรายงานเป็นไฟล์ Excel - ทำหลังจากดึงข้อมูลแล้ว
-                export_success = export_tyfcb_given_report(driver)
-                if export_success:
-                    print("ดาวน์โหลดรายงานเป็นไฟล์ Excel สำเร็จ")
-                
-            else:
-                print("ไม่พบข้อความ TYFCB Given")
-                
+            if not fill_report_date_range(driver, *report_window):
+                report_window = None
         except Exception as e:
-            print(f"เกิดข้อผิดพลาดในการคลิกปุ่ม Review: {str(e)}")
-        
+            print(f"ไม่สามารถกรอกช่วงวันที่: {str(e)} - ใช้ค่าเริ่มต้น 1 ปี")
+            report_window = None
+    else:
+        print("ใช้ช่วงวันที่เริ่มต้นของรายงาน (1 ปีย้อนหลัง)")
+
+    # คลิกปุ่ม Go
+    print("\nกำลังค้นหาและคลิกปุ่ม Go โดยตรง...")
+
+    def find_displayed_go_button():
+        # หาปุ่มทั้งหมดและเลือกปุ่มที่มีข้อความ Go
+        for button in driver.find_elements(By.TAG_NAME, "button"):
+            if button.is_displayed() and button.text.strip().lower() == "go":
+                return button
+        return None
+
+    try:
+        # บันทึกภาพหน้าจอก่อนการคลิกปุ่ม Go
+        # driver.save_screenshot("popup_before_go.png") # Disabled file save
+        label, go_button = selector_registry.find("bni.go_button", [
+            # วิธีที่ 1: หาปุ่มที่มีข้อความแน่นอนว่า "Go"
+            ("ข้อความ Go", lambda: driver.find_element(By.XPATH, "//button[text()='Go']")),
+            # วิธีที่ 2: หาปุ่มทั้งหมดที่มองเห็นได้
+            ("ปุ่มทั้งหมด", find_displayed_go_button),
+            # วิธีที่ 3: หาปุ่มสีแดงในป็อปอัพ (ไม่ตรวจข้อความ - ลองหลังวิธีที่แม่นยำเสมอ)
+            heuristic("MuiButton-contained", lambda: next((button for button in driver.find_elements(By.CSS_SELECTOR, "button.MuiButton-contained")
+                                                           if button.is_displayed()), None)),
+            # วิธีที่ 4: ใช้ JavaScript โดยตรง
+            heuristic("JavaScript querySelector", lambda: driver.execute_script("return document.querySelector('button.MuiButton-contained');")),
+        ])
+        if go_button:
+            driver.execute_script("arguments[0].click();", go_button)
+            print(f"คลิกปุ่ม 'Go' สำเร็จ ({label})")
+        else:
+            print("ไม่พบปุ่ม Go")
+    except Exception as e:
+        print(f"เกิดข้อผิดพลาดในการคลิกปุ่ม Go: {str(e)}")
+
+    # รอให้รายงานแสดง
+    print("\nรอให้รายงานแสดง...")
+    time.sleep(10)
+
+    # ถ่ายภาพหน้าจอของรายงาน
+    # driver.save_screenshot("tyfcb_given_report.png") # Disabled file save
+    print("ข้ามการบันทึกภาพรายงาน TYFCB Given เพื่อลดการสร้างไฟล์ที่ไม่จำเป็น")
+
+    return True, report_window
+
+def extract_tyfcb_given_report(driver, username, report_window, fingerprint_store):
+    """
+    ดึงแถวของรายงาน TYFCB Given ที่แสดงอยู่ เทียบกับรอบก่อน และสร้างรายงานสรุป
+    คืนค่า (tyfcb_given_data, รายงานสรุป)
+    """
+    tracer = get_tracer()
+    # ดึงข้อมูลจากรายงาน - ทำก่อนคลิก Export
+    tracer.end_phase()
+    tyfcb_given_data = get_tyfcb_given_report_data(driver)
+
+    # เปรียบเทียบกับรอบก่อน - ขั้นตอนถัดไปประมวลผลเฉพาะแถวที่เปลี่ยน
+    # รายงานที่จำกัดช่วงวันที่จะถูกรวมกับแถวเก่านอกช่วงที่เก็บไว้ และตัดแถวที่เก่ากว่า 1 ปี
+    given_delta, full_rows, complete = fingerprint_store.compute_delta(
+        username, tyfcb_given_data["report_data"], window=report_window)
+    if report_window:
+        # คงความหมายเดิมของ Records Count / Total Given Amount (ยอดย้อนหลัง 1 ปี)
+        tyfcb_given_data["total_amount"] = f"{sum_amounts(full_rows):,.2f}"
+    # ฐานที่เก็บไว้ไม่ครอบคลุมส่วนที่เหลือของปี - ยอดเป็นของช่วงวันที่เท่านั้น และจะไม่ถูกบันทึกเป็นฐาน
+    tyfcb_given_data["complete_history"] = complete
+    if not complete:
+        print("⚠️  ยังไม่มีฐานรายงานครบ 1 ปีที่ต่อกับช่วงวันที่นี้ได้ - ยอดรวมเป็นของช่วงวันที่เท่านั้น "
+              "และจะไม่บันทึกเป็นฐาน (รันด้วย TYFCB_DATE_WINDOW=full เพื่อสร้างฐาน)")
+    tyfcb_given_data["report_data"] = full_rows
+    tyfcb_given_data["delta"] = given_delta
+    print(f"TYFCB Given เทียบกับรอบก่อน: ใหม่ {len(given_delta['added'])}, "
+          f"เปลี่ยน {len(given_delta['changed'])}, ถูกลบ {len(given_delta['removed'])}, "
+          f"เหมือนเดิม {given_delta['unchanged_count']}")
+
+    # ทำการสร้างรายงานสรุปจากข้อมูลที่ดึงได้
+    report_summary = f"Running User: {tyfcb_given_data['running_user']}\n"
+    report_summary += f"Run At: {tyfcb_given_data['run_at']}\n"
+    report_summary += f"Chapter: {tyfcb_given_data['chapter']}\n\n"
+    report_summary += f"รายการ TYFCB Given ทั้งหมด: {len(tyfcb_given_data['report_data'])} รายการ\n"
+    report_summary += "รายการที่เปลี่ยนแปลงตั้งแต่รอบก่อน:\n"
+    report_summary += "-" * 80 + "\n"
+    report_summary += "{:<8} {:<12} {:<25} {:>10} {:<10} {:<15} {:<30}\n".format(
+        "สถานะ", "วันที่", "Thank you to", "จำนวนเงิน", "ประเภท", "แหล่งที่มา", "หมายเหตุ")
+    report_summary += "-" * 80 + "\n"
+
+    delta_items = [("ใหม่", item) for item in given_delta["added"]]
+    delta_items += [("เปลี่ยน", change["after"]) for change in given_delta["changed"]]
+    delta_items += [("ลบ", item) for item in given_delta["removed"]]
+    for status, item in delta_items:
+        report_summary += "{:<8} {:<12} {:<25} {:>10} {:<10} {:<15} {:<30}\n".format(
+            status,
+            item["date"],
+            item["thank_you_to"][:25],
+            item["amount"],
+            item["new_repeat"],
+            item["inside_outside"],
+            item["comments"][:30]
+        )
+
+    if "total_amount" in tyfcb_given_data and tyfcb_given_data["total_amount"]:
+        report_summary += "-" * 80 + "\n"
+        report_summary += "{:<12} {:<25} {:>10}\n".format(
+            "", "Total", tyfcb_given_data["total_amount"])
+
+
+    # บันทึกข้อมูลเป็นไฟล์ CSV - ยกเลิกการบันทึกไฟล์เพื่อลดการสร้างไฟล์ที่ไม่จำเป็น
+    # try:
+    #     # ใช้ utf-8-sig แทน utf-8 เพื่อให้แสดงภาษาไทยได้ถูกต้อง
+    #     with open("tyfcb_given_report.csv", "w", encoding="utf-8-sig", newline='') as f:
+    #         writer = csv.writer(f)
+    #         # เพิ่มคอลัมน์ Thank you From หลังจาก Date
+    #         writer.writerow(["Date", "Thank you From", "Thank you to", "Amount", "New/Repeat", "Inside/Outside", "Comments", "Status"])
+    #         for item in tyfcb_given_data["report_data"]:
+    #             writer.writerow([
+    #                 item["date"],
+    #                 tyfcb_given_data['running_user'], # เพิ่มชื่อ Running User
+    #                 item["thank_you_to"],
+    #                 item["amount"],
+    #                 item["new_repeat"],
+    #                 item["inside_outside"],
+    #                 item["comments"],
+    #                 item["status"]
+    #             ])
+    #     print("บันทึกข้อมูลรายงานเป็นไฟล์ CSV เรียบร้อย")
+    # except Exception as e:
+    #     print(f"ไม่สามารถบันทึกไฟล์ CSV: {str(e)}")
+    print("ข้อมูล CSV พร้อมประมวลผลแล้ว (ไม่มีการบันทึกไฟล์)")
+
+    return tyfcb_given_data, report_summary
+
+def login_and_get_tyfcb(username, password, resume=False, collect=None):
+    """
+    ล็อกอินและดึงข้อมูล TYFCB Received และ TYFCB Given
+
+    ทำเป็นขั้นตอน login -> dashboard -> report -> export -> persist และบันทึก checkpoint หลังแต่ละขั้นตอน
+    resume=True จะใช้ผลของขั้นตอนที่เสร็จแล้วจากการรันก่อน (เช่น Sheets ล้มหลัง scrape เสร็จ
+    จะทำเฉพาะ persist โดยไม่ต้องเปิดเบราว์เซอร์)
+    collect (list) ใช้ในโหมดหลายบัญชี - เพิ่มผลของบัญชีนี้ลง list แทนการบันทึกลง Sheets (ดู persist_results)
+    โหมดนี้ไม่เขียน checkpoint ลงไฟล์และไม่รองรับ resume (ขั้นตอน persist ทำหลังจบทุกบัญชี)
+    """
+    driver = None
+    completed = False
+    tracer = get_tracer()
+    browsers = get_browser_manager()
+    checkpoint = RunCheckpoint("scraper", username, SCRAPER_STAGES, resume=resume and collect is None,
+                               durable=collect is None)
+    tyfcb_received = "ไม่พบข้อมูล TYFCB Received"
+    dashboard_metrics = None
+    tyfcb_given_report = "ไม่พบข้อมูล TYFCB Given Report"
+    tyfcb_given_data = None
+
+    # เตรียม Chrome, Google Sheets และไฟล์ state พร้อมกัน - ถ้าอย่างใดล้มเหลวจะหยุดก่อนเริ่ม scrape
+    tasks = [("selectors", SelectorRegistry), ("fingerprints", ReportFingerprintStore)]
+    if checkpoint.pending("dashboard", "report", "export"):
+        print("\nกำลังเริ่มต้น WebDriver...")
+        tasks.append(("browser", lambda: browsers.acquire(username)))
+    if GOOGLE_SHEETS_AVAILABLE and collect is None and checkpoint.pending("persist"):
+        tasks.append(("sheets", warm_up_google_sheets))
+    try:
+        warm = warm_up(tasks, cleanup={"browser": lambda browser: browsers.release(healthy=False)})
+    except RuntimeError as e:
+        print(f"\n❌ {str(e)}")
+        return False, str(e), None
+    driver = warm.get("browser")
+    selector_registry = warm["selectors"]
+    fingerprint_store = warm["fingerprints"]
+
+    try:
+        if driver:
+            # 1-2. ล็อกอิน
+            tracer.phase("login")
+            logged_in, message = login_to_bni(driver, username, password)
+            if not logged_in:
+                tracer.end_phase(status="error", error=message)
+                return False, message, None
+            checkpoint.complete("login")
+
+            # 3-4. เข้าสู่หน้า Dashboard และเลือก Lifetime
+            print("\nล็อกอินสำเร็จ! กำลังเข้าสู่หน้า Dashboard...")
+            tracer.phase("dashboard")
+            open_lifetime_dashboard(driver, selector_registry)
+
+        # 5. อ่านทุก metric บน dashboard
+        if checkpoint.done("dashboard"):
+            tyfcb_received, dashboard_metrics = checkpoint.data("dashboard")
+            print(f"♻️  ใช้ข้อมูล dashboard จาก checkpoint: TYFCB Received {tyfcb_received}")
+        else:
+            tyfcb_received, dashboard_metrics = read_dashboard_metrics(driver, selector_registry)
+            checkpoint.complete("dashboard", [tyfcb_received, dashboard_metrics])
+
+        if checkpoint.done("report"):
+            tyfcb_given_data, tyfcb_given_report = checkpoint.data("report")
+            print(f"♻️  ใช้รายงาน TYFCB Given จาก checkpoint: {len(tyfcb_given_data['report_data'])} รายการ")
+
+        # 6. เปิดรายงาน TYFCB Given (Review -> Go) เมื่อยังต้องดึงข้อมูลหรือ Export
+        if checkpoint.pending("report", "export"):
+            tracer.phase("report_render")
+            print("\nกำลังค้นหาและคลิกที่ปุ่ม Review ของ TYFCB Given...")
+            try:
+                found, report_window = open_tyfcb_given_report(
+                    driver, selector_registry, username, fingerprint_store.baseline_at(username))
+                if found:
+                    if not checkpoint.done("report"):
+                        tyfcb_given_data, tyfcb_given_report = extract_tyfcb_given_report(
+                            driver, username, report_window, fingerprint_store)
+                        checkpoint.complete("report", [tyfcb_given_data, tyfcb_given_report])
+                        # DOM ของรายงานเป็นจุดที่ Chrome ใช้หน่วยความจำสูงสุด
+                        browsers.sample()
+
+                    # คลิกปุ่ม Export เพื่อดาวน์โหลดรายงานเป็นไฟล์ Excel - ทำหลังจากดึงข้อมูลแล้ว
+                    export_success = export_tyfcb_given_report(driver)
+                    if export_success:
+                        print("ดาวน์โหลดรายงานเป็นไฟล์ Excel สำเร็จ")
+
+                    # รายงานอื่นใช้ iframe ที่ render ไว้แล้วต่อ - ทำหลัง Export เพื่อให้ไฟล์ Excel เป็นของ TYFCB Given
+                    crawl_extra_reports(driver, username)
+                    browsers.sample()
+                    if export_success:
+                        checkpoint.complete("export")
+
+            except Exception as e:
+                print(f"เกิดข้อผิดพลาดในการคลิกปุ่ม Review: {str(e)}")
+
+        if collect is not None:
+            # โหมดหลายบัญชี - ผลของทุกบัญชีถูกเขียนลง Sheets พร้อมกันใน persist_results
+            collect.append({
+                "username": username,
+                "tyfcb_received": tyfcb_received,
+                "tyfcb_given_data": tyfcb_given_data,
+                "dashboard_metrics": dashboard_metrics,
+            })
         # บันทึกข้อมูลลง Google Sheets (ถ้าพร้อมใช้งาน)
-        if GOOGLE_SHEETS_AVAILABLE:
+        elif GOOGLE_SHEETS_AVAILABLE:
             print("\n=== บันทึกข้อมูลลง Google Sheets ===")
-            save_to_google_sheet(tyfcb_received, tyfcb_given_data)
+            saved = save_to_google_sheet(tyfcb_received, tyfcb_given_data, dashboard_metrics, username)
+
+            # จำแถวของรอบนี้ไว้เทียบในรอบถัดไป เมื่อบันทึกสำเร็จเท่านั้น
+            if saved:
+                commit_report_state(username, tyfcb_given_data, fingerprint_store)
+                checkpoint.complete("persist")
+        else:
+            checkpoint.complete("persist")
 
+        # ขั้นตอน persist ที่ล้มเหลวจะถูกทำใหม่เมื่อรันด้วย --resume
+        if checkpoint.done("persist"):
+            checkpoint.finish()
+        completed = True
         return True, tyfcb_received, tyfcb_given_report
         
     except Exception as e:
         print(f"\nเกิดข้อผิดพลาดในโปรแกรม: {str(e)}")
-        if driver:
-            # driver.save_screenshot("error.png") # Disabled file save
-            pass
+        tracer.end_phase(status="error", error=e)
         return False, f"เกิดข้อผิดพลาด: {str(e)}", None
         
     finally:
+        # ปิด phase ที่ยังเปิดอยู่ของบัญชีนี้ - ไม่ให้ไปรวมกับเวลาของบัญชีถัดไปหรือหายจาก run report
+        tracer.end_phase(status="ok" if completed else "error")
         if driver:
+            # ภาพหน้าจอและ HTML บันทึกเฉพาะเมื่อล้มเหลว (เขียนไฟล์ใน thread เบื้องหลัง)
+            if not completed:
+                get_diagnostics().capture(driver, "scraper")
             print("\nกำลังปิดเบราว์เซอร์...")
-            try:
-                # driver.save_screenshot("final_screen.png") # Disabled file save
-                print("ข้ามการบันทึกภาพหน้าจอเพื่อลดการสร้างไฟล์ที่ไม่จำเป็น")
-            except:
-                pass
-            
-            print("\nกำลังปิด WebDriver...")
-            driver.quit()
+            # เก็บ Chrome ไว้ให้บัญชีถัดไป หรือปิดเมื่อครบจำนวน session / RSS เกิน / ล้มเหลว
+            browsers.release(healthy=completed)
+
+def commit_report_state(username, tyfcb_given_data, fingerprint_store=None):
+    """
+    จำแถวของรายงานรอบนี้ (fingerprint) และเวลารันสำเร็จไว้ใน .bni_state ของ runner นี้
+    เพื่อใช้เป็น baseline ของ delta และช่วงวันที่ในรอบถัดไป - ข้ามเมื่อไม่ได้รายงานครบปี
+
+    ต้องเรียกบน runner ที่ดึงรายงานเอง (runner ที่รวมผลในโหมด --queue ไม่ได้ใช้ baseline นี้)
+    และหลังจากผลถูกเก็บไว้อย่างปลอดภัยแล้วเท่านั้น (spool / Sheets / คิวที่ใช้ร่วมกัน)
+    """
+    if not tyfcb_given_data or not tyfcb_given_data.get("complete_history", True):
+        return
+    (fingerprint_store or ReportFingerprintStore()).commit(username, tyfcb_given_data["report_data"])
+    record_successful_run(username)
+
+def persist_results(results, commit_state=True):
+    """
+    บันทึกผลของหลายบัญชีลง Google Sheets ด้วยการเขียนชุดเดียว
+
+    ผลซ้ำของบัญชีเดียวกันใช้ผลล่าสุด (results เรียงจากเก่าไปใหม่) ทุกแถวถูกเก็บใน spool ก่อน
+    แล้วส่งไป Sheets ใน write_spooled_rows ครั้งเดียวตอน close_sheets_spool (batchUpdate ครั้งเดียว)
+    commit_state=False เมื่อผลมาจาก runner อื่น (โหมด --queue) - runner ที่ดึงรายงาน commit baseline เอง
+    คืนค่า list ของ username ที่บันทึกลง spool สำเร็จ
+    """
+    global _batch_sheet_writes
+    latest = {}
+    for result in results:
+        latest[account_key(result["username"])] = result
+    if not GOOGLE_SHEETS_AVAILABLE:
+        print("⚠️  Google Sheets ไม่พร้อมใช้งาน - ไม่บันทึกผลของบัญชีที่ดึงได้")
+        return []
+
+    print(f"\n=== บันทึกข้อมูล {len(latest)} บัญชีลง Google Sheets ===")
+    fingerprint_store = ReportFingerprintStore() if commit_state else None
+    saved = []
+    _batch_sheet_writes = True
+    try:
+        for result in latest.values():
+            tyfcb_given_data = result.get("tyfcb_given_data")
+            if not save_to_google_sheet(result["tyfcb_received"], tyfcb_given_data, result.get("dashboard_metrics"),
+                                        result["username"]):
+                continue
+            if commit_state:
+                commit_report_state(result["username"], tyfcb_given_data, fingerprint_store)
+            saved.append(result["username"])
+    finally:
+        _batch_sheet_writes = False
+    return saved
+
+def run_roster(shard=None, queue_path=None):
+    """
+    ดึงข้อมูลหลายบัญชีจาก roster (BNI_ACCOUNTS / BNI_ACCOUNTS_FILE) ใน process เดียว
+
+    shard=(i, n): ทำเฉพาะบัญชีของ shard นี้ แล้วบันทึกผลทั้งหมดลง Sheets ครั้งเดียว
+    queue_path: claim บัญชีจากคิว SQLite ที่ใช้ร่วมกับ runner อื่น (lease + heartbeat) -
+    runner ที่ทำให้คิวว่างเป็นผู้รวมผลของทุก runner และบันทึกลง Sheets ครั้งเดียว
+    ส่ง spool ไป Sheets (close_sheets_spool) ก่อนคืนค่า - คืนค่า False ถ้าส่งไม่ครบ
+    """
+    accounts = load_roster()
+    if not accounts:
+        print("❌ ไม่พบรายชื่อบัญชี - ตั้ง BNI_ACCOUNTS, BNI_ACCOUNTS_FILE หรือ BNI_USERNAME / BNI_PASSWORD")
+        return False
+    browsers = get_browser_manager()
+
+    if not queue_path:
+        index, count = shard
+        mine = shard_accounts(accounts, index, count)
+        print(f"🧩 Shard {index}/{count}: {len(mine)} จาก {len(accounts)} บัญชี")
+        results = []
+        failed = 0
+        for account in mine:
+            print(f"\n👤 บัญชี {account['username']}")
+            success, message, _ = login_and_get_tyfcb(account["username"], account["password"], collect=results)
+            if not success:
+                failed += 1
+                print(f"❌ {account['username']}: {message}")
+        browsers.close()
+        saved = persist_results(results)
+        flushed = close_sheets_spool()
+        return failed == 0 and len(saved) == len(results) and flushed
+
+    queue = LeaseQueue(queue_path)
+    batch = queue.seed([account["username"] for account in accounts])
+    passwords = {account_key(account["username"]): account["password"] for account in accounts}
+    print(f"🧩 คิว {queue_path} (รอบ {batch}) - runner {queue.owner}")
+    while True:
+        username = queue.claim()
+        if username is None:
+            break
+        password = passwords.get(account_key(username))
+        if not password:
+            queue.release(username, "ไม่มีรหัสผ่านของบัญชีนี้ใน roster ของ runner")
+            continue
+        print(f"\n👤 บัญชี {username}")
+        results = []
+        with queue.holding(username):
+            success, message, _ = login_and_get_tyfcb(username, password, collect=results)
+        if success and results:
+            queue.complete(username, results[-1])
+            # ผลอยู่ในคิวที่ใช้ร่วมกันแล้ว (runner ที่รวมผลจะเขียนลง Sheets) - baseline ของรอบถัดไป
+            # ต้องอยู่ใน .bni_state ของ runner ที่ดึงรายงานนี้ ไม่ใช่ของ runner ที่รวมผล
+            commit_report_state(username, results[-1].get("tyfcb_given_data"))
+        else:
+            print(f"❌ {username}: {message} - คืนบัญชีเข้าคิว")
+            queue.release(username, message)
+    browsers.close()
+
+    pending = queue.claim_merge()
+    counts = queue.counts()
+    print(f"📋 สถานะคิว: {counts}")
+    if pending is None:
+        print("ℹ️  ยังมีบัญชีที่ runner อื่นกำลังทำ (หรือกำลังรวมผล) - runner นั้นจะบันทึกผลลง Sheets")
+        return close_sheets_spool()
+    if not pending:
+        print("ℹ️  ผลของทุกบัญชีในรอบนี้ถูกบันทึกลง Sheets แล้ว")
+        queue.finish_merge([])
+        return close_sheets_spool() and not counts.get("failed")
+    saved = persist_results(pending, commit_state=False)
+    # ทำเครื่องหมายว่ารวมผลแล้วเฉพาะเมื่อแถวถึง Sheets จริง - ส่งไม่ครบให้ merge lease หมดอายุ
+    # แล้ว runner ถัดไปรวมผลใหม่ (แถวที่ค้างใน spool ถูกตรวจกับ Sheet ก่อนเขียนซ้ำ)
+    if not close_sheets_spool():
+        print("❌ ส่งผลที่รวมแล้วไป Sheets ไม่ครบ - ไม่ทำเครื่องหมายว่ารวมผลแล้ว")
+        return False
+    queue.finish_merge(saved)
+    return len(saved) == len(pending) and not counts.get("failed")
 
 def get_password_with_stars():
     """
@@ -934,6 +1549,34 @@ def save_report_to_excel(tyfcb_given_data, filename="tyfcb_given_report_export.x
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="ดึงข้อมูล TYFCB จาก BNI Connect Global")
+    parser.add_argument("--resume", action="store_true",
+                        help="รันต่อจากขั้นตอนแรกที่ยังไม่เสร็จของการรันก่อน (หรือ BNI_RESUME=true)")
+    parser.add_argument("--archive", action="store_true",
+                        help="ย้ายแถวเก่าใน Google Sheet ไปแท็บรายปี (ไม่ scrape)")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/n",
+                        help="ทำเฉพาะบัญชีส่วนที่ i จาก n ส่วนของรายชื่อใน BNI_ACCOUNTS / BNI_ACCOUNTS_FILE")
+    parser.add_argument("--queue", metavar="PATH",
+                        help="รับบัญชีจากคิว SQLite ที่ใช้ร่วมกับ runner อื่น แล้วรวมผลบันทึกลง Sheet ครั้งเดียว")
+    args = parser.parse_args()
+    if (args.shard or args.queue) and args.resume:
+        parser.error("--resume ใช้กับ --shard / --queue ไม่ได้ (คิวเก็บผลของบัญชีที่เสร็จแล้วไว้ให้อยู่แล้ว)")
+
+    if args.archive:
+        tracer = start_run("archive")
+        success = GOOGLE_SHEETS_AVAILABLE and archive_history_sheet()
+        tracer.finish("ok" if success else "error")
+        return success
+
+    if args.shard or args.queue:
+        if resume_requested():
+            print("ℹ️  ไม่ใช้ BNI_RESUME ในโหมดหลายบัญชี - ทุกบัญชีเริ่มใหม่")
+        tracer = start_run("scraper")
+        # run_roster ส่งแถวของทุกบัญชีที่อยู่ใน spool ไป Sheets ใน flush เดียวก่อนคืนค่า
+        success = run_roster(args.shard or (1, 1), args.queue)
+        tracer.finish("ok" if success else "error")
+        return success
+
     print("โปรแกรมดึงข้อมูล TYFCB Received และ TYFCB Given Report จาก BNI Connect Global")
     print("=" * 70)
 
@@ -951,7 +1594,16 @@ def main():
         print("ใช้รหัสผ่านจาก environment variable")
     
     print("\nกำลังดำเนินการ... โปรดรอสักครู่")
-    success, tyfcb_received, tyfcb_given_report = login_and_get_tyfcb(username, password)
+    tracer = start_run("scraper")
+    if GOOGLE_SHEETS_AVAILABLE:
+        # เริ่ม spool ตั้งแต่ต้น เพื่อส่งรายการที่ค้างจากการรันก่อนไปพร้อมกับการ scrape
+        get_sheets_spool()
+    success, tyfcb_received, tyfcb_given_report = login_and_get_tyfcb(
+        username, password, resume=resume_requested(args.resume))
+    close_browser_manager()
+    # แถวที่ค้างใน spool ส่งไม่ครบ = รอบนี้ล้มเหลว (รายการยังอยู่ใน spool ให้รอบถัดไปส่งต่อ)
+    flushed = close_sheets_spool()
+    tracer.finish("ok" if success and flushed else "error")
     
     print("\n" + "=" * 40)
     if success:
@@ -981,5 +1633,9 @@ def main():
         print("\nกด Enter เพื่อออกจากโปรแกรม...")
         input()
 
+    return success and flushed
+
 if __name__ == "__main__":
-     main()    
+    # exit code ไม่เป็น 0 เมื่อล้มเหลว เพื่อให้ workflow อัปโหลด diagnostics (if: failure())
+    sys.exit(0 if main() else 1)
+
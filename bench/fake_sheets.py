@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+Google Sheets ปลอมในหน่วยความจำ สำหรับ benchmark แบบ offline
+
+เลียนแบบเฉพาะ method ของ gspread ที่สคริปต์ใช้ และจำลอง latency ต่อ API call
+(ค่าเริ่มต้น 0 ms) พร้อมนับจำนวน call แยกตาม method เพื่อเทียบผลข้าม commit
+"""
+import csv
+import io
+import re
+import time
+from datetime import datetime, timedelta
+
+try:
+    from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+except ImportError:
+    class SpreadsheetNotFound(Exception):
+        pass
+
+    class WorksheetNotFound(Exception):
+        pass
+
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+
+def _col_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - 64)
+    return index
+
+
+def _parse_a1(label):
+    match = re.match(r"^([A-Za-z]+)(\d+)$", label)
+    return int(match.group(2)), _col_index(match.group(1))
+
+
+def _render(value, number_format):
+    """แปลงค่าเป็นข้อความแบบ FORMATTED_VALUE ของ Sheets"""
+    if value is None or value == "":
+        return ""
+    if number_format == "DATE_TIME" and isinstance(value, (int, float)):
+        return (SHEETS_EPOCH + timedelta(days=value)).strftime("%m/%d/%Y %H:%M:%S")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _numericise(value):
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return value
+    return value
+
+
+class _Cell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = []
+        self.formats = {}
+
+    def _call(self, name):
+        self.spreadsheet.client.record(name)
+
+    # ---- อ่าน ----
+    def _rendered_row(self, row_index):
+        row = self.rows[row_index]
+        return [_render(value, self.formats.get((row_index + 1, col + 1))) for col, value in enumerate(row)]
+
+    def row_values(self, row):
+        self._call("row_values")
+        if row > len(self.rows):
+            return []
+        return [value for value in self._rendered_row(row - 1)]
+
+    def col_values(self, col):
+        self._call("col_values")
+        return [self._rendered_row(i)[col - 1] if len(self.rows[i]) >= col else "" for i in range(len(self.rows))]
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        return [self._rendered_row(i) for i in range(len(self.rows))]
+
+    def get_values(self, range_name=None, value_render_option=None, **kwargs):
+        self._call("get_values")
+        if value_render_option == "UNFORMATTED_VALUE":
+            render = lambda i: list(self.rows[i])
+        else:
+            render = self._rendered_row
+        start, end = 1, len(self.rows)
+        match = re.match(r"^[A-Za-z]+(\d*):[A-Za-z]+(\d*)$", (range_name or "A:Z").split("!")[-1])
+        if match and match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), len(self.rows)) if match.group(2) else len(self.rows)
+        return [render(i) for i in range(start - 1, end)]
+
+    def get_all_records(self):
+        self._call("get_all_records")
+        if not self.rows:
+            return []
+        headers = self._rendered_row(0)
+        records = []
+        for i in range(1, len(self.rows)):
+            values = self._rendered_row(i)
+            values += [""] * (len(headers) - len(values))
+            records.append({header: _numericise(values[j]) for j, header in enumerate(headers)})
+        return records
+
+    def acell(self, label):
+        self._call("acell")
+        row, col = _parse_a1(label)
+        if row > len(self.rows) or col > len(self.rows[row - 1]):
+            return _Cell("")
+        return _Cell(self._rendered_row(row - 1)[col - 1])
+
+    @property
+    def row_count(self):
+        return max(len(self.rows), 1000)
+
+    # ---- เขียน ----
+    def insert_row(self, values, index=1):
+        self._call("insert_row")
+        self.rows.insert(index - 1, list(values))
+
+    def append_row(self, values, **kwargs):
+        self._call("append_row")
+        self.rows.append(list(values))
+        return {"updates": {"updatedRange": f"'{self.title}'!A{len(self.rows)}"}}
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        start = len(self.rows) + 1
+        self.rows.extend(list(row) for row in values)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{start}:A{len(self.rows)}"}}
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        while len(self.rows) < row:
+            self.rows.append([])
+        target = self.rows[row - 1]
+        target += [""] * (col - len(target))
+        target[col - 1] = value
+
+    def _write(self, range_name, values):
+        row, col = _parse_a1(range_name.split(":")[0].split("!")[-1])
+        for offset, new_row in enumerate(values or []):
+            for col_offset, value in enumerate(new_row):
+                while len(self.rows) < row + offset:
+                    self.rows.append([])
+                target = self.rows[row + offset - 1]
+                target += [""] * (col + col_offset - len(target))
+                target[col + col_offset - 1] = value
+
+    def _write_cells(self, row, col, row_data):
+        """เขียน RowData ของ batchUpdate (userEnteredValue / numberFormat) เริ่มที่ (row, col)"""
+        for offset, data in enumerate(row_data):
+            for col_offset, cell in enumerate(data.get("values", [])):
+                value = next(iter(cell.get("userEnteredValue", {"stringValue": ""}).values()))
+                while len(self.rows) < row + offset:
+                    self.rows.append([])
+                target = self.rows[row + offset - 1]
+                target += [""] * (col + col_offset - len(target))
+                target[col + col_offset - 1] = value
+                number_format = cell.get("userEnteredFormat", {}).get("numberFormat", {}).get("type")
+                if number_format:
+                    self.formats[(row + offset, col + col_offset)] = number_format
+
+    def update(self, range_name, values=None, **kwargs):
+        self._call("update")
+        self._write(range_name, values)
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        for item in data:
+            self._write(item["range"], item["values"])
+
+    def format(self, range_name, cell_format):
+        self._call("format")
+        number_format = cell_format.get("numberFormat", {}).get("type")
+        first, _, last = range_name.partition(":")
+        row_start, col_start = _parse_a1(first)
+        row_end, col_end = _parse_a1(last) if last else (row_start, col_start)
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                self.formats[(row, col)] = number_format
+
+    def delete_rows(self, start_index, end_index=None):
+        self._call("delete_rows")
+        end_index = end_index or start_index
+        del self.rows[start_index - 1:end_index]
+        # ตำแหน่ง format ของแถวที่อยู่ถัดไปเลื่อนขึ้นตาม
+        shift = end_index - start_index + 1
+        self.formats = {
+            (row - shift if row > end_index else row, col): fmt
+            for (row, col), fmt in self.formats.items()
+            if not (start_index <= row <= end_index)
+        }
+
+    def clear(self):
+        self._call("clear")
+        self.rows = []
+        self.formats = {}
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title, key):
+        self.client = client
+        self.title = title
+        self.id = key
+        self._worksheets = [FakeWorksheet(self, "Sheet1", 0)]
+
+    @property
+    def sheet1(self):
+        self.client.record("sheet1")
+        return self._worksheets[0]
+
+    def worksheets(self):
+        self.client.record("worksheets")
+        return list(self._worksheets)
+
+    def _find(self, title):
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def worksheet(self, title):
+        self.client.record("worksheet")
+        return self._find(title)
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.client.record("add_worksheet")
+        worksheet = FakeWorksheet(self, title, len(self._worksheets))
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def _by_id(self, sheet_id):
+        return next(ws for ws in self._worksheets if ws.id == sheet_id)
+
+    def batch_update(self, body):
+        """
+        รองรับ deleteDimension ของแถว (bni/archive.py), appendCells และ updateCells (write_spooled_rows)
+        ทุก request ในชุดถูกตรวจก่อนเขียน เหมือน Sheets ที่ทำทั้งชุดหรือไม่ทำเลย
+        """
+        self.client.record("batch_update")
+        requests = body.get("requests", [])
+        for request in requests:
+            (kind, params), = request.items()
+            if kind not in ("deleteDimension", "appendCells", "updateCells"):
+                raise ValueError(f"fake batch_update ไม่รองรับ {kind}")
+        for request in requests:
+            (kind, params), = request.items()
+            if kind == "deleteDimension":
+                target = params["range"]
+                self._by_id(target["sheetId"]).delete_rows(target["startIndex"] + 1, target["endIndex"])
+            elif kind == "appendCells":
+                worksheet = self._by_id(params["sheetId"])
+                while worksheet.rows and not any(value != "" for value in worksheet.rows[-1]):
+                    worksheet.rows.pop()
+                worksheet._write_cells(len(worksheet.rows) + 1, 1, params["rows"])
+            else:
+                start = params["start"]
+                self._by_id(start["sheetId"])._write_cells(start["rowIndex"] + 1, start["columnIndex"] + 1,
+                                                           params["rows"])
+
+    def values_batch_update(self, body):
+        self.client.record("values_batch_update")
+        for item in body.get("data", []):
+            sheet_title, _, cell_range = item["range"].rpartition("!")
+            worksheet = self._find(sheet_title.strip("'")) if sheet_title else self._worksheets[0]
+            worksheet._write(cell_range, item["values"])
+
+
+class _CsvExportStream(io.RawIOBase):
+    """CSV export ของ worksheet ที่สร้างทีละแถวเมื่อถูกอ่าน (ไม่สร้างทั้งไฟล์ในหน่วยความจำ)"""
+
+    def __init__(self, worksheet):
+        self._lines = (self._encode(worksheet._rendered_row(i)) for i in range(len(worksheet.rows)))
+        self._buffer = b""
+        self.decode_content = False
+
+    @staticmethod
+    def _encode(values):
+        line = io.StringIO()
+        csv.writer(line, lineterminator="\r\n").writerow(values)
+        return line.getvalue().encode("utf-8")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._buffer) < len(buffer):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class _CsvExportResponse:
+    status_code = 200
+
+    def __init__(self, worksheet):
+        self.raw = _CsvExportStream(worksheet)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.raw.close()
+
+
+class _FakeSession:
+    """HTTP session ปลอมที่ตอบเฉพาะ CSV export (docs.google.com/spreadsheets/d/<key>/export?gid=<id>)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, url, **kwargs):
+        self.client.record("csv_export")
+        match = re.search(r"/d/([^/]+)/export\?.*gid=(\d+)", url)
+        spreadsheet = self.client._by_key[match.group(1)]
+        worksheet = next(ws for ws in spreadsheet._worksheets if str(ws.id) == match.group(2))
+        return _CsvExportResponse(worksheet)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+class FakeSheetsClient:
+    """client ปลอมที่มี spreadsheet ตามชื่อ/ID ที่ลงทะเบียนไว้"""
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.calls = {}
+        self._by_title = {}
+        self._by_key = {}
+        self.session = _FakeSession(self)
+
+    def record(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def create(self, title, key=None):
+        key = key or f"fake-{len(self._by_key) + 1}"
+        spreadsheet = FakeSpreadsheet(self, title, key)
+        self._by_title[title] = spreadsheet
+        self._by_key[key] = spreadsheet
+        return spreadsheet
+
+    def add_key(self, key, spreadsheet):
+        """ให้เปิด spreadsheet เดิมด้วย ID อื่นได้ (เช่น sheet_id ที่ฝังไว้ในสคริปต์)"""
+        self._by_key[key] = spreadsheet
+
+    def open(self, title):
+        self.record("open")
+        if title not in self._by_title:
+            raise SpreadsheetNotFound(title)
+        return self._by_title[title]
+
+    def open_by_key(self, key):
+        self.record("open_by_key")
+        if key not in self._by_key:
+            raise SpreadsheetNotFound(key)
+        return self._by_key[key]
+
+
+def seed_history(worksheet, rows, users=("Bench User",), days=730):
+    """เติมแถวประวัติแบบเดียวกับที่ save_to_google_sheet เขียน (Timestamp เป็น serial number)"""
+    worksheet.rows = [[
+        "Timestamp", "TYFCB Received", "Running User", "Chapter", "Total Given Amount", "Records Count"
+    ]]
+    worksheet.formats = {}
+    now = datetime(2026, 10, 19, 9, 0, 0)
+    for i in range(rows):
+        when = now - timedelta(days=days * (rows - i) / max(rows, 1))
+        serial = (when - SHEETS_EPOCH).total_seconds() / 86400
+        worksheet.rows.append([
+            serial, 1000000 + i * 1000, users[i % len(users)], "Bench Chapter", 500000 + i * 10, 25
+        ])
+        worksheet.formats[(i + 2, 1)] = "DATE_TIME"
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+HTML fixtures ที่จำลองหน้า BNI Connect และ Google Form
+
+โครงสร้าง HTML ถอดแบบจากหน้าจริงเฉพาะส่วนที่สคริปต์ใช้ (XPath/CSS selector เดียวกัน)
+- หน้า login, dashboard (Lifetime, TYFCB Received, ปุ่ม Review และ popup ที่มีปุ่ม Go)
+- รายงาน TYFCB Given แบบ BIRT ใน iframe ซ้อน 2 ชั้น (params_1/2/5 และตาราง __bookmark_3)
+- Google Form 2 หน้า (ปุ่ม Next jsname=OCpkoe, ช่อง data-params, ปุ่ม Submit)
+
+ข้อมูลในตารางสร้างแบบ deterministic (seed คงที่) เพื่อให้เทียบผลข้าม commit ได้
+"""
+import html
+import random
+from datetime import datetime, timedelta
+
+REPORT_SIZES = (10, 100, 1000, 10000)
+
+MEMBERS = [
+    "Somchai Jaidee", "Suda Rattanakul", "Anan Wongsa", "Pim Chaiyaporn",
+    "Niran Thongdee", "Kanya Srisuk", "Wichai Boonmee", "Malee Prasert",
+]
+
+
+def report_rows(count, seed=42):
+    """สร้างแถวรายงาน TYFCB Given จำนวน count แถว (เรียงจากใหม่ไปเก่า)"""
+    rng = random.Random(seed)
+    start = datetime(2026, 10, 1)
+    rows = []
+    for i in range(count):
+        day = start - timedelta(days=i * 365 // max(count, 1))
+        rows.append({
+            "date": day.strftime("%m/%d/%Y"),
+            "thank_you_to": rng.choice(MEMBERS),
+            "amount": f"{rng.randint(1, 500) * 1000:,}",
+            "new_repeat": rng.choice(["New", "Repeat"]),
+            "inside_outside": rng.choice(["Inside", "Outside"]),
+            "comments": f"Job #{i + 1}",
+            "status": "Approved",
+        })
+    return rows
+
+
+def login_page():
+    return """<!DOCTYPE html>
+<html><body>
+<form action="/web/dashboard" method="get">
+  <input name="username" type="text">
+  <input name="password" type="password">
+  <button type="submit">Login</button>
+</form>
+</body></html>"""
+
+
+def dashboard_page(rows=100, received="฿ 1,234,567"):
+    return f"""<!DOCTYPE html>
+<html><body>
+<div class="MuiBox-root">
+  <p isbackground="true">Lifetime</p>
+  <p>This Year</p>
+</div>
+<div class="MuiBox-root tile">
+  <p>TYFCB Received</p>
+  <span>{html.escape(received)}</span>
+</div>
+<div class="MuiBox-root tile"><p>Referrals Given</p><span>42</span></div>
+<div class="MuiBox-root tile"><p>Referrals Received</p><span>37</span></div>
+<div class="MuiBox-root tile"><p>Visitors</p><span>12</span></div>
+<div class="MuiBox-root tile"><p>One to Ones</p><span>55</span></div>
+<div class="MuiBox-root tile"><p>CEU</p><span>30</span></div>
+<div class="MuiBox-root tile">
+  <p>TYFCB Given</p>
+  <span>฿ 890,000</span>
+  <div class="MuiBox-root css-13xuqvq" onclick="openReview()">Review</div>
+</div>
+<div id="dialog" role="dialog" style="display:none">
+  <input type="text" name="from">
+  <input type="text" name="to">
+  <button class="MuiButton-contained" onclick="showReport()">Go</button>
+</div>
+<div id="report"></div>
+<script>
+function openReview() {{ document.getElementById('dialog').style.display = 'block'; }}
+function showReport() {{
+  document.getElementById('dialog').style.display = 'none';
+  document.getElementById('report').innerHTML =
+    '<iframe src="/report_outer.html?rows={rows}" width="1200" height="800"></iframe>';
+}}
+</script>
+</body></html>"""
+
+
+def report_outer_page(rows):
+    return f"""<!DOCTYPE html>
+<html><body>
+<iframe src="/report_inner.html?rows={rows}" width="1180" height="780"></iframe>
+</body></html>"""
+
+
+def report_inner_page(rows, seed=42):
+    """รายงาน BIRT ที่มี params และตาราง __bookmark_3 ตามจำนวนแถวที่กำหนด"""
+    data = report_rows(rows, seed)
+    total = sum(int(row["amount"].replace(",", "")) for row in data)
+    body_rows = "\n".join(
+        "<tr>" + "".join(f"<td>{html.escape(row[key])}</td>" for key in (
+            "date", "thank_you_to", "amount", "new_repeat", "inside_outside", "comments", "status"
+        )) + "</tr>"
+        for row in data
+    )
+    return f"""<!DOCTYPE html>
+<html><body>
+<div class="reporttoolbar"><a>Export</a> <a>Export without Headers</a></div>
+<div>Running User</div><div id="params_1">Bench User</div>
+<div>Run At</div><div id="params_2">10/19/2026 09:00</div>
+<div>Chapter</div><div id="params_5">Bench Chapter</div>
+<table id="__bookmark_3">
+<tr><th>Date</th><th>Thank you to</th><th>Amount</th><th>New/Repeat</th><th>Inside/Outside</th><th>Comments</th><th>Status</th></tr>
+{body_rows}
+<tr id="total_row"><td></td><td>Total</td><td>{total:,}</td><td></td><td></td><td></td><td></td></tr>
+</table>
+</body></html>"""
+
+
+def form_page():
+    """Google Form 2 หน้า - หน้าแรกมีปุ่ม Next, หน้าที่สองมีช่องที่ prefill และปุ่ม Submit"""
+    return """<!DOCTYPE html>
+<html><body>
+<div id="page1">
+  <p>BNI Weekly Form</p>
+  <div role="button" jsname="OCpkoe" onclick="nextPage()"><span>Next</span></div>
+</div>
+<div id="page2" style="display:none">
+  <input type="text" data-params="%.@.[683444359]" value="">
+  <input type="text" data-params="%.@.[290745485]" value="">
+  <div role="button" onclick="location.href='/formResponse'"><span>Submit</span></div>
+</div>
+<script>
+const params = new URLSearchParams(location.search);
+function nextPage() {
+  document.getElementById('page1').style.display = 'none';
+  document.getElementById('page2').style.display = 'block';
+  const inputs = document.querySelectorAll('#page2 input');
+  inputs[0].value = params.get('entry.683444359') || '';
+  inputs[1].value = params.get('entry.290745485') || '';
+}
+</script>
+</body></html>"""
+
+
+def form_response_page():
+    return "<!DOCTYPE html><html><body><p>Your response has been recorded.</p></body></html>"
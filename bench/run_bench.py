@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark แบบ offline สำหรับวัดประสิทธิภาพของสคริปต์ BNI โดยไม่ต้องใช้บัญชีจริงหรือ network
+
+ใช้งาน:
+    python -m bench.run_bench                    # รันทุกชุด (ข้าม Selenium ถ้าไม่มี Chrome)
+    python -m bench.run_bench --only sheets      # เฉพาะชุดที่ชื่อขึ้นต้นด้วย sheets
+    python -m bench.run_bench --compare bench/results/abc1234.json
+
+ผลลัพธ์บันทึกไว้ที่ bench/results/<commit>.json เพื่อเทียบข้าม commit
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench import fixtures
+from bench.fake_sheets import FakeSheetsClient, seed_history
+from bni.latest_index import latest_by_user, write_latest_tab
+from bni.script_loader import load_script
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+HISTORY_SIZES = (1000, 10000, 100000)
+
+
+class _NoSleepTime:
+    """แทนที่ module time ในสคริปต์ เพื่อไม่ให้ time.sleep ที่รอหน้าเว็บบิดผลการวัด"""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def measure(func, repeat):
+    """รัน func ซ้ำ repeat ครั้ง คืนค่าสถิติเวลา (วินาที) และผลลัพธ์ครั้งสุดท้าย"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_s": round(statistics.median(timings), 6),
+        "min_s": round(min(timings), 6),
+        "repeat": repeat,
+    }, result
+
+
+def peak_memory_mib(func):
+    """หน่วยความจำ Python สูงสุดระหว่างรัน func หนึ่งครั้ง (MiB, วัดด้วย tracemalloc)"""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        tracemalloc.stop()
+
+
+# ---------------------------------------------------------------- Sheets
+
+def bench_sheets(args, results):
+    scraper = load_script("scraper")
+    monitor_module = load_script("monitor")
+    form_module = load_script("form")
+    sheet_name = os.getenv("GOOGLE_SHEET_NAME", "BNI TYFCB Data")
+
+    # เส้นทางเขียน: save_to_google_sheet หนึ่งแถว
+    client = FakeSheetsClient(latency_ms=args.sheets_latency_ms)
+    spreadsheet = client.create(sheet_name)
+    seed_history(spreadsheet.sheet1, 1000)
+    scraper.setup_google_sheets = lambda: client
+    given = {"running_user": "Bench User", "chapter": "Bench Chapter", "total_amount": "890,000",
+             "report_data": fixtures.report_rows(25)}
+
+    # เวลาบน critical path (บันทึกลง spool) แยกจากเวลาที่ส่งไป Sheets เบื้องหลัง
+    os.environ["FORCE_WRITE"] = "true"
+    client.calls.clear()
+    stats, _ = measure(lambda: scraper.save_to_google_sheet("฿ 1,234,567", given), args.repeat)
+    flush_start = time.perf_counter()
+    scraper.close_sheets_spool()
+    stats["flush_s"] = round(time.perf_counter() - flush_start, 6)
+    stats["sheets_calls"] = client.total_calls / args.repeat
+    results["sheets_write"] = stats
+
+    os.environ["FORCE_WRITE"] = "false"
+    client.calls.clear()
+    stats, _ = measure(lambda: scraper.save_to_google_sheet("฿ 1,234,567", given), args.repeat)
+    stats["sheets_calls"] = client.total_calls / args.repeat
+    results["sheets_write_unchanged"] = stats
+
+    # เส้นทางอ่าน: monitor และการหาค่าล่าสุดของ form bot - อ่านจาก Sheet เสมอ (ไม่ใช้ handoff ของ scraper)
+    # วัดทั้ง CSV export แบบ stream (ค่าเริ่มต้น), get_all_records (_records) และแท็บ TYFCB Latest (_index)
+    # พร้อมหน่วยความจำสูงสุด
+    os.environ["BNI_HANDOFF"] = "false"
+    for size in HISTORY_SIZES:
+        client = FakeSheetsClient(latency_ms=args.sheets_latency_ms)
+        spreadsheet = client.create(sheet_name)
+        seed_history(spreadsheet.sheet1, size, users=("Bench User", "Second User"))
+
+        monitor = monitor_module.BNIDataMonitor()
+        monitor.setup_google_sheets = lambda: client
+        automation = form_module.GoogleFormSeleniumAutomation()
+        client.add_key(automation.sheet_id, spreadsheet)
+        automation.setup_google_sheets_client = lambda: client
+
+        for reader, suffix in (("csv", ""), ("records", "_records")):
+            os.environ["SHEETS_READER"] = reader
+            for name, func in (("sheets_monitor_scan", monitor.get_current_sheet_data),
+                               ("sheets_latest_lookup", automation.get_latest_tyfcb_received)):
+                client.calls.clear()
+                stats, _ = measure(func, args.repeat)
+                stats["sheets_calls"] = client.total_calls / args.repeat
+                stats["peak_mib"] = peak_memory_mib(func)
+                results[f"{name}{suffix}_{size}"] = stats
+
+        # แท็บ TYFCB Latest (หนึ่งแถวต่อ Running User) ที่ฝั่งเขียนดูแล
+        history = spreadsheet.sheet1.get_values(value_render_option="UNFORMATTED_VALUE")
+        write_latest_tab(spreadsheet, latest_by_user(enumerate(history[1:], start=2)))
+        for name, func in (("sheets_monitor_scan", monitor.get_current_sheet_data),
+                           ("sheets_latest_lookup", automation.get_latest_tyfcb_received)):
+            client.calls.clear()
+            stats, _ = measure(func, args.repeat)
+            stats["sheets_calls"] = client.total_calls / args.repeat
+            stats["peak_mib"] = peak_memory_mib(func)
+            results[f"{name}_index_{size}"] = stats
+    os.environ.pop("SHEETS_READER", None)
+    os.environ.pop("BNI_HANDOFF", None)
+
+
+# ---------------------------------------------------------------- Parse
+
+def parse_with_bs4(page_html):
+    """baseline: BeautifulSoup (html.parser) แบบ serial"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_html, "html.parser")
+    result = {key: "" for key in ("running_user", "run_at", "chapter")}
+    for param_id, key in (("params_1", "running_user"), ("params_2", "run_at"), ("params_5", "chapter")):
+        found = soup.find("div", id=param_id)
+        if found:
+            result[key] = found.get_text(strip=True)
+    rows, total = [], []
+    for index, row in enumerate(soup.find("table", id="__bookmark_3").find_all("tr")):
+        if index == 0 or row.find("th"):
+            continue
+        cells = [cell.get_text(strip=True) for cell in row.find_all("td")]
+        if "total_row" in (row.get("id") or "") or "Total" in cells:
+            total = cells
+        elif len(cells) >= 6:
+            rows.append(cells)
+    result.update(rows=rows, total=total)
+    return result
+
+
+def bench_parse(args, results):
+    from bni.parse_pool import parse_reports
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus})
+    for size in args.parse_sizes:
+        page = fixtures.report_inner_page(size)
+        for reports in args.parse_reports:
+            pages = [page] * reports
+            total_rows = size * reports
+
+            stats, parsed = measure(lambda: [parse_with_bs4(p) for p in pages], args.repeat)
+            stats["rows_per_s"] = round(total_rows / stats["median_s"])
+            results[f"parse_bs4_serial_{size}x{reports}"] = stats
+
+            for workers in worker_counts:
+                if workers > 1 and reports == 1:
+                    continue
+                stats, parsed = measure(lambda: parse_reports(pages, workers=workers), args.repeat)
+                stats["rows_per_s"] = round(total_rows / stats["median_s"])
+                stats["rows"] = sum(len(result["rows"]) for result in parsed)
+                results[f"parse_lxml_w{workers}_{size}x{reports}"] = stats
+
+    # เส้นทางที่ get_tyfcb_given_report_data ใช้จริง: page_source -> lxml -> records
+    from bni.birt import parse_birt_report, rows_to_records
+
+    for size in args.extract_sizes:
+        page = fixtures.report_inner_page(size)
+        stats, records = measure(lambda: rows_to_records(parse_birt_report(page)["rows"]), args.repeat)
+        stats["rows_per_s"] = round(size / stats["median_s"])
+        stats["rows"] = len(records)
+        results[f"parse_given_extract_{size}"] = stats
+
+    # สแกนคอลัมน์ Timestamp / ยอดเงินของ Sheet (รูปแบบ d/m/Y ต้องลอง strptime หลายรูปแบบถ้าไม่จำไว้)
+    from bni.parsing import TimestampParser, parse_amount
+
+    for size in args.extract_sizes:
+        timestamps = [f"{day % 28 + 1:02d}/10/2025 10:{day % 60:02d}:00" for day in range(size)]
+        amounts = [f"฿ {row['amount']}" for row in fixtures.report_rows(size)]
+
+        def scan():
+            parser = TimestampParser()
+            return sum(1 for value in timestamps if parser.parse(value)), sum(parse_amount(value, 0) for value in amounts)
+
+        stats, (parsed, _) = measure(scan, args.repeat)
+        stats["rows_per_s"] = round(size / stats["median_s"])
+        stats["rows"] = parsed
+        results[f"parse_sheet_scan_{size}"] = stats
+
+    # กรองข้อมูลใหม่ของ BNIDataMonitor: serial number ปนกับข้อความวันที่ เทียบ mask ของ pandas กับทีละแถว
+    from datetime import datetime, timedelta
+
+    from bni.parsing import recent_mask, sheets_serial
+
+    now = datetime.now()
+    for size in args.recency_sizes:
+        moments = [now - timedelta(hours=hour % (24 * 30)) for hour in range(size)]
+        values = [sheets_serial(moment) if index % 2 else moment.strftime("%d/%m/%Y %H:%M:%S")
+                  for index, moment in enumerate(moments)]
+
+        def per_row():
+            parser = TimestampParser()
+            cutoff = now - timedelta(days=7)
+            return [(parsed is not None and parsed >= cutoff) for parsed in map(parser.parse, values)]
+
+        for name, func in (("per_row", per_row), ("mask", lambda: recent_mask(values, 7, now))):
+            stats, mask = measure(func, args.repeat)
+            stats["rows_per_s"] = round(size / stats["median_s"])
+            stats["recent"] = sum(mask)
+            results[f"parse_recency_{name}_{size}"] = stats
+
+
+# ---------------------------------------------------------------- Selenium
+
+def _headless_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    for argument in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage",
+                     "--disable-gpu", "--window-size=1920,1080"):
+        options.add_argument(argument)
+    return webdriver.Chrome(options=options)
+
+
+def bench_selenium(args, results):
+    from bench.server import FixtureServer
+
+    try:
+        driver = _headless_driver()
+    except Exception as e:
+        print(f"⚠️  ข้ามชุด Selenium (เปิด Chrome ไม่ได้): {e}")
+        results["selenium_skipped"] = str(e)
+        return
+
+    scraper = load_script("scraper")
+    integrated = load_script("integrated")
+    form_module = load_script("form")
+    for module in (scraper, integrated, form_module):
+        module.time = _NoSleepTime()
+
+    try:
+        with FixtureServer() as server:
+            os.environ["BNI_BASE_URL"] = server.base_url
+            os.environ["GOOGLE_FORM_URL"] = f"{server.base_url}/viewform"
+
+            # ดึงข้อมูลรายงานจาก iframe ซ้อน ตามจำนวนแถว
+            for size in args.report_sizes:
+                def extract():
+                    driver.get(f"{server.base_url}/report_outer.html?rows={size}")
+                    return scraper.get_tyfcb_given_report_data(driver)
+                stats, data = measure(extract, args.repeat)
+                stats["rows"] = len(data["report_data"])
+                results[f"selenium_report_extract_{size}"] = stats
+
+            # รายงานหลายประเภท: เปลี่ยน src ของ iframe เดิม เทียบกับเปิด dashboard -> รายงานใหม่ทุกครั้ง
+            # (ในการรันจริงแต่ละรอบ Review -> Go ยังมี time.sleep คงที่อีกหลายวินาทีที่ไม่ได้นับในนี้)
+            from bni.report_crawler import ReportCrawler
+
+            crawl_size = args.report_sizes[0]
+            reports = {name: {"params": {"rows": crawl_size}} for name in
+                       ("tyfcb_given", "tyfcb_received", "referrals_given", "referrals_received")}
+
+            def separate_flows():
+                rows = 0
+                for _ in reports:
+                    driver.get(f"{server.base_url}/web/dashboard")
+                    driver.get(f"{server.base_url}/report_outer.html?rows={crawl_size}")
+                    rows += len(scraper.get_tyfcb_given_report_data(driver)["report_data"])
+                return rows
+
+            def crawl():
+                driver.get(f"{server.base_url}/report_outer.html?rows={crawl_size}")
+                return sum(len(data["rows"]) for _, data in ReportCrawler(driver, poll=0.05).crawl(reports))
+
+            for name, func in (("separate", separate_flows), ("crawler", crawl)):
+                stats, rows = measure(func, args.repeat)
+                stats.update(reports=len(reports), rows=rows)
+                results[f"selenium_reports_{name}_{crawl_size}"] = stats
+
+            # อ่านทุก metric บน dashboard ใน execute_script ครั้งเดียว
+            from bni.dashboard import read_dashboard_snapshot
+
+            driver.get(f"{server.base_url}/web/dashboard")
+            stats, (metrics, _) = measure(lambda: read_dashboard_snapshot(driver), args.repeat)
+            stats["metrics_found"] = sum(1 for value in metrics.values() if value is not None)
+            results["selenium_dashboard_snapshot"] = stats
+
+            # ดึง TYFCB Received จาก dashboard
+            automation = integrated.BNIIntegratedAutomation()
+            automation.driver = driver
+            stats, outcome = measure(automation.get_tyfcb_received_from_bni, args.repeat)
+            stats["ok"] = bool(outcome and outcome[0])
+            results["selenium_dashboard_extract"] = stats
+
+            # กรอกและส่ง Google Form 2 หน้า (ใช้ driver เดียวกัน)
+            automation.form_url = os.environ["GOOGLE_FORM_URL"]
+            stats, outcome = measure(lambda: automation.submit_to_google_form("1,234,567"), args.repeat)
+            stats["ok"] = bool(outcome)
+            results["selenium_form_submit"] = stats
+    finally:
+        driver.quit()
+
+
+# ---------------------------------------------------------------- imports
+
+def _import_command(code):
+    """รัน python -c code ใน process ใหม่ (วัดเวลา import แบบ cold ของแต่ละคำสั่ง)"""
+    return subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL).returncode == 0
+
+
+def bench_imports(args, results):
+    """เวลาเริ่มต้นของแต่ละคำสั่ง (python -m bni <คำสั่ง>) ก่อนเริ่มทำงานจริง"""
+    from bni.cli import COMMANDS
+
+    stats, ok = measure(lambda: _import_command("pass"), args.repeat)
+    stats["ok"] = ok
+    results["import_python"] = stats
+
+    stats, ok = measure(lambda: _import_command("import bni.cli"), args.repeat)
+    stats["ok"] = ok
+    results["import_cli"] = stats
+
+    for command, (script, _, script_args) in COMMANDS.items():
+        if script is None or script_args:
+            continue
+        code = f"from bni.script_loader import load_script; load_script({script!r})"
+        stats, ok = measure(lambda: _import_command(code), args.repeat)
+        stats["ok"] = ok
+        results[f"import_{command}"] = stats
+
+
+# ---------------------------------------------------------------- main
+
+SUITES = {
+    "sheets": bench_sheets,
+    "parse": bench_parse,
+    "selenium": bench_selenium,
+    "imports": bench_imports,
+}
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n📊 เทียบกับ {baseline.get('commit')} ({baseline_path})")
+    print(f"   {'benchmark':<36} {'ก่อน (s)':>12} {'หลัง (s)':>12} {'เปลี่ยน':>9}")
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not isinstance(stats, dict) or not isinstance(before, dict):
+            continue
+        old, new = before["median_s"], stats["median_s"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"   {name:<36} {old:>12.4f} {new:>12.4f} {change:>+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark ของสคริปต์ BNI")
+    parser.add_argument("--only", help="รันเฉพาะชุดที่ชื่อขึ้นต้นด้วยค่านี้ (sheets, parse, selenium, imports)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sheets-latency-ms", type=float, default=0.0,
+                        help="latency จำลองต่อ Sheets API call")
+    parser.add_argument("--report-sizes", type=int, nargs="+", default=list(fixtures.REPORT_SIZES))
+    parser.add_argument("--recency-sizes", type=int, nargs="+", default=[100000],
+                        help="จำนวนแถวของคอลัมน์ Timestamp ในชุด parse")
+    parser.add_argument("--parse-sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="จำนวนแถวต่อรายงานของชุด parse")
+    parser.add_argument("--parse-reports", type=int, nargs="+", default=[1, 4, 16],
+                        help="จำนวนรายงานต่อรอบของชุด parse")
+    parser.add_argument("--extract-sizes", type=int, nargs="+", default=[10000, 50000],
+                        help="จำนวนแถวของรายงาน TYFCB Given สำหรับวัด extractor")
+    parser.add_argument("--output", help="ไฟล์ผลลัพธ์ (ค่าเริ่มต้น bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="ไฟล์ผลลัพธ์ของ commit อื่นที่ต้องการเทียบ")
+    args = parser.parse_args(argv)
+
+    # แยก state ของ benchmark ออกจาก state จริง
+    os.environ["BNI_STATE_DIR"] = tempfile.mkdtemp(prefix="bni-bench-")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "run_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": {},
+    }
+
+    for name, suite in SUITES.items():
+        if args.only and not name.startswith(args.only):
+            continue
+        print(f"\n🏁 รันชุด {name}...")
+        suite(args, report["results"])
+
+    print("\n⏱️  ผล benchmark:")
+    for name, stats in report["results"].items():
+        if isinstance(stats, dict):
+            extra = ", ".join(f"{k}={v}" for k, v in stats.items() if k not in ("median_s", "min_s", "repeat"))
+            print(f"   {name:<36} {stats['median_s']:>10.4f} s  {extra}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 บันทึกผลไว้ที่ {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP server ภายในเครื่องสำหรับเสิร์ฟ fixtures ของ benchmark
+
+เส้นทาง:
+- /login, /web/dashboard?rows=N        หน้า BNI Connect
+- /report_outer.html?rows=N            iframe ชั้นนอกของรายงาน
+- /report_inner.html?rows=N            รายงาน BIRT (iframe ชั้นใน)
+- /viewform, /formResponse             Google Form
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bench import fixtures
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # ให้ dashboard ใช้จำนวนแถวตามที่ benchmark ตั้งไว้ (ถ้าไม่ได้ระบุใน URL)
+    default_rows = 100
+
+    def _rows(self, query):
+        try:
+            return int(query.get("rows", [self.default_rows])[0])
+        except ValueError:
+            return self.default_rows
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+
+        pages = {
+            "/login": fixtures.login_page,
+            "/web/dashboard": lambda: fixtures.dashboard_page(self._rows(query)),
+            "/report_outer.html": lambda: fixtures.report_outer_page(self._rows(query)),
+            "/report_inner.html": lambda: fixtures.report_inner_page(self._rows(query)),
+            "/viewform": fixtures.form_page,
+            "/formResponse": fixtures.form_response_page,
+        }
+        page = pages.get(path)
+        if page is None:
+            self.send_error(404)
+            return
+
+        body = page().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # ไม่พิมพ์ access log ระหว่างวัดเวลา
+        pass
+
+
+class FixtureServer:
+    """เปิด server บน port ว่างของ localhost ใช้กับ with-statement ได้"""
+
+    def __init__(self, default_rows=100):
+        handler = type("Handler", (FixtureHandler,), {"default_rows": default_rows})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_default_rows(self, rows):
+        self.httpd.RequestHandlerClass.default_rows = rows
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
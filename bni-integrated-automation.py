@@ -8,9 +8,10 @@
 
 import time
 import os
+import sys
 import getpass
+import argparse
 import json
-import re
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -19,22 +20,34 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
-from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
 
+from bni.browser import apply_low_memory_options
+from bni.checkpoint import RunCheckpoint, resume_requested
+from bni.diagnostics import get_diagnostics
+from bni.parsing import amount_text
+from bni.selector_cache import SelectorRegistry, heuristic
+from bni.tracing import start_run, traced, instrument_driver
+
+# ขั้นตอนของการรัน ตามลำดับ - checkpoint บันทึกหลังแต่ละขั้นตอน
+INTEGRATED_STAGES = ("login", "dashboard", "submit")
+
 class BNIIntegratedAutomation:
     def __init__(self):
         # BNI Connect settings
-        self.bni_login_url = "https://www.bniconnectglobal.com/login"
-        self.bni_dashboard_url = "https://www.bniconnectglobal.com/web/dashboard"
+        bni_base_url = os.getenv('BNI_BASE_URL', 'https://www.bniconnectglobal.com').rstrip('/')
+        self.bni_login_url = f"{bni_base_url}/login"
+        self.bni_dashboard_url = f"{bni_base_url}/web/dashboard"
 
         # Google Form settings
-        self.form_url = "https://docs.google.com/forms/d/e/1FAIpQLSfBkXWsGZXP3IXJ8gR2vZbyAi7VP3R2FSF6YB9ohkr94rIb8g/viewform"
+        self.form_url = os.getenv('GOOGLE_FORM_URL', "https://docs.google.com/forms/d/e/1FAIpQLSfBkXWsGZXP3IXJ8gR2vZbyAi7VP3R2FSF6YB9ohkr94rIb8g/viewform")
         self.prefill_name = "Maitri+Boonkijrungpaisan"  # URL encoded name
 
         self.driver = None
+        self.selector_registry = SelectorRegistry()
         self.tyfcb_received = None
 
+    @traced("setup_driver")
     def setup_driver(self):
         """ตั้งค่า Chrome WebDriver"""
         chrome_options = Options()
@@ -57,10 +70,12 @@ class BNIIntegratedAutomation:
         chrome_options.add_argument("--disable-notifications")
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        apply_low_memory_options(chrome_options)
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
 
         try:
+            from webdriver_manager.chrome import ChromeDriverManager
             service = Service(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=chrome_options)
             return driver
@@ -118,6 +133,7 @@ class BNIIntegratedAutomation:
             # ถ้าเกิดข้อผิดพลาด ให้ใช้ getpass ธรรมดา
             return getpass.getpass("กรุณาใส่รหัสผ่าน: ")
 
+    @traced("login")
     def login_to_bni(self, username, password):
         """ล็อกอินเข้า BNI Connect"""
         try:
@@ -172,6 +188,7 @@ class BNIIntegratedAutomation:
         except Exception as e:
             return False, f"เกิดข้อผิดพลาดในการเข้าสู่หน้าล็อกอิน: {str(e)}"
 
+    @traced("dashboard")
     def get_tyfcb_received_from_bni(self):
         """ดึงข้อมูล TYFCB Received จาก BNI Connect Dashboard"""
         try:
@@ -181,33 +198,24 @@ class BNIIntegratedAutomation:
             self.driver.get(self.bni_dashboard_url)
             time.sleep(7)
 
-            # ค้นหาและคลิกที่ Lifetime
+            # ค้นหาและคลิกที่ Lifetime (ลองวิธีที่สำเร็จล่าสุดก่อน)
             print("🔍 กำลังค้นหา Lifetime section...")
             try:
-                # วิธีที่ 1: ค้นหาด้วยข้อความ Lifetime
-                lifetime_elements = self.driver.find_elements(By.XPATH, "//p[contains(text(), 'Lifetime')]")
-                if lifetime_elements:
-                    for element in lifetime_elements:
-                        print(f"📍 พบ Lifetime element: {element.text}")
-                        try:
-                            self.driver.execute_script("arguments[0].click();", element)
-                            print("✅ คลิก Lifetime สำเร็จ")
-                            break
-                        except:
-                            print("⚠️ ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
-                else:
+                label, lifetime_elements = self.selector_registry.find("bni.lifetime", [
+                    # วิธีที่ 1: ค้นหาด้วยข้อความ Lifetime
+                    ("ข้อความ Lifetime", lambda: self.driver.find_elements(By.XPATH, "//p[contains(text(), 'Lifetime')]")),
                     # วิธีที่ 2: ค้นหาด้วย attribute isbackground
-                    lifetime_elements = self.driver.find_elements(By.XPATH, "//*[@isbackground='true']")
-                    if lifetime_elements:
-                        for element in lifetime_elements:
-                            if "Lifetime" in element.text:
-                                print(f"📍 พบ Lifetime จาก isbackground: {element.text}")
-                                try:
-                                    self.driver.execute_script("arguments[0].click();", element)
-                                    print("✅ คลิก Lifetime จาก isbackground สำเร็จ")
-                                    break
-                                except:
-                                    print("⚠️ ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
+                    ("isbackground", lambda: [element for element in self.driver.find_elements(By.XPATH, "//*[@isbackground='true']")
+                                              if "Lifetime" in element.text]),
+                ])
+                for element in lifetime_elements or []:
+                    print(f"📍 พบ Lifetime element ({label}): {element.text}")
+                    try:
+                        self.driver.execute_script("arguments[0].click();", element)
+                        print("✅ คลิก Lifetime สำเร็จ")
+                        break
+                    except:
+                        print("⚠️ ไม่สามารถคลิกที่ element นี้ ลองต่อไป...")
 
                 # รอให้หน้าเว็บอัปเดต
                 time.sleep(5)
@@ -219,38 +227,38 @@ class BNIIntegratedAutomation:
             print("🔍 กำลังค้นหาข้อมูล TYFCB Received...")
             tyfcb_received = "ไม่พบข้อมูล TYFCB Received"
 
+            def find_received_near_label():
+                # หาจากข้อความ TYFCB และตัวเลขใกล้ๆ
+                for indicator in self.driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Received')]"):
+                    print(f"📍 พบข้อความเกี่ยวกับ TYFCB Received: {indicator.text}")
+                    try:
+                        parent_div = indicator.find_element(By.XPATH, "./ancestor::div[contains(@class, 'MuiBox-root')][1]")
+                        money_spans = parent_div.find_elements(By.XPATH, ".//span[contains(text(), '฿')]")
+                        if money_spans:
+                            return money_spans[0].text
+                    except Exception as e:
+                        print(f"⚠️ ไม่สามารถหาข้อมูลเงินใกล้ TYFCB Received: {str(e)}")
+                return None
+
+            def find_first_baht_value():
+                # หาจากสัญลักษณ์สกุลเงินบาทโดยตรง ใช้ค่าแรกที่พบ
+                values = [element.text for element in self.driver.find_elements(By.XPATH, "//span[contains(text(), '฿')]")]
+                print(f"💰 พบข้อมูลเงินทั้งหมด: {values}")
+                return values[0] if values else None
+
             try:
-                # วิธีที่ 1: หาจากข้อความ TYFCB และตัวเลขใกล้ๆ
-                tyfcb_indicators = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'TYFCB') and contains(text(), 'Received')]")
-                if tyfcb_indicators:
-                    for indicator in tyfcb_indicators:
-                        print(f"📍 พบข้อความเกี่ยวกับ TYFCB Received: {indicator.text}")
-                        try:
-                            # หาตัวเลขใกล้ๆ
-                            parent_div = indicator.find_element(By.XPATH, "./ancestor::div[contains(@class, 'MuiBox-root')][1]")
-                            money_spans = parent_div.find_elements(By.XPATH, ".//span[contains(text(), '฿')]")
-                            if money_spans:
-                                for span in money_spans:
-                                    print(f"💰 พบข้อมูลเงิน TYFCB Received: {span.text}")
-                                    tyfcb_received = span.text
-                                    break
-                        except Exception as e:
-                            print(f"⚠️ ไม่สามารถหาข้อมูลเงินใกล้ TYFCB Received: {str(e)}")
-                            continue
-
-                # วิธีที่ 2: หาจากสัญลักษณ์สกุลเงินบาทโดยตรง
-                if tyfcb_received == "ไม่พบข้อมูล TYFCB Received":
-                    money_elements = self.driver.find_elements(By.XPATH, "//span[contains(text(), '฿')]")
-                    if money_elements:
-                        values = [element.text for element in money_elements]
-                        print(f"💰 พบข้อมูลเงินทั้งหมด: {values}")
-                        if values:
-                            tyfcb_received = values[0]  # ใช้ค่าแรกที่พบ
+                label, value = self.selector_registry.find("bni.tyfcb_received", [
+                    ("ข้อความ TYFCB Received", find_received_near_label),
+                    heuristic("สัญลักษณ์ ฿ แรก", find_first_baht_value),
+                ])
+                if value:
+                    print(f"💰 พบข้อมูลเงิน TYFCB Received ({label}): {value}")
+                    tyfcb_received = value
 
                 # ทำความสะอาดข้อมูล
                 if tyfcb_received and tyfcb_received != "ไม่พบข้อมูล TYFCB Received":
                     # ลบสัญลักษณ์และเก็บเฉพาะตัวเลขกับจุลภาค
-                    cleaned_amount = re.sub(r'[^\d,.]', '', tyfcb_received)
+                    cleaned_amount = amount_text(tyfcb_received)
                     self.tyfcb_received = cleaned_amount
                     print(f"✅ TYFCB Received: {self.tyfcb_received}")
                     return True, self.tyfcb_received
@@ -263,6 +271,7 @@ class BNIIntegratedAutomation:
         except Exception as e:
             return False, f"เกิดข้อผิดพลาดในการเข้าสู่ Dashboard: {str(e)}"
 
+    @traced("submit_form")
     def submit_to_google_form(self, tyfcb_amount):
         """กรอกและส่ง Google Form ด้วยข้อมูล TYFCB"""
         try:
@@ -279,49 +288,29 @@ class BNIIntegratedAutomation:
             # รอให้หน้าเว็บโหลดเสร็จ
             time.sleep(3)
 
-            # บันทึกภาพหน้าจอหน้าแรก
-            if not os.getenv('GITHUB_ACTIONS'):
-                self.driver.save_screenshot("form_page1.png")
-                print("📸 บันทึกภาพหน้าจอหน้าแรกไว้ที่ form_page1.png")
+            get_diagnostics().step("form_page1")
 
-            # หาและคลิกปุ่ม Next เพื่อไปหน้าถัดไป
+            # หาและคลิกปุ่ม Next เพื่อไปหน้าถัดไป (ลองวิธีที่สำเร็จล่าสุดก่อน)
             print("🔍 กำลังหาปุ่ม Next...")
-            try:
+            label, next_button = self.selector_registry.find("form.next_button", [
                 # วิธีที่ 1: หาด้วย jsname="OCpkoe"
-                next_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div[jsname='OCpkoe']"))
-                )
-                print("✅ พบปุ่ม Next (วิธีที่ 1: jsname)")
-
-            except TimeoutException:
-                try:
-                    # วิธีที่ 2: หาด้วย class และข้อความ "Next"
-                    next_button = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//div[@role='button']//span[contains(text(), 'Next')]"))
-                    )
-                    print("✅ พบปุ่ม Next (วิธีที่ 2: XPath)")
-
-                except TimeoutException:
-                    try:
-                        # วิธีที่ 3: หาด้วย class combinations
-                        next_button = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, "div.uArJ5e.UQuaGc.YhQJj.zo8FOc.ctEux"))
-                        )
-                        print("✅ พบปุ่ม Next (วิธีที่ 3: CSS classes)")
-
-                    except TimeoutException:
-                        # วิธีที่ 4: หาทุกปุ่มและเลือกที่มีข้อความ Next
-                        all_buttons = self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
-                        next_button = None
-                        for button in all_buttons:
-                            if 'Next' in button.text or 'ต่อไป' in button.text:
-                                next_button = button
-                                print("✅ พบปุ่ม Next (วิธีที่ 4: ค้นหาทั่วไป)")
-                                break
-
-                        if not next_button:
-                            print("❌ ไม่พบปุ่ม Next")
-                            return False
+                ("jsname", lambda: WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div[jsname='OCpkoe']")))),
+                # วิธีที่ 2: หาด้วย class และข้อความ "Next"
+                ("XPath", lambda: WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((By.XPATH, "//div[@role='button']//span[contains(text(), 'Next')]")))),
+                # วิธีที่ 3: หาด้วย class combinations
+                ("CSS classes", lambda: WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div.uArJ5e.UQuaGc.YhQJj.zo8FOc.ctEux")))),
+                # วิธีที่ 4: หาทุกปุ่มและเลือกที่มีข้อความ Next
+                ("ค้นหาทั่วไป", lambda: next((button for button in self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
+                                              if 'Next' in button.text or 'ต่อไป' in button.text), None)),
+            ])
+
+            if not next_button:
+                print("❌ ไม่พบปุ่ม Next")
+                return False
+            print(f"✅ พบปุ่ม Next ({label})")
 
             # คลิกปุ่ม Next
             if next_button:
@@ -333,10 +322,7 @@ class BNIIntegratedAutomation:
                     # รอให้หน้าถัดไปโหลด
                     time.sleep(3)
 
-                    # บันทึกภาพหน้าจอหน้าที่ 2
-                    if not os.getenv('GITHUB_ACTIONS'):
-                        self.driver.save_screenshot("form_page2.png")
-                        print("📸 บันทึกภาพหน้าจอหน้าที่ 2 ไว้ที่ form_page2.png")
+                    get_diagnostics().step("form_page2")
 
                 except Exception as e:
                     print(f"❌ ไม่สามารถคลิกปุ่ม Next: {e}")
@@ -375,35 +361,24 @@ class BNIIntegratedAutomation:
                 except Exception as e2:
                     print(f"⚠️  ไม่สามารถกรอกข้อมูลแบบ manual: {e2}")
 
-            # บันทึกภาพหน้าจอหลังกรอกข้อมูล
-            if not os.getenv('GITHUB_ACTIONS'):
-                self.driver.save_screenshot("form_filled_page2.png")
-                print("📸 บันทึกภาพหน้าจอหลังกรอกข้อมูลไว้ที่ form_filled_page2.png")
+            get_diagnostics().step("form_filled_page2")
 
             # หาปุ่ม Submit
             print("🔍 กำลังหาปุ่ม Submit...")
-            try:
+            label, submit_button = self.selector_registry.find("form.submit_button", [
                 # วิธีที่ 1: หาปุ่มที่มีข้อความ Submit หรือ ส่ง
-                submit_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Submit') or contains(text(), 'ส่ง') or contains(text(), 'ยืนยัน')]/ancestor::div[@role='button']"))
-                )
-
-            except TimeoutException:
-                # วิธีที่ 2: หาปุ่มด้วย role="button"
+                ("ข้อความ Submit", lambda: WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Submit') or contains(text(), 'ส่ง') or contains(text(), 'ยืนยัน')]/ancestor::div[@role='button']")))),
+                # วิธีที่ 2: หาปุ่มด้วย role="button" แล้วตรวจข้อความ
+                ("role=button", lambda: next((button for button in self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
+                                              if any(word in button.text.lower() for word in ['submit', 'ส่ง', 'ยืนยัน', 'send'])), None)),
+            ])
+
+            if not submit_button:
+                # ใช้ปุ่มสุดท้าย (มักจะเป็นปุ่ม Submit) - ไม่นับเป็นวิธีที่เรียนรู้
                 try:
                     submit_buttons = self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
-                    submit_button = None
-
-                    for button in submit_buttons:
-                        button_text = button.text.lower()
-                        if any(word in button_text for word in ['submit', 'ส่ง', 'ยืนยัน', 'send']):
-                            submit_button = button
-                            break
-
-                    if not submit_button and submit_buttons:
-                        # ใช้ปุ่มสุดท้าย (มักจะเป็นปุ่ม Submit)
-                        submit_button = submit_buttons[-1]
-
+                    submit_button = submit_buttons[-1] if submit_buttons else None
                 except Exception as e:
                     print(f"❌ ไม่สามารถหาปุ่ม Submit: {e}")
                     return False
@@ -441,9 +416,16 @@ class BNIIntegratedAutomation:
             print(f"❌ เกิดข้อผิดพลาดในการกรอก Google Form: {e}")
             return False
 
-    def run_integrated_automation(self, username, password):
-        """ฟังก์ชันหลักสำหรับรันการทำงานแบบรวม"""
+    def run_integrated_automation(self, username, password, resume=False):
+        """
+        ฟังก์ชันหลักสำหรับรันการทำงานแบบรวม
+
+        resume=True จะใช้ TYFCB Received จาก checkpoint ของการรันก่อนที่ยังไม่จบ
+        (เช่นส่ง Google Form ไม่สำเร็จ) แล้วส่งฟอร์มใหม่โดยไม่ต้องล็อกอิน BNI Connect อีกครั้ง
+        """
         success_steps = []
+        completed = False
+        checkpoint = RunCheckpoint("integrated", username, INTEGRATED_STAGES, resume=resume)
 
         try:
             print("🤖 เริ่มต้น BNI Integrated Automation")
@@ -451,22 +433,32 @@ class BNIIntegratedAutomation:
 
             # ขั้นตอนที่ 1: ตั้งค่า WebDriver
             print("\n🚀 ขั้นตอนที่ 1: ตั้งค่า WebDriver...")
-            self.driver = self.setup_driver()
+            self.driver = instrument_driver(self.setup_driver())
             success_steps.append("Setup WebDriver")
 
-            # ขั้นตอนที่ 2: ล็อกอินเข้า BNI Connect
-            print("\n🔐 ขั้นตอนที่ 2: ล็อกอินเข้า BNI Connect...")
-            login_success, login_message = self.login_to_bni(username, password)
-            if not login_success:
-                return False, f"ล็อกอินไม่สำเร็จ: {login_message}", success_steps
-            success_steps.append("Login to BNI Connect")
-
-            # ขั้นตอนที่ 3: ดึงข้อมูล TYFCB Received
-            print("\n📊 ขั้นตอนที่ 3: ดึงข้อมูล TYFCB Received...")
-            tyfcb_success, tyfcb_result = self.get_tyfcb_received_from_bni()
-            if not tyfcb_success:
-                return False, f"ไม่สามารถดึงข้อมูล TYFCB Received: {tyfcb_result}", success_steps
-            success_steps.append(f"Get TYFCB Received: {tyfcb_result}")
+            if checkpoint.done("dashboard"):
+                # ขั้นตอนที่ 2-3 เสร็จแล้วในการรันก่อน
+                tyfcb_result = checkpoint.data("dashboard")
+                self.tyfcb_received = tyfcb_result
+                print(f"\n♻️  ใช้ TYFCB Received จาก checkpoint: {tyfcb_result}")
+                success_steps.append("Login to BNI Connect (checkpoint)")
+                success_steps.append(f"Get TYFCB Received (checkpoint): {tyfcb_result}")
+            else:
+                # ขั้นตอนที่ 2: ล็อกอินเข้า BNI Connect
+                print("\n🔐 ขั้นตอนที่ 2: ล็อกอินเข้า BNI Connect...")
+                login_success, login_message = self.login_to_bni(username, password)
+                if not login_success:
+                    return False, f"ล็อกอินไม่สำเร็จ: {login_message}", success_steps
+                success_steps.append("Login to BNI Connect")
+                checkpoint.complete("login")
+
+                # ขั้นตอนที่ 3: ดึงข้อมูล TYFCB Received
+                print("\n📊 ขั้นตอนที่ 3: ดึงข้อมูล TYFCB Received...")
+                tyfcb_success, tyfcb_result = self.get_tyfcb_received_from_bni()
+                if not tyfcb_success:
+                    return False, f"ไม่สามารถดึงข้อมูล TYFCB Received: {tyfcb_result}", success_steps
+                success_steps.append(f"Get TYFCB Received: {tyfcb_result}")
+                checkpoint.complete("dashboard", tyfcb_result)
 
             # ขั้นตอนที่ 4: กรอกและส่ง Google Form
             print(f"\n📝 ขั้นตอนที่ 4: กรอกและส่ง Google Form...")
@@ -474,7 +466,10 @@ class BNIIntegratedAutomation:
             if not form_success:
                 return False, "ไม่สามารถกรอกหรือส่ง Google Form ได้", success_steps
             success_steps.append("Submit Google Form")
+            checkpoint.complete("submit")
+            checkpoint.finish()
 
+            completed = True
             return True, "การทำงานทั้งหมดเสร็จสิ้นสำเร็จ", success_steps
 
         except Exception as e:
@@ -483,12 +478,9 @@ class BNIIntegratedAutomation:
         finally:
             # ปิด WebDriver
             if self.driver:
-                if not os.getenv('GITHUB_ACTIONS'):
-                    try:
-                        self.driver.save_screenshot("final_screen.png")
-                        print("📸 บันทึกภาพหน้าจอสุดท้ายไว้ที่ final_screen.png")
-                    except:
-                        pass
+                # ภาพหน้าจอและ HTML บันทึกเฉพาะเมื่อล้มเหลว (ดู bni/diagnostics.py)
+                if not completed:
+                    get_diagnostics().capture(self.driver, "integrated")
 
                 print("🔒 ปิด WebDriver")
                 self.driver.quit()
@@ -496,6 +488,11 @@ class BNIIntegratedAutomation:
 
 def main():
     """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="ดึงข้อมูล TYFCB จาก BNI Connect แล้วส่ง Google Form")
+    parser.add_argument("--resume", action="store_true",
+                        help="รันต่อจากขั้นตอนแรกที่ยังไม่เสร็จของการรันก่อน (หรือ BNI_RESUME=true)")
+    args = parser.parse_args()
+
     print("🤖 BNI Integrated Automation - รวมการดึงข้อมูล TYFCB และกรอก Google Form")
     print("=" * 80)
 
@@ -520,7 +517,10 @@ def main():
 
     # รันการทำงานแบบรวม
     automation = BNIIntegratedAutomation()
-    success, message, completed_steps = automation.run_integrated_automation(username, password)
+    tracer = start_run("integrated")
+    success, message, completed_steps = automation.run_integrated_automation(
+        username, password, resume=resume_requested(args.resume))
+    tracer.finish("ok" if success else "error")
 
     # แสดงผลลัพธ์
     print("\n" + "=" * 70)
@@ -551,4 +551,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+โมดูลที่ใช้ร่วมกันระหว่างสคริปต์ BNI TYFCB Automation
+"""
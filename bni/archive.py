@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+ย้ายแถวเก่าของ sheet ประวัติ (TYFCB Data) ไปยังแท็บรายปี เพื่อให้ sheet หลักมีขนาดคงที่
+
+แถวที่ Timestamp เก่ากว่า TYFCB_ARCHIVE_HORIZON_DAYS (ค่าเริ่มต้น 365 วัน) ถูกคัดลอกไปยังแท็บ
+"TYFCB Archive <ปี>" (append_rows ครั้งเดียวต่อปี) แล้วลบออกจาก sheet หลักด้วย batch_update
+ครั้งเดียว (deleteDimension ของทุกช่วงแถวที่ติดกัน) - เขียนแท็บ archive ก่อนลบเสมอ ถ้าล้มกลางทาง
+การรันครั้งถัดไปจะข้ามแถวที่อยู่ในแท็บ archive แล้ว (เทียบ Timestamp + Running User) แทนการคัดลอกซ้ำ
+ก่อนลบจะอ่านคอลัมน์ A:C อีกครั้ง ถ้าจำนวนแถวหรือแถวที่จะลบไม่ตรงกับที่อ่านไว้ (เช่น runner อื่นเพิ่มแถว)
+จะยกเลิกการลบ - การลบไม่ถูกส่งซ้ำอัตโนมัติ (scheduler retry :batchUpdate เฉพาะ 429)
+ตั้ง TYFCB_ARCHIVE_SPREADSHEET เป็น ID ของอีก spreadsheet เพื่อเก็บแท็บ archive แยกออกไป
+
+หลังย้าย แท็บ "TYFCB Latest" (bni/latest_index.py) ถูกเขียนใหม่ เพราะเลขแถวใน sheet หลักเลื่อน
+และแถวล่าสุดของบาง Running User อาจอยู่ในแท็บ archive แล้ว
+"""
+import os
+from datetime import datetime, timedelta
+
+from bni.latest_index import DATE_TIME_FORMAT, latest_by_user, open_tab, user_key, write_latest_tab
+from bni.parsing import TimestampParser
+
+ARCHIVE_HORIZON_ENV = "TYFCB_ARCHIVE_HORIZON_DAYS"
+ARCHIVE_SPREADSHEET_ENV = "TYFCB_ARCHIVE_SPREADSHEET"
+ARCHIVE_HORIZON_DAYS = 365
+ARCHIVE_TAB_PREFIX = "TYFCB Archive"
+
+# ตำแหน่งคอลัมน์ใน sheet หลัก (ตาม header ที่ save_to_google_sheet สร้าง)
+_TIMESTAMP, _USER = 0, 2
+
+
+def archive_horizon_days():
+    try:
+        return int(os.getenv(ARCHIVE_HORIZON_ENV, ARCHIVE_HORIZON_DAYS))
+    except ValueError:
+        return ARCHIVE_HORIZON_DAYS
+
+
+def archive_tab_title(year):
+    return f"{ARCHIVE_TAB_PREFIX} {year}"
+
+
+def _cell(row, index):
+    return row[index] if index < len(row) else ""
+
+
+def _row_key(row):
+    """คีย์เดียวกับที่ spool ใช้ตรวจแถวซ้ำ (Timestamp serial + Running User)"""
+    try:
+        return round(float(_cell(row, _TIMESTAMP)), 6), user_key(_cell(row, _USER))
+    except (TypeError, ValueError):
+        return str(_cell(row, _TIMESTAMP)), user_key(_cell(row, _USER))
+
+
+def _row_runs(indexes):
+    """รวม index ที่ติดกันเป็นช่วง [(start, end), ...] (end ไม่รวม)"""
+    runs = []
+    for index in sorted(indexes):
+        if runs and runs[-1][1] == index:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+    return runs
+
+
+def sheet_unchanged(worksheet, values, indexes):
+    """
+    อ่านคอลัมน์ A:C ของ sheet หลักอีกครั้งและตรวจว่าจำนวนแถวเท่าเดิม และแถวที่จะลบ (index ของแถวข้อมูล)
+    ยังมี Timestamp + Running User ตรงกับ values ที่อ่านไว้ก่อนหน้า
+    """
+    current = worksheet.get_values("A:C", value_render_option="UNFORMATTED_VALUE")
+    if len(current) != len(values):
+        return False
+    return all(_row_key(current[index + 1]) == _row_key(values[index + 1]) for index in indexes)
+
+
+def archive_history(spreadsheet, horizon_days=None, archive_spreadsheet=None, now=None):
+    """
+    ย้ายแถวที่เก่ากว่า horizon_days จาก sheet แรกของ spreadsheet ไปยังแท็บรายปี และเขียนแท็บ TYFCB Latest ใหม่
+
+    คืนค่า dict สรุป: archived (จำนวนแถวที่ย้าย), kept, years ({ปี: จำนวนแถว}),
+    row_numbers ({user key: เลขแถวใหม่ของแถวล่าสุดใน sheet หลัก หรือ None ถ้าอยู่ใน archive})
+    และ aborted (True ถ้า sheet หลักเปลี่ยนระหว่างย้ายจึงไม่ลบแถว)
+    """
+    horizon_days = archive_horizon_days() if horizon_days is None else horizon_days
+    cutoff = (now or datetime.now()) - timedelta(days=horizon_days)
+    archive_spreadsheet = archive_spreadsheet or spreadsheet
+    worksheet = spreadsheet.sheet1
+    parser = TimestampParser()
+    summary = {"archived": 0, "kept": 0, "years": {}, "row_numbers": None, "aborted": False}
+
+    # อ่านเฉพาะคอลัมน์ Timestamp ก่อน - อ่านทั้ง sheet เมื่อมีแถวที่ต้องย้ายจริงเท่านั้น
+    timestamps = worksheet.get_values("A2:A", value_render_option="UNFORMATTED_VALUE")
+    moments = (parser.parse(_cell(row, 0)) for row in timestamps)
+    if not any(moment is not None and moment < cutoff for moment in moments):
+        summary["kept"] = len(timestamps)
+        print(f"ℹ️  ไม่มีแถวที่เก่ากว่า {horizon_days} วัน - ไม่ต้องย้ายไป archive")
+        return summary
+
+    values = worksheet.get_values(value_render_option="UNFORMATTED_VALUE")
+    header, rows = values[0], values[1:]
+    by_year = {}
+    for index, row in enumerate(rows):
+        moment = parser.parse(_cell(row, _TIMESTAMP))
+        if moment is not None and moment < cutoff:
+            by_year.setdefault(moment.year, []).append(index)
+
+    # 1. คัดลอกไปยังแท็บรายปี (ข้ามแถวที่คัดลอกไปแล้วจากการรันที่ล้มกลางทาง)
+    for year, indexes in sorted(by_year.items()):
+        tab, created = open_tab(archive_spreadsheet, archive_tab_title(year), header)
+        existing = [] if created else tab.get_values("A:C", value_render_option="UNFORMATTED_VALUE")
+        existing_keys = {_row_key(row) for row in existing[1:]}
+        fresh = [rows[index] for index in indexes if _row_key(rows[index]) not in existing_keys]
+        if fresh:
+            tab.append_rows(fresh, value_input_option="RAW")
+            first_row = max(len(existing), 1) + 1
+            tab.format(f"A{first_row}:A{first_row + len(fresh) - 1}", DATE_TIME_FORMAT)
+        summary["years"][year] = len(indexes)
+        print(f"📦 ย้าย {len(fresh)} แถวไปแท็บ '{archive_tab_title(year)}'"
+              + (f" (อยู่ในแท็บแล้ว {len(indexes) - len(fresh)} แถว)" if len(fresh) < len(indexes) else ""))
+
+    # 2. ลบออกจาก sheet หลักใน batch_update ครั้งเดียว (ลบจากล่างขึ้นบนเพื่อไม่ให้ตำแหน่งเลื่อน)
+    archived = {index for indexes in by_year.values() for index in indexes}
+    if not sheet_unchanged(worksheet, values, archived):
+        summary["aborted"] = True
+        print("❌ Sheet หลักเปลี่ยนระหว่างย้ายไป archive - ไม่ลบแถว (รันใหม่ภายหลัง แถวที่คัดลอกแล้วจะถูกข้าม)")
+        return summary
+    requests = [{
+        "deleteDimension": {
+            "range": {"sheetId": worksheet.id, "dimension": "ROWS",
+                      "startIndex": start + 1, "endIndex": end + 1},
+        }
+    } for start, end in reversed(_row_runs(archived))]
+    spreadsheet.batch_update({"requests": requests})
+
+    # 3. แท็บ TYFCB Latest - แถวที่เหลือได้เลขแถวใหม่ แถวล่าสุดที่ถูกย้ายไม่มีเลขแถว
+    kept = [index for index in range(len(rows)) if index not in archived]
+    candidates = [(new_index + 2, rows[index]) for new_index, index in enumerate(kept)]
+    candidates += [(None, rows[index]) for index in sorted(archived)]
+    latest = latest_by_user(candidates, parser)
+    write_latest_tab(spreadsheet, latest)
+
+    summary.update(archived=len(archived), kept=len(kept),
+                   row_numbers={key: row_number for key, (row_number, _) in latest.items()})
+    print(f"✅ ย้ายแถวเก่าไป archive {len(archived)} แถว - เหลือใน sheet หลัก {len(kept)} แถว")
+    return summary
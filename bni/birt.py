@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+แยกข้อมูลจาก HTML ของรายงาน BIRT (เช่น TYFCB Given) ด้วย lxml โดยไม่ต้องผ่าน WebDriver
+
+ผลลัพธ์เป็นแบบกะทัดรัด (แถวเป็น list ของข้อความ) เพื่อส่งข้าม process ได้เร็ว
+ใช้ rows_to_records() แปลงเป็น dict แบบเดียวกับที่ get_tyfcb_given_report_data คืนค่า
+"""
+try:
+    from lxml import etree, html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+REPORT_TABLE_ID = "__bookmark_3"
+
+# div ของ params ในส่วนหัวรายงาน -> ชื่อ field
+PARAM_IDS = {
+    "params_1": "running_user",
+    "params_2": "run_at",
+    "params_5": "chapter",
+}
+
+# คอลัมน์ของรายงาน TYFCB Given ตามลำดับในตาราง
+GIVEN_COLUMNS = ("date", "thank_you_to", "amount", "new_repeat", "inside_outside", "comments", "status")
+
+
+# query เดียวที่คืน div ของ params และทุกแถวของตารางรายงานตามลำดับในเอกสาร
+_REPORT_NODES = None
+if LXML_AVAILABLE:
+    _REPORT_NODES = etree.XPath(
+        "//div[@id='params_1' or @id='params_2' or @id='params_5']"
+        " | //table[@id=$table_id]/tr | //table[@id=$table_id]/*/tr"
+    )
+
+
+def _cell_text(element):
+    # cell ส่วนใหญ่มีแต่ข้อความ - อ่าน .text ตรงๆ ถูกกว่า text_content() มาก
+    text = element.text_content() if len(element) else (element.text or "")
+    return " ".join(text.split())
+
+
+def _classify_rows(result, rows, min_cells):
+    """แยกแถวหัวตาราง แถวรวม และแถวข้อมูล ในรอบเดียว"""
+    first = True
+    append = result["rows"].append
+    for row in rows:
+        cells = []
+        is_header = first
+        for cell in row:
+            tag = cell.tag
+            if tag == "td" or tag == "th":
+                is_header = is_header or tag == "th"
+                cells.append(_cell_text(cell))
+        first = False
+        if is_header:
+            result["header"] = cells
+        elif "total_row" in (row.get("id") or "") or "Total" in cells:
+            result["total"] = cells
+        elif len(cells) >= min_cells:
+            append(cells)
+
+
+def parse_birt_report(page_html, table_id=REPORT_TABLE_ID, min_cells=6):
+    """
+    แยก params, แถวข้อมูล และแถวรวมจาก HTML ของรายงาน BIRT ด้วย XPath ที่ compile ไว้แล้ว
+    (parse เอกสารครั้งเดียว และเดินผ่าน node ที่ต้องการครั้งเดียว)
+
+    คืนค่า dict: running_user, run_at, chapter, header (list), rows (list ของ list), total (list)
+    """
+    result = {"running_user": "", "run_at": "", "chapter": "", "header": [], "rows": [], "total": []}
+    if not LXML_AVAILABLE:
+        raise ImportError("ต้องติดตั้ง lxml: pip install lxml")
+
+    document = lxml_html.fromstring(page_html)
+
+    rows = []
+    for node in _REPORT_NODES(document, table_id=table_id):
+        if node.tag == "div":
+            result[PARAM_IDS[node.get("id")]] = _cell_text(node)
+        else:
+            rows.append(node)
+
+    if not rows:
+        # ไม่มี id ที่คาดไว้ - เลือกตารางที่มีแถวมากที่สุด
+        tables = document.xpath("//table")
+        if not tables:
+            return result
+        table = max(tables, key=lambda t: len(t.xpath("./tr | ./*/tr")))
+        rows = table.xpath("./tr | ./*/tr")
+
+    _classify_rows(result, rows, min_cells)
+    return result
+
+
+def rows_to_records(rows, columns=GIVEN_COLUMNS):
+    """แปลงแถวแบบกะทัดรัดเป็น list ของ dict ตามชื่อคอลัมน์"""
+    return [
+        {column: (row[i] if i < len(row) else "") for i, column in enumerate(columns)}
+        for row in rows
+    ]
+
+
+def total_row_amount(result, column=2):
+    """ยอดรวมจากแถว Total (คอลัมน์ Amount)"""
+    total = result.get("total") or []
+    return total[column] if len(total) > column else ""
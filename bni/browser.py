@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+วงจรชีวิตของ Chrome สำหรับการรันยาว (หลายบัญชีต่อ process)
+
+- apply_low_memory_options(): เพิ่ม flags ที่ลดหน่วยความจำของ Chrome (ปิดด้วย BNI_CHROME_LOW_MEMORY=false)
+- chrome_rss_mb(): RSS รวมของ chromedriver และ process ลูกทั้งหมด (browser, renderer, GPU)
+  ใช้ psutil ถ้าติดตั้งไว้ ไม่เช่นนั้นอ่านจาก /proc (Linux) - เป็นค่าประมาณเพราะนับ shared memory ซ้ำ
+- BrowserManager: ใช้ Chrome ตัวเดิมข้ามบัญชี (ล้าง cookie, cache และ storage ของ origin BNI ระหว่างบัญชี)
+  และปิดเปิดใหม่ (recycle)
+  เมื่อครบ BNI_CHROME_MAX_SESSIONS บัญชี หรือ RSS เกิน BNI_CHROME_MAX_RSS_MB พร้อมเก็บ peak RSS ของแต่ละบัญชี
+"""
+import os
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+
+from bni.tracing import get_tracer
+
+# psutil ถูก import ตอนวัดครั้งแรก (ไม่เพิ่มเวลา import ของ CLI)
+PSUTIL_AVAILABLE = find_spec("psutil") is not None
+
+LOW_MEMORY_ENV = "BNI_CHROME_LOW_MEMORY"
+MAX_SESSIONS_ENV = "BNI_CHROME_MAX_SESSIONS"
+MAX_RSS_ENV = "BNI_CHROME_MAX_RSS_MB"
+MAX_SESSIONS = 5
+MAX_RSS_MB = 1500
+BASE_URL_ENV = "BNI_BASE_URL"
+DEFAULT_BASE_URL = "https://www.bniconnectglobal.com"
+
+LOW_MEMORY_ARGUMENTS = (
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    # จำกัดจำนวน renderer - site isolation ยังเปิดอยู่ (iframe ต่าง site ยังแยก process กัน)
+    "--renderer-process-limit=2",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+)
+
+
+def _env_number(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def low_memory_enabled():
+    return os.getenv(LOW_MEMORY_ENV, "true").lower() != "false"
+
+
+def apply_low_memory_options(chrome_options):
+    """เพิ่ม flags ลดหน่วยความจำที่ยังไม่มีใน chrome_options"""
+    if not low_memory_enabled():
+        return chrome_options
+    for argument in LOW_MEMORY_ARGUMENTS:
+        if argument not in chrome_options.arguments:
+            chrome_options.add_argument(argument)
+    return chrome_options
+
+
+def _origin(url):
+    parts = urlsplit(str(url or ""))
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _driver_pid(driver):
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+def _proc_tree(pid):
+    """pid และ process ลูกทุกชั้นจาก /proc (ใช้เมื่อไม่มี psutil)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # ชื่อ process อยู่ในวงเล็บและอาจมีช่องว่าง - ฟิลด์หลังวงเล็บปิดคือ state, ppid
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def chrome_rss_mb(driver):
+    """RSS รวม (MB) ของ chromedriver และ Chrome ทุก process - None ถ้าวัดไม่ได้"""
+    pid = _driver_pid(driver)
+    if pid is None:
+        return None
+    try:
+        if PSUTIL_AVAILABLE:
+            import psutil
+
+            root = psutil.Process(pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+        elif os.path.isdir("/proc"):
+            total = sum(_proc_rss(process) for process in _proc_tree(pid))
+        else:
+            return None
+    except Exception:
+        return None
+    return round(total / (1024 * 1024), 1)
+
+
+class BrowserManager:
+    def __init__(self, factory, max_sessions=None, max_rss_mb=None, base_url=None):
+        """
+        factory : ฟังก์ชันที่สร้าง WebDriver ใหม่ (เช่น setup_driver)
+        base_url : URL ของ BNI Connect ที่ต้องล้าง storage ระหว่างบัญชี (ค่าเริ่มต้นจาก BNI_BASE_URL)
+        """
+        self.factory = factory
+        self.base_url = base_url or os.getenv(BASE_URL_ENV, DEFAULT_BASE_URL)
+        self.max_sessions = int(max_sessions or _env_number(MAX_SESSIONS_ENV, MAX_SESSIONS))
+        self.max_rss_mb = max_rss_mb or _env_number(MAX_RSS_ENV, MAX_RSS_MB)
+        self.driver = None
+        self.account = None
+        self.sessions = 0
+        self.launches = 0
+        self.recycles = 0
+        self.peaks = {}
+
+    def acquire(self, account=None):
+        """คืนค่า Chrome สำหรับบัญชีนี้ (เปิดใหม่ถ้ายังไม่มีหรือเพิ่ง recycle)"""
+        if self.driver is None:
+            self.driver = self.factory()
+            self.launches += 1
+            self.sessions = 0
+        self.account = account
+        self.sessions += 1
+        self.sample()
+        return self.driver
+
+    def sample(self):
+        """วัด RSS ตอนนี้และเก็บเป็น peak ของบัญชีที่กำลังทำงาน"""
+        if self.driver is None:
+            return None
+        rss = chrome_rss_mb(self.driver)
+        if rss is None:
+            return None
+        account = self.account or "(unknown)"
+        if rss > self.peaks.get(account, 0):
+            self.peaks[account] = rss
+        tracer = get_tracer()
+        tracer.peak("chrome_rss_mb", rss)
+        tracer.peak(f"chrome_rss_mb:{account}", rss)
+        return rss
+
+    def release(self, healthy=True):
+        """จบงานของบัญชีปัจจุบัน - เก็บ Chrome ไว้ใช้ต่อ หรือปิดถ้าครบจำนวน session / RSS เกิน / เกิดข้อผิดพลาด"""
+        if self.driver is None:
+            return
+        rss = self.sample()
+        if not healthy:
+            reason = "เกิดข้อผิดพลาด"
+        elif self.sessions >= self.max_sessions:
+            reason = f"ใช้ครบ {self.sessions} session"
+        elif rss is not None and rss > self.max_rss_mb:
+            reason = f"RSS {rss:.0f} MB เกิน {self.max_rss_mb:.0f} MB"
+        else:
+            reason = None
+
+        if reason:
+            print(f"♻️  ปิด Chrome ({reason})")
+            self.recycles += 1
+            self._quit()
+        else:
+            self._reset()
+        self.account = None
+
+    def _reset(self):
+        """
+        ล้าง cookie, cache และ storage (localStorage, sessionStorage, IndexedDB, service worker)
+        ของ origin BNI และ origin ของหน้าปัจจุบันก่อนให้บัญชีถัดไปใช้ - ล้างไม่ได้ให้ปิดแทน
+        """
+        try:
+            origins = {_origin(self.base_url), _origin(self.driver.current_url)} - {None}
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            self.driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            for origin in sorted(origins):
+                self.driver.execute_cdp_cmd("Storage.clearDataForOrigin",
+                                            {"origin": origin, "storageTypes": "all"})
+            # sessionStorage ผูกกับแท็บ - ออกจากหน้าเดิมแล้วค่อยเปิดหน้าว่าง
+            self.driver.get("about:blank")
+        except Exception as e:
+            print(f"⚠️  ล้างข้อมูล Chrome ไม่สำเร็จ ({e}) - ปิด Chrome แทน")
+            self._quit()
+
+    def _quit(self):
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"⚠️  ปิด Chrome ไม่สำเร็จ: {e}")
+        self.driver = None
+
+    def close(self):
+        """ปิด Chrome และพิมพ์ peak RSS ของแต่ละบัญชี"""
+        self._quit()
+        if self.peaks:
+            print(f"🧠 Peak RSS ของ Chrome (เปิด {self.launches} ครั้ง, recycle {self.recycles} ครั้ง):")
+            for account, rss in self.peaks.items():
+                print(f"   {account:<40} {rss:>8.1f} MB")
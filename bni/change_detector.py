@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+ตรวจจับการเปลี่ยนแปลงของข้อมูล TYFCB ก่อนเขียนลง Google Sheets
+
+เก็บ snapshot ล่าสุดที่บันทึกลง Sheet ของแต่ละ Running User ไว้ในเครื่อง
+ถ้าค่าที่ดึงได้รอบนี้เหมือนเดิม (content hash ตรงกัน) จะไม่เพิ่มแถวใหม่
+แต่จะอัปเดตเวลา "last checked" ไว้ใน snapshot แทน
+
+ทุกการแก้ไขโหลดไฟล์ล่าสุดและบันทึกภายใต้ lock (update_json) เพราะ main thread และ thread ของ spool
+ต่างสร้าง detector ของตัวเองและบันทึก snapshot ของไฟล์เดียวกัน
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from bni.state import load_json, update_json
+
+SNAPSHOT_FILE = "tyfcb_snapshot.json"
+
+# โหมดเมื่อข้อมูลไม่เปลี่ยน: skip = ไม่เขียนอะไรลง Sheet, touch = อัปเดต Timestamp ของแถวเดิม
+UNCHANGED_MODES = ("skip", "touch")
+
+
+def content_hash(values):
+    """สร้าง hash จากค่าที่ใช้เปรียบเทียบ (ไม่รวม timestamp)"""
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TYFCBChangeDetector:
+    def __init__(self, snapshot_file=SNAPSHOT_FILE):
+        self.snapshot_file = snapshot_file
+        self.snapshots = load_json(self.snapshot_file, {})
+
+    def _key(self, running_user):
+        return str(running_user or '').strip().lower() or '(unknown)'
+
+    def get_snapshot(self, running_user):
+        """คืนค่า snapshot ล่าสุดของผู้ใช้ (หรือ None ถ้ายังไม่เคยบันทึก)"""
+        return self.snapshots.get(self._key(running_user))
+
+    def has_changed(self, running_user, values):
+        """ตรวจสอบว่าค่ารอบนี้ต่างจาก snapshot ที่บันทึกไว้ล่าสุดหรือไม่"""
+        snapshot = self.get_snapshot(running_user)
+        if not snapshot:
+            return True
+        return snapshot.get('hash') != content_hash(values)
+
+    def _update(self, update):
+        self.snapshots = update_json(self.snapshot_file, update, {})
+
+    def record_write(self, running_user, values, row_number=None):
+        """บันทึก snapshot หลังจากเขียนแถวใหม่ลง Sheet สำเร็จ"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        def update(snapshots):
+            snapshots[self._key(running_user)] = {
+                'hash': content_hash(values),
+                'values': values,
+                'row_number': row_number,
+                'last_written': now,
+                'last_checked': now,
+                'unchanged_checks': 0,
+            }
+        self._update(update)
+
+    def relocate_rows(self, row_numbers):
+        """อัปเดตเลขแถวของ snapshot หลังแถวใน Sheet เลื่อน (เช่น ย้ายแถวเก่าไป archive) - None = ไม่อยู่ใน Sheet หลักแล้ว"""
+        def update(snapshots):
+            for key, row_number in row_numbers.items():
+                snapshot = snapshots.get(key)
+                if snapshot:
+                    snapshot['row_number'] = row_number
+        self._update(update)
+
+    def record_heartbeat(self, running_user):
+        """อัปเดตเวลา last checked เมื่อข้อมูลไม่เปลี่ยน (ไม่แตะ Sheet)"""
+        def update(snapshots):
+            snapshot = snapshots.get(self._key(running_user))
+            if snapshot:
+                snapshot['last_checked'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                snapshot['unchanged_checks'] = snapshot.get('unchanged_checks', 0) + 1
+        self._update(update)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoint ของแต่ละขั้นตอน (stage) ในการรัน เพื่อรันต่อจากขั้นตอนแรกที่ยังไม่เสร็จได้ (--resume)
+
+หลังแต่ละขั้นตอนสำเร็จ ผลลัพธ์ (JSON) ถูกบันทึกลง checkpoint.json ในโฟลเดอร์ของการรัน
+เมื่อรันด้วย --resume (หรือ BNI_RESUME=true) จะหา checkpoint ล่าสุดของสคริปต์และบัญชีเดียวกัน
+ที่ยังไม่จบ แล้วใช้ผลของขั้นตอนที่เสร็จแล้วแทนการทำใหม่ เช่น ถ้า Sheets ล้มหลัง scrape เสร็จ
+การรันต่อจะทำเฉพาะขั้นตอนบันทึกข้อมูล โดยไม่ต้องล็อกอินและรอรายงาน render ใหม่
+
+checkpoint ที่เก่ากว่า RESUME_MAX_AGE_HOURS จะไม่ถูกใช้ (ข้อมูลบน dashboard อาจเปลี่ยนไปแล้ว)
+
+โหมดหลายบัญชี (--shard / --queue) ใช้ checkpoint แบบ durable=False (เก็บในหน่วยความจำเท่านั้น)
+เพราะทุกบัญชีอยู่ในโฟลเดอร์การรันเดียวกันและถูกบันทึกลง Sheets พร้อมกันหลังจบทุกบัญชี
+"""
+import glob
+import json
+import os
+from datetime import datetime, timedelta
+
+from bni.state import run_dir, state_dir
+
+CHECKPOINT_FILE = "checkpoint.json"
+RESUME_ENV = "BNI_RESUME"
+RESUME_MAX_AGE_HOURS = 24
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def resume_requested(flag=False):
+    """รันต่อเมื่อมี --resume หรือ BNI_RESUME=true"""
+    return flag or os.getenv(RESUME_ENV, "false").lower() == "true"
+
+
+def _account_key(account):
+    return str(account or "").strip().lower() or "(unknown)"
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  ข้าม checkpoint ที่อ่านไม่ได้ {path}: {e}")
+        return None
+
+
+def find_resumable(pipeline, account, max_age_hours=RESUME_MAX_AGE_HOURS):
+    """checkpoint ล่าสุดที่ยังไม่จบของ pipeline และบัญชีนี้ คืนค่า (path, state) หรือ None"""
+    cutoff = datetime.now() - timedelta(hours=max_age_hours)
+    current = os.path.join(run_dir(), CHECKPOINT_FILE)
+    pattern = os.path.join(state_dir(), "runs", "*", CHECKPOINT_FILE)
+    for path in sorted(glob.glob(pattern), reverse=True):
+        if os.path.abspath(path) == os.path.abspath(current):
+            continue
+        state = _load(path)
+        if not state or state.get("pipeline") != pipeline or state.get("account") != account:
+            continue
+        if datetime.strptime(state["started_at"], _TIME_FORMAT) < cutoff:
+            return None
+        return None if state.get("finished") else (path, state)
+    return None
+
+
+class RunCheckpoint:
+    def __init__(self, pipeline, account, stages, resume=False, max_age_hours=RESUME_MAX_AGE_HOURS,
+                 durable=True):
+        self.stages = tuple(stages)
+        self.durable = durable
+        self.path = os.path.join(run_dir(), CHECKPOINT_FILE) if durable else None
+        self.state = {
+            "pipeline": pipeline,
+            "account": _account_key(account),
+            "started_at": datetime.now().strftime(_TIME_FORMAT),
+            "resumed_from": None,
+            "finished": False,
+            "stages": {},
+        }
+
+        if resume:
+            previous = find_resumable(pipeline, self.state["account"], max_age_hours)
+            if previous:
+                path, state = previous
+                self.state["resumed_from"] = os.path.dirname(path)
+                self.state["stages"] = {
+                    stage: result for stage, result in state.get("stages", {}).items() if stage in self.stages}
+                # เวลาเริ่มของการรันแรก - การรันต่อหลายครั้งไม่ยืดอายุของข้อมูล
+                self.state["started_at"] = state["started_at"]
+                print(f"♻️  รันต่อจาก {self.state['resumed_from']} - ขั้นตอนที่เสร็จแล้ว: "
+                      f"{', '.join(self.completed()) or '-'} / ขั้นตอนถัดไป: {self.next_stage() or '-'}")
+            else:
+                print("ℹ️  ไม่พบ checkpoint ที่รันต่อได้ - เริ่มทุกขั้นตอนใหม่")
+        self._save()
+
+    def _save(self):
+        if not self.durable:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️  ไม่สามารถบันทึก checkpoint: {e}")
+
+    def done(self, stage):
+        return stage in self.state["stages"]
+
+    def pending(self, *stages):
+        """True ถ้ามีขั้นตอนใดใน stages ที่ยังไม่เสร็จ"""
+        return any(not self.done(stage) for stage in stages)
+
+    def completed(self):
+        return [stage for stage in self.stages if self.done(stage)]
+
+    def next_stage(self):
+        """ขั้นตอนแรกที่ยังไม่เสร็จ (None ถ้าเสร็จทุกขั้นตอน)"""
+        return next((stage for stage in self.stages if not self.done(stage)), None)
+
+    def data(self, stage, default=None):
+        result = self.state["stages"].get(stage)
+        return result["data"] if result else default
+
+    def complete(self, stage, data=None):
+        """บันทึกว่าขั้นตอนนี้เสร็จแล้ว พร้อมผลลัพธ์ที่ขั้นตอนถัดไปต้องใช้"""
+        self.state["stages"][stage] = {
+            "completed_at": datetime.now().strftime(_TIME_FORMAT),
+            "data": data,
+        }
+        self._save()
+
+    def finish(self):
+        """จบการรัน - checkpoint นี้จะไม่ถูกใช้รันต่ออีก"""
+        self.state["finished"] = True
+        self._save()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+คำสั่งเดียวสำหรับทุกสคริปต์: python -m bni <คำสั่ง> [argument ของสคริปต์]
+
+    python -m bni scrape --resume       # BNI-Lifetime-Selenuim-V5.py
+    python -m bni monitor               # google-form-automation.py
+    python -m bni submit                # google-form-selenium-automation.py
+    python -m bni integrated            # bni-integrated-automation.py
+    python -m bni archive               # BNI-Lifetime-Selenuim-V5.py --archive
+    python -m bni bench --only parse    # bench/run_bench.py
+
+โมดูลนี้ import เฉพาะ standard library - สคริปต์ของคำสั่งที่เลือกเท่านั้นที่ถูกโหลด
+(selenium, gspread, pandas ไม่ถูก import เมื่อรัน --help หรือคำสั่งที่ไม่ใช้)
+argument ที่เหลือส่งต่อให้สคริปต์ตามเดิม
+"""
+import argparse
+import sys
+
+from bni.script_loader import REPO_ROOT, SCRIPTS, load_script
+
+# คำสั่ง: (สคริปต์ใน SCRIPTS หรือ None = benchmark, คำอธิบาย, argument ที่ใส่ให้สคริปต์ก่อน argument ของผู้ใช้)
+COMMANDS = {
+    "scrape": ("scraper", "ดึง TYFCB จาก BNI Connect แล้วบันทึกลง Google Sheets", []),
+    "archive": ("scraper", "ย้ายแถวเก่าใน Google Sheet ไปแท็บรายปี", ["--archive"]),
+    "monitor": ("monitor", "ตรวจข้อมูลใหม่ใน Google Sheets แล้วบันทึกลง Response Sheet", []),
+    "submit": ("form", "ส่ง TYFCB ล่าสุดจาก Google Sheets เข้า Google Form", []),
+    "integrated": ("integrated", "ดึง TYFCB แล้วส่ง Google Form ในการรันเดียว", []),
+    "bench": (None, "benchmark แบบ offline", []),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m bni", description="BNI TYFCB Automation")
+    subparsers = parser.add_subparsers(dest="command", metavar="คำสั่ง")
+    subparsers.required = True
+    for command, (script, help_text, script_args) in COMMANDS.items():
+        source = " ".join([SCRIPTS[script]] + script_args) if script else "bench/run_bench.py"
+        subparsers.add_parser(command, help=f"{help_text} ({source})", add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args, rest = build_parser().parse_known_args(argv)
+    script, _, script_args = COMMANDS[args.command]
+
+    if script is None:
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from bench.run_bench import main as bench_main
+        bench_main(rest)
+        return 0
+
+    # สคริปต์อ่าน argument จาก sys.argv เอง (argparse ใน main ของแต่ละสคริปต์)
+    # คืนค่า exit code: 0 เมื่อสคริปต์คืนค่าสำเร็จ ไม่เช่นนั้น 1
+    sys.argv = [SCRIPTS[script]] + script_args + rest
+    return 0 if load_script(script).main() else 1
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+อ่านตัวเลขทุก tile บน BNI dashboard (มุมมอง Lifetime) ใน execute_script ครั้งเดียว
+
+แทนการหา element ทีละตัวผ่าน WebDriver - script จะหา label ของแต่ละ metric
+แล้วอ่านค่าตัวเลขแรกใน tile (MuiBox-root) เดียวกัน คืนค่ากลับมาเป็นข้อความดิบ
+read_dashboard_snapshot() แปลงเป็น dict ที่มีชนิดข้อมูลถูกต้อง (float / int / None)
+"""
+from bni.parsing import parse_amount
+
+# key -> (ชนิดข้อมูล, label ที่อาจพบบน dashboard)
+DASHBOARD_METRICS = {
+    "tyfcb_received": ("amount", ["TYFCB Received"]),
+    "tyfcb_given": ("amount", ["TYFCB Given"]),
+    "referrals_given": ("count", ["Referrals Given"]),
+    "referrals_received": ("count", ["Referrals Received"]),
+    "visitors": ("count", ["Visitors"]),
+    "one_to_ones": ("count", ["One to Ones", "1-2-1s", "1 to 1s", "One-to-Ones"]),
+    "ceu": ("count", ["CEU", "CEUs"]),
+}
+
+# คอลัมน์เพิ่มเติมใน Google Sheet (ต่อท้าย Records Count) -> key ใน snapshot
+SHEET_COLUMNS = [
+    ("Referrals Given", "referrals_given"),
+    ("Referrals Received", "referrals_received"),
+    ("Visitors", "visitors"),
+    ("One to Ones", "one_to_ones"),
+    ("CEU", "ceu"),
+]
+
+SNAPSHOT_SCRIPT = """
+const aliases = arguments[0];
+const norm = (text) => (text || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+const lookup = {};
+for (const [key, labels] of Object.entries(aliases)) {
+    for (const label of labels) lookup[norm(label)] = key;
+}
+const result = {};
+for (const element of document.querySelectorAll('p, span, div, h4, h5, h6')) {
+    if (element.children.length) continue;
+    const key = lookup[norm(element.textContent)];
+    if (!key || key in result) continue;
+    const tile = element.closest('.MuiBox-root');
+    if (!tile) continue;
+    let value = null;
+    for (const candidate of tile.querySelectorAll('p, span, div, h4, h5, h6')) {
+        if (candidate === element || candidate.children.length) continue;
+        const text = candidate.textContent.trim();
+        if (/\\d/.test(text) && !(norm(text) in lookup)) {
+            value = text;
+            break;
+        }
+    }
+    result[key] = value;
+}
+return result;
+"""
+
+
+def parse_metric(raw, kind):
+    """แปลงข้อความดิบของ tile เป็นตัวเลข (amount = float, count = int) หรือ None"""
+    value = parse_amount(raw)
+    if value is None:
+        return None
+    return float(value) if kind == "amount" else int(value)
+
+
+def read_dashboard_snapshot(driver):
+    """
+    อ่านทุก metric บน dashboard ใน WebDriver call เดียว
+
+    คืนค่า (metrics, raw) - metrics เป็น dict ตาม DASHBOARD_METRICS (None ถ้าไม่พบ)
+    raw เป็นข้อความดิบที่อ่านได้ เช่น "฿ 1,234,567"
+    """
+    aliases = {key: labels for key, (_, labels) in DASHBOARD_METRICS.items()}
+    raw = driver.execute_script(SNAPSHOT_SCRIPT, aliases) or {}
+    metrics = {key: parse_metric(raw.get(key), kind) for key, (kind, _) in DASHBOARD_METRICS.items()}
+    return metrics, raw
+
+
+def sheet_values(metrics):
+    """ค่าของคอลัมน์เพิ่มเติมตามลำดับ SHEET_COLUMNS (ช่องว่างถ้าไม่พบ)"""
+    metrics = metrics or {}
+    return [metrics.get(key) if metrics.get(key) is not None else "" for _, key in SHEET_COLUMNS]
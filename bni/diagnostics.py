@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+เก็บข้อมูลสำหรับตรวจสอบปัญหาเฉพาะเมื่อการรันล้มเหลว
+
+ระหว่างรันจะเก็บเฉพาะ ring buffer ในหน่วยความจำ (ไม่เรียก WebDriver เพิ่ม ไม่เขียนไฟล์):
+- step(label): ขั้นตอนล่าสุด BNI_DIAGNOSTICS_STEPS รายการ (ทุก span / phase ของ tracer ถูกบันทึกให้อัตโนมัติ)
+- snapshot(label, html): HTML ที่สคริปต์ดึงมาใช้อยู่แล้ว (เช่น page_source ของรายงาน) - เก็บแค่ reference
+  ล่าสุด SNAPSHOT_PAGES หน้า
+
+capture(driver, reason) เรียกเมื่อล้มเหลวเท่านั้น: ถ่ายภาพหน้าจอเป็น JPEG (Page.captureScreenshot ของ Chrome)
+และดึง HTML ของหน้าปัจจุบันทันที แล้วบีบอัด (gzip) และเขียนลง runs/<เวลา>/diagnostics/ ใน thread เบื้องหลัง
+ตั้ง BNI_DIAGNOSTICS=off เพื่อปิดการบันทึกไฟล์
+"""
+import base64
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from bni.state import run_dir
+
+DIAGNOSTICS_ENV = "BNI_DIAGNOSTICS"
+STEPS_ENV = "BNI_DIAGNOSTICS_STEPS"
+MAX_STEPS = 50
+SNAPSHOT_PAGES = 3
+JPEG_QUALITY = 60
+WRITE_TIMEOUT_S = 30
+
+
+def diagnostics_enabled():
+    return os.getenv(DIAGNOSTICS_ENV, "failure").lower() != "off"
+
+
+def _max_steps():
+    try:
+        return max(1, int(os.getenv(STEPS_ENV, MAX_STEPS)))
+    except ValueError:
+        return MAX_STEPS
+
+
+def _slug(text):
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", str(text)).strip("_")[:60] or "failure"
+
+
+def _screenshot_jpeg(driver):
+    """ภาพหน้าจอแบบ JPEG (base64) จาก Chrome - ใช้ PNG ของ WebDriver ถ้าไม่มี CDP"""
+    try:
+        result = driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": JPEG_QUALITY})
+        return "jpg", result["data"]
+    except Exception:
+        return "png", driver.get_screenshot_as_base64()
+
+
+class Diagnostics:
+    def __init__(self, max_steps=None, pages=SNAPSHOT_PAGES):
+        self._start = time.perf_counter()
+        self.steps = deque(maxlen=max_steps or _max_steps())
+        self.pages = deque(maxlen=pages)
+        self.captures = 0
+        self._writers = []
+
+    def _elapsed(self):
+        return round(time.perf_counter() - self._start, 3)
+
+    def step(self, label, **details):
+        """บันทึกขั้นตอนลง ring buffer"""
+        self.steps.append(dict(details, label=label, at_s=self._elapsed()))
+
+    def snapshot(self, label, html):
+        """เก็บ HTML ที่ดึงมาแล้วไว้ใน ring buffer (ไม่คัดลอก ไม่เขียนไฟล์)"""
+        if html:
+            self.pages.append((label, self._elapsed(), html))
+
+    def capture(self, driver, reason):
+        """
+        เก็บภาพหน้าจอ, HTML ของหน้าปัจจุบัน, snapshot และขั้นตอนล่าสุดเมื่อล้มเหลว
+        เรียก WebDriver ใน thread นี้ (ก่อนปิด driver) ส่วนการบีบอัดและเขียนไฟล์ทำใน thread เบื้องหลัง
+        คืนค่าโฟลเดอร์ที่จะเขียน หรือ None ถ้าปิดใช้งาน
+        """
+        if not diagnostics_enabled():
+            return None
+
+        artifacts = {}
+        if driver is not None:
+            try:
+                artifacts["url"] = driver.current_url
+            except Exception:
+                pass
+            try:
+                artifacts["screenshot"] = _screenshot_jpeg(driver)
+            except Exception as e:
+                print(f"⚠️  ถ่ายภาพหน้าจอไม่สำเร็จ: {e}")
+            try:
+                artifacts["page_source"] = driver.page_source
+            except Exception:
+                pass
+
+        self.captures += 1
+        directory = os.path.join(run_dir(), "diagnostics", f"{self.captures:02d}-{_slug(reason)}")
+        payload = {
+            "reason": reason,
+            "at_s": self._elapsed(),
+            "steps": list(self.steps),
+            "pages": list(self.pages),
+            "artifacts": artifacts,
+        }
+        writer = threading.Thread(target=self._write, args=(directory, payload), name="bni-diagnostics")
+        writer.start()
+        self._writers.append(writer)
+        print(f"🩺 บันทึกข้อมูลตรวจสอบปัญหา ({reason}) ไว้ที่ {directory}")
+        return directory
+
+    def _write(self, directory, payload):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            artifacts = payload["artifacts"]
+            if "screenshot" in artifacts:
+                extension, data = artifacts["screenshot"]
+                with open(os.path.join(directory, f"screenshot.{extension}"), "wb") as f:
+                    f.write(base64.b64decode(data))
+            if "page_source" in artifacts:
+                with gzip.open(os.path.join(directory, "page.html.gz"), "wt", encoding="utf-8") as f:
+                    f.write(artifacts["page_source"])
+            pages = []
+            for index, (label, at_s, html) in enumerate(payload["pages"], start=1):
+                filename = f"snapshot-{index}-{_slug(label)}.html.gz"
+                with gzip.open(os.path.join(directory, filename), "wt", encoding="utf-8") as f:
+                    f.write(html)
+                pages.append({"label": label, "at_s": at_s, "file": filename})
+            summary = {
+                "reason": payload["reason"],
+                "at_s": payload["at_s"],
+                "url": artifacts.get("url"),
+                "steps": payload["steps"],
+                "snapshots": pages,
+            }
+            with open(os.path.join(directory, "steps.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+        except Exception as e:
+            print(f"⚠️  บันทึกข้อมูลตรวจสอบปัญหาไม่สำเร็จ: {e}")
+
+    def wait(self, timeout=WRITE_TIMEOUT_S):
+        """รอให้ thread ที่เขียนไฟล์ทำงานเสร็จ (เรียกก่อนจบโปรแกรม)"""
+        deadline = time.monotonic() + timeout
+        for writer in self._writers:
+            writer.join(max(0.0, deadline - time.monotonic()))
+        self._writers = [writer for writer in self._writers if writer.is_alive()]
+        return not self._writers
+
+
+_diagnostics = None
+
+
+def get_diagnostics():
+    """คืนค่า ring buffer ของ process นี้ (สร้างใหม่ถ้ายังไม่มี)"""
+    global _diagnostics
+    if _diagnostics is None:
+        _diagnostics = Diagnostics()
+    return _diagnostics
+
+
+def reset_diagnostics():
+    """เริ่ม ring buffer ใหม่สำหรับการรันครั้งนี้ (start_run เรียกให้)"""
+    global _diagnostics
+    if _diagnostics is not None:
+        _diagnostics.wait()
+    _diagnostics = Diagnostics()
+    return _diagnostics
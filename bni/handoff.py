@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+ส่งต่อผลของ scraper ให้ monitor และ form submitter โดยไม่ต้องอ่าน Google Sheet ทั้งแผ่น
+
+scraper เขียนแถวที่บันทึกลง Sheet ของแต่ละ Running User ลง handoff.json ในโฟลเดอร์ state
+(ยอดเงินเป็นตัวเลข, timestamp เป็นทั้ง serial number และข้อความแบบที่ Sheet แสดง)
+google-form-automation.py และ google-form-selenium-automation.py อ่านไฟล์นี้แทน get_all_records()
+และกลับไปอ่าน Sheet เมื่อไม่มีไฟล์ ไฟล์เสีย หรือไฟล์เก่ากว่า HANDOFF_MAX_AGE_DAYS
+
+แต่ละแถวบันทึกบัญชี (username ที่ใช้ล็อกอิน) ที่เป็นเจ้าของแถว และไฟล์บันทึกรายชื่อบัญชี (roster) ของ
+runner ที่เขียน - ในโหมด --shard / --queue ไฟล์ในเครื่องอาจมีเฉพาะบัญชีของ runner นี้ จึงใช้ไฟล์
+เมื่อมีแถวของทุกบัญชีใน roster เท่านั้น (ไม่ครบ = อ่านจากแท็บ TYFCB Latest / Sheet แทน)
+
+ตั้ง BNI_HANDOFF=false เพื่ออ่านจาก Sheet เสมอ
+"""
+import os
+from datetime import datetime, timedelta
+
+from bni.parsing import format_amount, parse_amount, sheets_serial
+from bni.state import load_json, save_json
+
+HANDOFF_FILE = "handoff.json"
+HANDOFF_ENV = "BNI_HANDOFF"
+HANDOFF_VERSION = 2
+# ไฟล์ version 1 ไม่มีบัญชีของแถวและ roster - scraper อ่านแถวเดิมมาเขียนต่อได้ แต่ฝั่งอ่านไม่ใช้
+_WRITABLE_VERSIONS = (1, HANDOFF_VERSION)
+# เท่ากับช่วงข้อมูลใหม่ที่ monitor ส่งต่อ - ไฟล์ที่เก่ากว่านี้อาจไม่ตรงกับ Sheet แล้ว
+HANDOFF_MAX_AGE_DAYS = 7
+
+# รูปแบบเดียวกับ numberFormat ของคอลัมน์ Timestamp ใน Sheet (mm/dd/yyyy hh:mm:ss)
+TIMESTAMP_DISPLAY_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def handoff_enabled():
+    return os.getenv(HANDOFF_ENV, "true").lower() != "false"
+
+
+def _account_key(account):
+    return str(account or "").strip().lower() or "(unknown)"
+
+
+def _load():
+    data = load_json(HANDOFF_FILE, {})
+    if data.get("version") not in _WRITABLE_VERSIONS:
+        return {}, None
+    return data.get("rows", {}), data.get("roster")
+
+
+def _save_rows(rows, roster=None):
+    return save_json(HANDOFF_FILE, {
+        "version": HANDOFF_VERSION,
+        "written_at": datetime.now().strftime(_TIME_FORMAT),
+        "roster": sorted({_account_key(account) for account in roster or []}),
+        "rows": rows,
+    })
+
+
+def write_handoff(running_user, tyfcb_received, chapter="", total_given_amount="", records_count=0,
+                  moment=None, account=None, roster=None):
+    """
+    บันทึกแถวที่ scraper เพิ่มลง Sheet (แทนแถวเดิมของ Running User เดียวกัน)
+    account = username ที่ใช้ล็อกอินของแถวนี้, roster = รายชื่อบัญชีทั้งหมดที่ runner นี้รู้จัก
+    (None = ใช้ roster เดิมในไฟล์)
+    """
+    moment = moment or datetime.now()
+    rows, saved_roster = _load()
+    rows[_account_key(running_user)] = {
+        "running_user": running_user,
+        "account": _account_key(account) if account else None,
+        "tyfcb_received": tyfcb_received,
+        "chapter": chapter,
+        "total_given_amount": total_given_amount,
+        "records_count": records_count,
+        "timestamp": sheets_serial(moment),
+        "timestamp_text": moment.strftime(TIMESTAMP_DISPLAY_FORMAT),
+    }
+    return _save_rows(rows, saved_roster if roster is None else roster)
+
+
+def touch_handoff(running_user, moment=None):
+    """อัปเดต Timestamp ของแถวเดิม (โหมด TYFCB_UNCHANGED_MODE=touch) - ไม่มีแถวเดิมก็ไม่ทำอะไร"""
+    moment = moment or datetime.now()
+    rows, roster = _load()
+    row = rows.get(_account_key(running_user))
+    if not row:
+        return False
+    row["timestamp"] = sheets_serial(moment)
+    row["timestamp_text"] = moment.strftime(TIMESTAMP_DISPLAY_FORMAT)
+    return _save_rows(rows, roster)
+
+
+def claim_handoff_row(running_user, account, roster=None):
+    """
+    ระบุบัญชีของแถวเดิมที่ข้อมูลไม่เปลี่ยน (ไม่มีการเขียน Sheet รอบนี้) - แถวใน Sheet ยังเป็นค่าปัจจุบัน
+    ไม่มีแถวเดิมก็ไม่ทำอะไร (ฝั่งอ่านจะเห็นว่า handoff ไม่ครบแล้วอ่านจาก Sheet แทน)
+    """
+    rows, saved_roster = _load()
+    row = rows.get(_account_key(running_user))
+    if not row or not account:
+        return False
+    row["account"] = _account_key(account)
+    return _save_rows(rows, saved_roster if roster is None else roster)
+
+
+def handoff_accounts(rows):
+    """บัญชีที่มีแถวอยู่ใน handoff (เฉพาะแถวที่ระบุบัญชี)"""
+    return {row["account"] for row in rows if row.get("account")}
+
+
+def read_handoff(max_age_days=HANDOFF_MAX_AGE_DAYS, now=None, expected_accounts=None):
+    """
+    แถวจาก scraper เรียงจาก Timestamp ล่าสุด
+    คืนค่า None ถ้าต้องอ่านจาก Sheet แทน (ปิดใช้งาน, ไม่มีไฟล์, ไฟล์เสีย, เก่าเกินไป
+    หรือไม่มีแถวของทุกบัญชีใน roster ของไฟล์และ expected_accounts ของผู้อ่าน)
+    """
+    if not handoff_enabled():
+        return None
+
+    data = load_json(HANDOFF_FILE, {})
+    if data.get("version") != HANDOFF_VERSION or not data.get("rows"):
+        return None
+    try:
+        written_at = datetime.strptime(data["written_at"], _TIME_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (now or datetime.now()) - written_at > timedelta(days=max_age_days):
+        print(f"ℹ️  {HANDOFF_FILE} เก่ากว่า {max_age_days} วัน ({data['written_at']}) - อ่านจาก Google Sheets แทน")
+        return None
+
+    rows = [row for row in data["rows"].values() if isinstance(row, dict)]
+    expected = set(data.get("roster") or []) | {_account_key(account) for account in expected_accounts or []}
+    missing = expected - handoff_accounts(rows)
+    if missing:
+        # เช่น runner ของ --shard / --queue ที่เขียนเฉพาะบัญชีของตัวเอง
+        print(f"ℹ️  {HANDOFF_FILE} มีผลของ {len(expected) - len(missing)}/{len(expected)} บัญชี - อ่านจาก Google Sheets แทน")
+        return None
+    return sorted(rows, key=lambda row: row.get("timestamp") or 0, reverse=True)
+
+
+def display_amount(value):
+    """ยอดเงินแบบที่ Sheet แสดง เช่น 1234567.0 -> "1,234,567" (เก็บทศนิยมถ้ามี)"""
+    amount = parse_amount(value)
+    if amount is None:
+        return str(value or "").strip()
+    return format_amount(amount, places=0 if amount == amount.to_integral_value() else 2)
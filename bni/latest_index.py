@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+แท็บ "TYFCB Latest" - index หนึ่งแถวต่อ Running User ของแถวล่าสุดใน sheet ประวัติ
+
+คอลัมน์: Running User, Timestamp, TYFCB Received, Total Given Amount, Chapter, Records Count
+และ Row (เลขแถวใน sheet หลัก, ว่างถ้าแถวถูกย้ายไปแท็บ archive แล้ว)
+
+ฝั่งเขียน (write_spooled_rows ของ scraper) ส่ง request ของ index (latest_index_requests) ใน
+spreadsheets.batchUpdate เดียวกับการเขียน sheet หลัก - แถวของผู้ใช้เดิมถูกเขียนทับที่ตำแหน่งเดิม
+ผู้ใช้ใหม่ต่อท้าย แท็บจึงมีประมาณหนึ่งแถวต่อผู้ใช้ และ runner --shard หลายตัวเขียนพร้อมกันได้โดยไม่ทับแถวกัน
+ถ้ายังไม่มีแท็บ หรือแท็บมีแถวเกิน LATEST_COMPACT_FACTOR เท่าของจำนวนผู้ใช้ จะสร้างใหม่จาก sheet หลักทั้งแผ่น
+ฝั่งอ่าน (monitor / form submitter) อ่านเฉพาะแท็บนี้แทนการไล่ทั้ง sheet และเลือกแถวที่ Timestamp ล่าสุด
+ของแต่ละ Running User (กันกรณีแถวซ้ำจากการสร้างแท็บพร้อมกัน)
+ตั้ง TYFCB_LATEST_INDEX=false เพื่ออ่านจาก sheet หลักเสมอ
+
+ถ้าอ่านหรือสร้าง index ไม่สำเร็จ (แถวถูกเขียนลง sheet หลักแล้ว) mark_latest_stale() จะบันทึก flag ไว้ใน state
+และเขียนเครื่องหมายที่ STALE_CELL ของแท็บ - flush ถัดไปจะสร้าง index ใหม่จาก sheet หลักทั้งแผ่น
+และฝั่งอ่านจะกลับไปอ่าน sheet หลักระหว่างที่ index ยังไม่ถูกสร้างใหม่
+"""
+import os
+from datetime import datetime
+
+from bni.parsing import TimestampParser
+from bni.sheets_scheduler import DATE_TIME_FORMAT, append_cells_request, update_cells_request
+from bni.state import load_json, save_json
+
+LATEST_TAB = "TYFCB Latest"
+LATEST_INDEX_ENV = "TYFCB_LATEST_INDEX"
+LATEST_HEADERS = ["Running User", "Timestamp", "TYFCB Received", "Total Given Amount", "Chapter",
+                  "Records Count", "Row"]
+
+LATEST_STATE_FILE = "latest_index.json"
+# เซลล์ถัดจาก header ของแท็บ index - มีค่าเมื่อ index ไม่ตรงกับ sheet หลัก (write_latest_tab ล้างให้)
+STALE_CELL = "H1"
+# สร้างแท็บใหม่เมื่อจำนวนแถวเกินกี่เท่าของจำนวน Running User (แถวซ้ำจากการสร้างแท็บพร้อมกัน)
+LATEST_COMPACT_FACTOR = 2
+
+# ตำแหน่งคอลัมน์ใน sheet หลัก (ตาม header ที่ save_to_google_sheet สร้าง)
+_TIMESTAMP, _RECEIVED, _USER, _CHAPTER, _GIVEN, _RECORDS = range(6)
+# ตำแหน่งคอลัมน์ในแท็บ index
+_INDEX_USER, _INDEX_TIMESTAMP, _INDEX_ROW = 0, 1, 6
+
+
+def latest_index_enabled():
+    return os.getenv(LATEST_INDEX_ENV, "true").lower() != "false"
+
+
+def _cell(row, index):
+    return row[index] if index < len(row) else ""
+
+
+def user_key(user):
+    return str(user or "").strip().lower() or "(unknown)"
+
+
+def open_tab(spreadsheet, title, header):
+    """
+    เปิดแท็บตามชื่อ หรือสร้างใหม่พร้อม header คืนค่า (worksheet, สร้างใหม่หรือไม่)
+    ถ้า runner อื่นสร้างแท็บชื่อเดียวกันไปก่อน (add_worksheet ล้มเหลว) จะเปิดแท็บนั้นแทน
+    """
+    from gspread.exceptions import APIError, WorksheetNotFound
+
+    try:
+        return spreadsheet.worksheet(title), False
+    except WorksheetNotFound:
+        pass
+    try:
+        worksheet = spreadsheet.add_worksheet(title=title, rows=1000, cols=len(header))
+    except APIError as error:
+        try:
+            return spreadsheet.worksheet(title), False
+        except WorksheetNotFound:
+            raise error
+    worksheet.update(range_name="A1", values=[header])
+    return worksheet, True
+
+
+def latest_entry(row, row_number):
+    """แถวของแท็บ TYFCB Latest จากแถวใน sheet หลัก (row_number ว่างถ้าแถวอยู่ในแท็บ archive)"""
+    return [
+        _cell(row, _USER),
+        _cell(row, _TIMESTAMP),
+        _cell(row, _RECEIVED),
+        _cell(row, _GIVEN),
+        _cell(row, _CHAPTER),
+        _cell(row, _RECORDS),
+        row_number or "",
+    ]
+
+
+def latest_by_user(rows, parser=None):
+    """
+    แถวล่าสุดของแต่ละ Running User จาก list ของ (row_number, row)
+    คืนค่า dict {user key: (row_number, row)} - แถวที่ Timestamp เท่ากันใช้แถวที่อยู่ล่างกว่า
+    """
+    parser = parser or TimestampParser()
+    latest = {}
+    for row_number, row in rows:
+        user = str(_cell(row, _USER)).strip()
+        moment = parser.parse(_cell(row, _TIMESTAMP))
+        if not user or moment is None:
+            continue
+        current = latest.get(user_key(user))
+        if current is None or moment >= current[0]:
+            latest[user_key(user)] = (moment, row_number, row)
+    return {key: (row_number, row) for key, (_, row_number, row) in latest.items()}
+
+
+def write_latest_tab(spreadsheet, latest, worksheet=None):
+    """เขียนแท็บ TYFCB Latest ใหม่ทั้งแท็บ (หนึ่งแถวต่อ Running User) จากผลของ latest_by_user"""
+    entries = [latest_entry(row, row_number) for _, (row_number, row) in sorted(latest.items())]
+    if worksheet is None:
+        worksheet, _ = open_tab(spreadsheet, LATEST_TAB, LATEST_HEADERS)
+    worksheet.clear()
+    worksheet.update(range_name="A1", values=[LATEST_HEADERS] + entries)
+    if entries:
+        worksheet.format(f"B2:B{len(entries) + 1}", DATE_TIME_FORMAT)
+    return worksheet
+
+
+def latest_index_stale():
+    """True ถ้าการอัปเดต index ครั้งก่อนล้มเหลวและยังไม่ได้สร้างใหม่ (flag ใน state ของเครื่องนี้)"""
+    return bool(load_json(LATEST_STATE_FILE, {}).get("stale"))
+
+
+def mark_latest_stale(spreadsheet, error=None):
+    """
+    บันทึกว่า index ไม่ตรงกับ sheet หลัก - เรียกเมื่ออ่านหรือสร้าง index ไม่สำเร็จ
+    เขียน flag ลง state (ให้ flush ถัดไปสร้างใหม่) และเครื่องหมายในแท็บ (ให้ฝั่งอ่านบนเครื่องอื่นรู้) ถ้าทำได้
+    """
+    since = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    save_json(LATEST_STATE_FILE, {"stale": True, "since": since, "error": str(error or "")})
+    try:
+        spreadsheet.worksheet(LATEST_TAB).update(range_name=STALE_CELL, values=[[f"stale since {since}"]])
+    except Exception as e:
+        print(f"⚠️  เขียนเครื่องหมายในแท็บ {LATEST_TAB} ไม่สำเร็จ: {e}")
+
+
+def rebuild_latest_tab(spreadsheet, main_worksheet, worksheet=None):
+    """สร้าง index ใหม่จาก sheet หลักทั้งแผ่น (ล้างเครื่องหมาย stale ทั้งในแท็บและใน state)"""
+    values = main_worksheet.get_values(value_render_option="UNFORMATTED_VALUE")
+    worksheet = write_latest_tab(spreadsheet, latest_by_user(enumerate(values[1:], start=2)), worksheet)
+    save_json(LATEST_STATE_FILE, {"stale": False})
+    return worksheet
+
+
+def _latest_index_rows(values, parser):
+    """
+    แถวล่าสุดของแต่ละ Running User จากค่าทั้งแท็บ index (แถวแรกคือ header) คืนค่า {user key: (ตำแหน่ง, row)}
+    ข้ามแถว header ที่ซ้ำ (runner หลายตัวสร้างแท็บพร้อมกัน) - แถวที่ Timestamp เท่ากันใช้แถวที่อยู่ล่างกว่า
+    """
+    latest = {}
+    for position, row in enumerate(values[1:], start=2):
+        user = str(_cell(row, _INDEX_USER)).strip()
+        if not user or user == LATEST_HEADERS[_INDEX_USER]:
+            continue
+        moment = parser.parse(_cell(row, _INDEX_TIMESTAMP))
+        current = latest.get(user_key(user))
+        if current is None or (moment is not None and (current[0] is None or moment >= current[0])):
+            latest[user_key(user)] = (moment, position, row)
+    return {key: (position, row) for key, (_, position, row) in latest.items()}
+
+
+def latest_index_requests(worksheet, appended=(), touched=()):
+    """
+    request ของ spreadsheets.batchUpdate ที่อัปเดต index - ส่งใน request เดียวกับการเขียน sheet หลัก
+    คืนค่า (requests, compact) - compact=True เมื่อแท็บมีแถวเกิน LATEST_COMPACT_FACTOR เท่าของจำนวนผู้ใช้
+    (ให้ผู้เรียกสร้างใหม่ด้วย rebuild_latest_tab หลังเขียนสำเร็จ)
+
+    ผู้ใช้ที่มีแถวในแท็บแล้วถูกเขียนทับที่ตำแหน่งเดิม (updateCells) ผู้ใช้ใหม่ต่อท้าย (appendCells) -
+    ตำแหน่งของแถวเปลี่ยนเฉพาะเมื่อแท็บถูกเขียนใหม่ทั้งแท็บ runner --shard ที่ทำคนละบัญชีจึงไม่เขียนทับกัน
+
+    appended: list ของ (row_number, row) ที่เขียนลง sheet หลัก (row_number เป็น None ถ้ายังไม่รู้เลขแถว)
+    touched: list ของ (running_user, row_number, timestamp) ที่อัปเดต Timestamp ของแถวเดิม (โหมด touch)
+    """
+    parser = TimestampParser()
+    values = worksheet.get_values(value_render_option="UNFORMATTED_VALUE")
+    current = _latest_index_rows(values, parser)
+    requests, new_entries = [], []
+
+    for key, (row_number, row) in latest_by_user(appended, parser).items():
+        position, existing = current.get(key, (None, None))
+        entry = latest_entry(row, row_number)
+        if existing is None:
+            new_entries.append(entry)
+            continue
+        # แถวจาก spool ที่ค้างจากการรันก่อนอาจเก่ากว่าค่าใน index แล้ว
+        existing_moment = parser.parse(_cell(existing, _INDEX_TIMESTAMP))
+        if existing_moment is not None and existing_moment > parser.parse(_cell(row, _TIMESTAMP)):
+            continue
+        requests.append(update_cells_request(worksheet.id, position, entry, date_columns=(_INDEX_TIMESTAMP,)))
+
+    for running_user, row_number, timestamp in touched:
+        position, existing = current.get(user_key(running_user), (None, None))
+        if existing is not None and str(_cell(existing, _INDEX_ROW)) in ("", str(row_number)):
+            requests.append(update_cells_request(worksheet.id, position, [timestamp], column=_INDEX_TIMESTAMP + 1,
+                                                 date_columns=(0,)))
+            requests.append(update_cells_request(worksheet.id, position, [row_number], column=_INDEX_ROW + 1))
+
+    if new_entries:
+        requests.append(append_cells_request(worksheet.id, new_entries, date_columns=(_INDEX_TIMESTAMP,)))
+    compact = len(values) - 1 > LATEST_COMPACT_FACTOR * max(len(current), 1)
+    return requests, compact
+
+
+def read_latest_tab(spreadsheet):
+    """
+    แถวของแท็บ TYFCB Latest เป็น dict ตาม header (ค่าแบบที่ Sheet แสดง) เรียงจาก Timestamp เก่าไปใหม่
+    เหมือนลำดับใน sheet หลัก - คืนค่า None ถ้าไม่มีแท็บ ปิดใช้งาน หรือ index ยังไม่ตรงกับ sheet หลัก
+    (ให้อ่านจาก sheet หลักแทน)
+    """
+    if not latest_index_enabled():
+        return None
+    if latest_index_stale():
+        print(f"ℹ️  แท็บ {LATEST_TAB} ยังไม่ถูกสร้างใหม่หลังอัปเดตล้มเหลว - อ่านจาก Sheet หลักแทน")
+        return None
+
+    from gspread.exceptions import WorksheetNotFound
+
+    try:
+        worksheet = spreadsheet.worksheet(LATEST_TAB)
+    except WorksheetNotFound:
+        return None
+    values = worksheet.get_values()
+    if not values:
+        return None
+
+    header = values[0]
+    stale = header[len(LATEST_HEADERS):]
+    if any(str(cell).strip() for cell in stale):
+        print(f"ℹ️  แท็บ {LATEST_TAB} ถูกทำเครื่องหมายว่าไม่ตรงกับ Sheet หลัก ({' '.join(stale).strip()}) - อ่านจาก Sheet หลักแทน")
+        return None
+    header = header[:len(LATEST_HEADERS)]
+    parser = TimestampParser()
+    # เลือกแถวล่าสุดของแต่ละ Running User (แถวซ้ำจากการสร้างแท็บพร้อมกัน)
+    rows = [row for _, row in _latest_index_rows(values, parser).values()]
+    records = [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in rows]
+    records.sort(key=lambda record: parser.parse(record.get("Timestamp")) or datetime.min)
+    return records
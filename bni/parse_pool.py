@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+แยกข้อมูลจาก HTML ของรายงานหลายหน้าพร้อมกันด้วย ProcessPoolExecutor
+
+การ parse รายงาน BIRT ขนาดใหญ่เป็นงาน CPU ล้วน จึงกระจายไปหลาย process แทนการใช้ thread
+แต่ละ worker คืนผลแบบกะทัดรัดจาก bni.birt (แถวเป็น list ของข้อความ) เพื่อลดต้นทุน pickle
+
+- parse_reports: parse HTML ที่มีอยู่แล้วหลายหน้าในครั้งเดียว (bench)
+- ParseStream: pool ที่เปิดค้างไว้ให้ ReportCrawler ส่ง HTML เข้าไปทีละหน้าระหว่างที่ browser
+  โหลดรายงานถัดไป แล้วรับผลกลับตามลำดับ
+
+จำนวน worker ตั้งได้ด้วย BNI_PARSE_WORKERS (ค่าเริ่มต้น = จำนวน CPU)
+ถ้ามีหน้าเดียว หรือเปิด process pool ไม่ได้ จะ parse ใน process หลักแทน
+"""
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from bni.birt import parse_birt_report
+
+# parser ต้องเป็นฟังก์ชันระดับ module เพื่อส่งข้าม process ได้
+PARSERS = {
+    "birt": parse_birt_report,
+}
+
+
+def parse_workers():
+    try:
+        return max(1, int(os.getenv("BNI_PARSE_WORKERS", os.cpu_count() or 1)))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def parse_reports(pages, parser="birt", workers=None):
+    """
+    parse HTML หลายหน้า คืนค่า list ของผลลัพธ์ตามลำดับเดียวกับ pages
+
+    Parameters:
+    -----------
+    pages : list
+        HTML ของแต่ละรายงาน
+    parser : str
+        ชื่อ parser ใน PARSERS
+    workers : int
+        จำนวน process (None = BNI_PARSE_WORKERS)
+    """
+    parse = PARSERS[parser]
+    workers = min(workers or parse_workers(), len(pages))
+    if workers <= 1:
+        return [parse(page) for page in pages]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(parse, pages))
+    except (OSError, RuntimeError) as e:
+        print(f"⚠️  เปิด process pool ไม่ได้ ({e}) - parse ใน process หลักแทน")
+        return [parse(page) for page in pages]
+
+
+class ParseStream:
+    """
+    process pool ที่เปิดค้างไว้ตลอดการดึงรายงานหลายหน้า
+
+    submit() คืนค่า Future ทันที - ผู้เรียกโหลดหน้าถัดไปต่อได้ระหว่างที่ worker parse หน้าก่อน
+    ถ้า workers <= 1 หรือ pool ใช้ไม่ได้ จะ parse ใน process หลักแล้วคืน Future ที่เสร็จแล้ว
+    """
+
+    def __init__(self, parser="birt", workers=None):
+        self.parse = PARSERS[parser]
+        self.workers = workers or parse_workers()
+        self.pool = None
+        if self.workers > 1:
+            try:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️  เปิด process pool ไม่ได้ ({e}) - parse ใน process หลักแทน")
+
+    def submit(self, page, **kwargs):
+        if self.pool is not None:
+            try:
+                return self.pool.submit(self.parse, page, **kwargs)
+            except (OSError, RuntimeError) as e:
+                # BrokenProcessPool เป็น RuntimeError - หน้าที่เหลือ parse ใน process หลัก
+                print(f"⚠️  process pool ใช้ไม่ได้ ({e}) - parse ใน process หลักแทน")
+                self.close()
+
+        future = Future()
+        try:
+            future.set_result(self.parse(page, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
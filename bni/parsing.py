@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+แปลงยอดเงินและ timestamp ที่ใช้ร่วมกันทุกสคริปต์
+
+ยอดเงิน: ตัดสัญลักษณ์ (฿, ช่องว่าง, ตัวอักษร) ด้วย regex ที่ compile ไว้แล้ว คิดเป็น Decimal
+เพื่อไม่ให้ยอดสะสมคลาดเพราะทศนิยมของ float - แปลงเป็น float เฉพาะตอนเขียนลง Sheets (sheet_number)
+
+timestamp: TimestampParser จำรูปแบบที่แปลงสำเร็จล่าสุดไว้ ค่าในคอลัมน์เดียวกันมักใช้รูปแบบเดียว
+จึงลองรูปแบบนั้นก่อน (strptime ครั้งเดียวต่อแถว) และลองรูปแบบอื่นเมื่อไม่ตรงเท่านั้น
+รองรับ serial number ของ Google Sheets ด้วย (ตัวเลขจำนวนวันนับจาก 1899-12-30)
+"""
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+# เก็บเฉพาะตัวเลข จุลภาค และจุดทศนิยม (เหมือนกฎเดิมของทุกสคริปต์)
+_AMOUNT_CHARS = re.compile(r"[^\d,.]")
+
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+)
+
+# จำนวนค่าที่ใช้เดารูปแบบของคอลัมน์ใน recent_mask
+_SNIFF_SAMPLE = 500
+
+
+def amount_text(value):
+    """ข้อความยอดเงินที่เหลือเฉพาะตัวเลข จุลภาค และจุด เช่น "฿ 1,234,567" -> "1,234,567" """
+    if value is None:
+        return ""
+    return _AMOUNT_CHARS.sub("", str(value))
+
+
+def parse_amount(value, default=None):
+    """
+    แปลงยอดเงินเป็น Decimal (รับทั้งข้อความที่มี ฿ / จุลภาค และตัวเลขจาก Sheets)
+    คืนค่า default ถ้าไม่มีตัวเลขหรือแปลงไม่ได้
+    """
+    if value is None or isinstance(value, bool):
+        return default
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        # ผ่าน str เพื่อได้ค่าที่แสดง (1234.5) ไม่ใช่ค่าฐานสองของ float
+        return Decimal(str(value))
+    cleaned = amount_text(value).replace(",", "")
+    if not cleaned:
+        return default
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return default
+
+
+def sheet_number(amount):
+    """แปลง Decimal เป็นตัวเลขที่ส่งให้ Sheets API ได้ (Sheets เก็บตัวเลขเป็น double อยู่แล้ว)"""
+    if amount is None:
+        return ""
+    return float(amount)
+
+
+def format_amount(amount, places=0):
+    """จัดรูปแบบยอดเงินพร้อมจุลภาค เช่น Decimal("1234567") -> "1,234,567" """
+    return f"{amount:,.{places}f}"
+
+
+def sheets_serial(moment):
+    """แปลง datetime เป็น serial number ของ Google Sheets"""
+    return (moment - SHEETS_EPOCH).total_seconds() / (24 * 60 * 60)
+
+
+class TimestampParser:
+    """แปลง timestamp ของคอลัมน์เดียวกัน โดยจำรูปแบบที่แปลงสำเร็จล่าสุดไว้ลองก่อน"""
+
+    def __init__(self, formats=TIMESTAMP_FORMATS):
+        self.formats = tuple(formats)
+        self.format = None
+        self.misses = 0
+
+    def parse(self, value):
+        """คืนค่า datetime หรือ None ถ้าแปลงไม่ได้"""
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return SHEETS_EPOCH + timedelta(days=value)
+
+        text = str(value).strip()
+        if not text:
+            return None
+        if self.format:
+            try:
+                return datetime.strptime(text, self.format)
+            except ValueError:
+                pass
+
+        for fmt in self.formats:
+            if fmt == self.format:
+                continue
+            try:
+                parsed = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            self.format = fmt
+            return parsed
+
+        try:
+            # ค่าที่อ่านแบบ formatted แต่เป็น serial number (เช่น "45678.5")
+            return SHEETS_EPOCH + timedelta(days=float(text))
+        except (ValueError, OverflowError):
+            self.misses += 1
+            return None
+
+
+def recent_mask(values, days_limit=7, now=None, formats=TIMESTAMP_FORMATS):
+    """
+    ตรวจทั้งคอลัมน์ Timestamp ในครั้งเดียว คืนค่า list ของ bool ว่าแต่ละแถวอยู่ในช่วง days_limit วันหรือไม่
+
+    รับได้ทั้ง serial number ของ Sheets (ที่ save_to_google_sheet เขียน) และข้อความวันที่
+    ข้อความใช้รูปแบบที่ตรงกับตัวอย่างของคอลัมน์มากที่สุดก่อน (เหมือน TimestampParser ที่จำรูปแบบไว้)
+    ค่าที่แปลงไม่ได้ถือว่าไม่ใช่ข้อมูลใหม่ - ใช้ pandas ถ้ามี ไม่เช่นนั้นใช้ TimestampParser ทีละแถว
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=days_limit)
+    try:
+        import pandas as pd
+    except ImportError:
+        parser = TimestampParser(formats)
+        return [(parsed is not None and parsed >= cutoff) for parsed in map(parser.parse, values)]
+
+    series = pd.Series(list(values), dtype=object)
+    if series.empty:
+        return []
+
+    # serial number (ตัวเลข หรือข้อความที่เป็นตัวเลข) แปลงเป็นวันที่ด้วยการบวก timedelta ทั้ง array
+    serials = pd.to_numeric(series, errors="coerce")
+    parsed = pd.Timestamp(SHEETS_EPOCH) + pd.to_timedelta(serials, unit="D")
+
+    text = series[serials.isna()].astype(str).str.strip()
+    text = text[text != ""]
+    if not text.empty:
+        # ดูตัวอย่างก่อนว่ารูปแบบไหนตรงมากที่สุด - รูปแบบที่ไม่ตรงจะถูกลองกับค่าที่เหลือเท่านั้น
+        sample = text.iloc[:_SNIFF_SAMPLE]
+        hits = {fmt: int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()) for fmt in formats}
+        for fmt in sorted(formats, key=lambda fmt: -hits[fmt]):
+            converted = pd.to_datetime(text, format=fmt, errors="coerce")
+            matched = converted.notna()
+            parsed[converted.index[matched]] = converted[matched]
+            text = text[~matched]
+            if text.empty:
+                break
+
+    # NaT เทียบแล้วได้ False
+    return (parsed >= pd.Timestamp(cutoff)).tolist()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Profiler ของ WebDriver calls (เปิดใช้ด้วย BNI_PROFILE=1)
+
+นับทุกคำสั่งที่ส่งไปยัง WebDriver แยกตามชนิดคำสั่ง (findElements, getElementText, ...)
+และบรรทัดในสคริปต์ที่เป็นต้นเหตุ พร้อมวัด latency แล้วพิมพ์ตาราง top-N ตอนจบการรัน
+ใช้หาลูปที่ควรรวมเป็น execute_script ครั้งเดียว
+
+ทำงานเป็น listener ของ instrument_driver() จึงครอบคลุมคำสั่งของ WebElement ด้วย
+"""
+import os
+import sys
+
+PROFILE_ENV = "BNI_PROFILE"
+PROFILE_TOP_ENV = "BNI_PROFILE_TOP"
+
+_BNI_DIR = os.path.dirname(os.path.abspath(__file__))
+_SELENIUM_PART = os.sep + "selenium" + os.sep
+
+
+def profiling_enabled():
+    return os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def profile_top_n():
+    try:
+        return int(os.getenv(PROFILE_TOP_ENV, "15"))
+    except ValueError:
+        return 15
+
+
+def _call_site():
+    """หาบรรทัดแรกในสคริปต์ที่เรียก WebDriver (ข้าม frame ของ selenium และแพ็กเกจ bni)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_BNI_DIR) and _SELENIUM_PART not in filename:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class DriverProfiler:
+    def __init__(self):
+        # (command, call_site) -> [count, total_s, max_s]
+        self.stats = {}
+
+    def __call__(self, command, params, elapsed):
+        key = (command, _call_site())
+        entry = self.stats.get(key)
+        if entry is None:
+            self.stats[key] = [1, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+    def by_command(self):
+        """รวมผลตามชนิดคำสั่ง เรียงจากเวลารวมมากไปน้อย"""
+        totals = {}
+        for (command, _), (count, total, _) in self.stats.items():
+            current = totals.setdefault(command, [0, 0.0])
+            current[0] += count
+            current[1] += total
+        return sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+
+    def top(self, limit=15):
+        """call site ที่ใช้เวลารวมมากที่สุด limit อันดับแรก"""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        return ranked[:limit]
+
+    def report(self, limit=15):
+        return {
+            "total_calls": sum(entry[0] for entry in self.stats.values()),
+            "total_ms": round(sum(entry[1] for entry in self.stats.values()) * 1000, 1),
+            "by_command": [
+                {"command": command, "count": count, "total_ms": round(total * 1000, 1)}
+                for command, (count, total) in self.by_command()
+            ],
+            "hot_calls": [
+                {
+                    "command": command,
+                    "site": site,
+                    "count": count,
+                    "total_ms": round(total * 1000, 1),
+                    "avg_ms": round(total / count * 1000, 2),
+                    "max_ms": round(max_s * 1000, 1),
+                }
+                for (command, site), (count, total, max_s) in self.top(limit)
+            ],
+        }
+
+    def print_table(self, limit=15):
+        report = self.report(limit)
+        print(f"\n🔬 WebDriver profile: {report['total_calls']} calls, {report['total_ms'] / 1000:.2f} s")
+        print(f"   {'คำสั่ง':<24} {'จำนวน':>7} {'รวม (ms)':>10}")
+        for item in report["by_command"]:
+            print(f"   {item['command']:<24} {item['count']:>7} {item['total_ms']:>10.1f}")
+
+        print(f"\n🔥 Top {limit} hot calls:")
+        print(f"   {'ตำแหน่ง':<52} {'คำสั่ง':<22} {'จำนวน':>7} {'รวม (ms)':>10} {'เฉลี่ย':>8}")
+        for item in report["hot_calls"]:
+            print(f"   {item['site'][:52]:<52} {item['command'][:22]:<22} {item['count']:>7} "
+                  f"{item['total_ms']:>10.1f} {item['avg_ms']:>8.2f}")
+        return report
+
+
+_profiler = None
+
+
+def get_profiler():
+    """คืนค่า profiler ของ process นี้ หรือ None ถ้าไม่ได้เปิด BNI_PROFILE"""
+    global _profiler
+    if _profiler is None and profiling_enabled():
+        _profiler = DriverProfiler()
+    return _profiler
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+ดึงรายงาน BIRT หลายประเภทต่อกันโดยใช้ iframe ของรายงานที่ render ไว้แล้ว
+
+หลังจาก Review -> Go ของ TYFCB Given ครั้งแรก iframe ของรายงานอยู่ในหน้าพร้อม session ที่ล็อกอินแล้ว
+crawler จะเปลี่ยน src ของ iframe ซ้อนไปยังรายงานถัดไป (เปลี่ยน __report / parameter ของ BIRT
+หรือใช้ URL ตรง) แทนการกลับไป dashboard แล้ว Review -> Go -> sleep ใหม่ทุกรายงาน
+
+กำหนดรายงานเพิ่มเติมด้วย BNI_EXTRA_REPORTS (JSON) เช่น
+    {"tyfcb_received": {"report": "TYFCBReceived.rptdesign"},
+     "visitors": {"url": "/web/reports/visitors?format=html", "params": {"period": "lifetime"}}}
+- report: แทนค่า __report ใน URL ของรายงานปัจจุบัน
+- params: แทน/เพิ่ม query parameter อื่นของ BIRT
+- url: URL ตรง (relative กับ URL ของรายงานปัจจุบันได้)
+
+HTML ของแต่ละรายงานถูกส่งเข้า process pool (bni.parse_pool.ParseStream) ทันทีที่โหลดเสร็จ
+ระหว่างที่ worker parse หน้านั้น browser โหลดรายงานถัดไปต่อ
+ผลของแต่ละรายงานส่งต่อตามลำดับทันทีที่ parse เสร็จ (generator) เป็นแถว dict ตามคอลัมน์ใน REPORT_TYPES
+"""
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from selenium.webdriver.common.by import By
+
+from bni.birt import rows_to_records, total_row_amount
+from bni.parse_pool import ParseStream, parse_workers
+from bni.state import run_dir
+from bni.tracing import get_tracer
+
+REPORTS_ENV = "BNI_EXTRA_REPORTS"
+REPORT_ROWS_FILE = "reports.jsonl"
+
+# ชนิดรายงาน -> ชื่อคอลัมน์ตามลำดับในตาราง BIRT
+REPORT_TYPES = {
+    "tyfcb_given": ("date", "thank_you_to", "amount", "new_repeat", "inside_outside", "comments", "status"),
+    "tyfcb_received": ("date", "thank_you_from", "amount", "new_repeat", "inside_outside", "comments", "status"),
+    "referrals_given": ("date", "referral_to", "referral_name", "referral_type", "status", "comments"),
+    "referrals_received": ("date", "referral_from", "referral_name", "referral_type", "status", "comments"),
+    "visitors": ("date", "visitor_name", "company", "invited_by", "status"),
+}
+
+_INNER_SRC_SCRIPT = "const f = document.querySelector('iframe'); return f ? f.src : null;"
+_SET_INNER_SRC_SCRIPT = "document.querySelector('iframe').src = arguments[0];"
+# หน้าเดิมใน iframe ซ้อนถูกทำเครื่องหมายไว้ก่อนเปลี่ยน src - หน้าใหม่จะไม่มีเครื่องหมายนี้
+_MARK_STALE_SCRIPT = "window.__bniStale = true;"
+_REPORT_READY_SCRIPT = """
+return !window.__bniStale && document.readyState === 'complete'
+    && document.querySelector('table') !== null;
+"""
+
+
+def configured_reports():
+    """อ่านรายการรายงานเพิ่มเติมจาก BNI_EXTRA_REPORTS (คืนค่า {} ถ้าไม่ได้ตั้งหรือ JSON ผิด)"""
+    raw = os.getenv(REPORTS_ENV, "").strip()
+    if not raw:
+        return {}
+    try:
+        reports = json.loads(raw)
+    except ValueError as e:
+        print(f"⚠️  {REPORTS_ENV} ไม่ใช่ JSON ที่ถูกต้อง: {e}")
+        return {}
+    unknown = [name for name in reports if name not in REPORT_TYPES]
+    if unknown:
+        print(f"⚠️  ไม่รู้จักชนิดรายงาน {unknown} - ใช้คอลัมน์ตามลำดับเป็น column_1, column_2, ...")
+    return reports
+
+
+def report_url(current_url, spec):
+    """สร้าง URL ของรายงานถัดไปจาก URL ของรายงานที่เปิดอยู่"""
+    if spec.get("url"):
+        base = urljoin(current_url, spec["url"])
+    else:
+        base = current_url
+    parts = urlsplit(base)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    if spec.get("report"):
+        query["__report"] = spec["report"]
+    query.update({key: str(value) for key, value in (spec.get("params") or {}).items()})
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class ReportRowSink:
+    """ปลายทางของแถวจากทุกรายงาน - เขียนเป็น JSONL หนึ่งแถวต่อบรรทัดในโฟลเดอร์ของการรัน"""
+
+    def __init__(self, account, filename=REPORT_ROWS_FILE):
+        self.account = account
+        self.path = os.path.join(run_dir(), filename)
+        self.counts = {}
+
+    def write(self, report_type, rows):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({"report": report_type, "account": self.account, **row}, ensure_ascii=False) + "\n")
+        self.counts[report_type] = self.counts.get(report_type, 0) + len(rows)
+
+
+class ReportCrawler:
+    def __init__(self, driver, timeout=30, poll=0.25):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+
+    def _enter_outer_frame(self):
+        self.driver.switch_to.default_content()
+        self.driver.switch_to.frame(self.driver.find_element(By.TAG_NAME, "iframe"))
+
+    def current_report_url(self):
+        """URL ของรายงานใน iframe ซ้อนที่เปิดอยู่ (None ถ้ายังไม่มีรายงาน)"""
+        try:
+            self._enter_outer_frame()
+            return self.driver.execute_script(_INNER_SRC_SCRIPT)
+        except Exception as e:
+            print(f"⚠️  ไม่พบ iframe ของรายงาน: {e}")
+            return None
+        finally:
+            self.driver.switch_to.default_content()
+
+    def load(self, url):
+        """เปลี่ยน src ของ iframe ซ้อน รอจนตารางแสดง แล้วคืนค่า HTML ของรายงาน"""
+        self._enter_outer_frame()
+        try:
+            self.driver.switch_to.frame(self.driver.find_element(By.TAG_NAME, "iframe"))
+            self.driver.execute_script(_MARK_STALE_SCRIPT)
+            self.driver.switch_to.parent_frame()
+            self.driver.execute_script(_SET_INNER_SRC_SCRIPT, url)
+            deadline = time.monotonic() + self.timeout
+            while True:
+                self.driver.switch_to.frame(self.driver.find_element(By.TAG_NAME, "iframe"))
+                try:
+                    if self.driver.execute_script(_REPORT_READY_SCRIPT):
+                        return self.driver.page_source
+                finally:
+                    self.driver.switch_to.parent_frame()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"รายงานไม่แสดงภายใน {self.timeout} วินาที: {url}")
+                time.sleep(self.poll)
+        finally:
+            self.driver.switch_to.default_content()
+
+    def crawl(self, reports, base_url=None):
+        """
+        ดึงรายงานตาม reports ({ชนิด: spec}) ทีละรายการใน iframe เดิม
+        HTML ที่โหลดแล้วถูก parse ใน process pool ขณะที่รายงานถัดไปกำลังโหลด
+        yield (ชนิดรายงาน, dict ของผล) ตามลำดับทันทีที่แต่ละรายงาน parse เสร็จ - รายงานที่ล้มเหลวจะถูกข้าม
+        """
+        base_url = base_url or self.current_report_url()
+        if not base_url:
+            return
+        tracer = get_tracer()
+        pending = deque()
+        with ParseStream(workers=min(parse_workers(), len(reports))) as stream:
+            for report_type, spec in reports.items():
+                url = report_url(base_url, spec or {})
+                known_columns = REPORT_TYPES.get(report_type)
+                try:
+                    with tracer.span(f"report:{report_type}"):
+                        page_html = self.load(url)
+                except Exception as e:
+                    print(f"⚠️  ดึงรายงาน {report_type} ไม่สำเร็จ: {e}")
+                    continue
+                future = stream.submit(page_html, min_cells=len(known_columns) if known_columns else 2)
+                pending.append((report_type, url, known_columns, future))
+
+                # ส่งต่อรายงานที่ parse เสร็จแล้ว (ตามลำดับ) โดยไม่รอ - แล้วโหลดรายงานถัดไปต่อ
+                while pending and pending[0][3].done():
+                    result = self._parsed_result(tracer, *pending.popleft())
+                    if result:
+                        yield result
+
+            while pending:
+                result = self._parsed_result(tracer, *pending.popleft())
+                if result:
+                    yield result
+
+    def _parsed_result(self, tracer, report_type, url, known_columns, future):
+        """รอผล parse ของรายงานหนึ่ง แล้วแปลงเป็น (ชนิดรายงาน, dict ของผล) - None ถ้า parse ไม่สำเร็จ"""
+        try:
+            with tracer.span(f"parse:{report_type}"):
+                parsed = future.result()
+        except Exception as e:
+            print(f"⚠️  แยกข้อมูลรายงาน {report_type} ไม่สำเร็จ: {e}")
+            return None
+
+        columns = known_columns or tuple(
+            f"column_{i + 1}" for i in range(max((len(row) for row in parsed["rows"]), default=0)))
+        return report_type, {
+            "url": url,
+            "running_user": parsed["running_user"],
+            "run_at": parsed["run_at"],
+            "chapter": parsed["chapter"],
+            "header": parsed["header"],
+            "rows": rows_to_records(parsed["rows"], columns),
+            "total_amount": total_row_amount(parsed),
+        }
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+เปรียบเทียบรายงาน TYFCB Given กับรอบก่อนด้วย fingerprint รายแถว
+
+fingerprint คือ hash ของ (date, thank_you_to, amount, comments) - แถวถูกจับคู่ด้วย fingerprint ทั้งแถว
+และนับจำนวนครั้ง (multiset) จึงไม่ขึ้นกับลำดับของแถวในตาราง แถวที่หายไปและแถวใหม่ที่มี date/ผู้รับเดียวกัน
+ถือว่าเป็นรายการที่ถูกแก้ไข
+
+ผลลัพธ์คือ delta (added / removed / changed) ที่ส่งต่อให้ขั้นตอนถัดไปประมวลผลเฉพาะส่วนที่เปลี่ยน
+"""
+import hashlib
+from collections import Counter
+from datetime import datetime
+
+from bni.report_window import parse_row_date, prune_history
+from bni.state import load_json, update_json
+
+FINGERPRINT_FILE = "tyfcb_given_fingerprints.json"
+FINGERPRINT_FIELDS = ("date", "thank_you_to", "amount", "comments")
+
+
+def _normalize(value):
+    return " ".join(str(value or "").split())
+
+
+def row_fingerprint(row):
+    """สร้าง fingerprint ของแถวจาก (date, thank_you_to, amount, comments)"""
+    payload = "\x1f".join(_normalize(row.get(field)) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _row_key(row):
+    return f"{_normalize(row.get('date'))}|{_normalize(row.get('thank_you_to'))}"
+
+
+def _subtract(rows, counts):
+    """คืนค่าแถวที่เหลือหลังหักแถวที่มี fingerprint อยู่ใน counts (หักทีละครั้ง - counts ถูกแก้ไข)"""
+    remaining = []
+    for row in rows:
+        fp = row_fingerprint(row)
+        if counts[fp] > 0:
+            counts[fp] -= 1
+        else:
+            remaining.append(row)
+    return remaining
+
+
+def diff_rows(previous_rows, current_rows):
+    """
+    เปรียบเทียบแถวรอบก่อนกับรอบนี้ (ทั้งสองฝั่งต้องเป็นรายงานเต็มช่วงเดียวกัน)
+
+    Parameters:
+    -----------
+    previous_rows : list
+        แถวที่เก็บไว้จากรอบก่อน
+    current_rows : list
+        แถวของรอบนี้
+    """
+    added = _subtract(current_rows, Counter(row_fingerprint(row) for row in previous_rows))
+    removed = _subtract(previous_rows, Counter(row_fingerprint(row) for row in current_rows))
+    delta = {"added": [], "removed": [], "changed": [],
+             "unchanged_count": len(current_rows) - len(added)}
+
+    # แถวที่หายไปและแถวใหม่ที่มี date/ผู้รับเดียวกัน = รายการเดิมที่ถูกแก้ไข
+    removed_by_key = {}
+    for row in removed:
+        removed_by_key.setdefault(_row_key(row), []).append(row)
+    for row in added:
+        candidates = removed_by_key.get(_row_key(row))
+        if candidates:
+            delta["changed"].append({"before": candidates.pop(0), "after": row})
+        else:
+            delta["added"].append(row)
+    delta["removed"] = [row for rows in removed_by_key.values() for row in rows]
+    return delta
+
+
+def split_window(rows, window):
+    """แยกแถวเป็น (อยู่ในช่วงวันที่, อยู่นอกช่วง, อ่านวันที่ไม่ได้)"""
+    start, end = window
+    inside, outside, undated = [], [], []
+    for row in rows:
+        row_date = parse_row_date(row.get("date"))
+        if row_date is None:
+            undated.append(row)
+        elif start.date() <= row_date.date() <= end.date():
+            inside.append(row)
+        else:
+            outside.append(row)
+    return inside, outside, undated
+
+
+def merge_window(previous_rows, scanned_rows, window, now=None):
+    """
+    รวมแถวที่อ่านได้จากรายงานที่จำกัดช่วงวันที่ (window) เข้ากับแถวที่เก็บไว้ เพื่อให้ได้รายงานเต็ม 1 ปี
+
+    แถวเก่าที่วันที่อยู่ในช่วงถูกแทนด้วยผลของรอบนี้ทั้งหมด (รายการที่ถูกแก้ / ลบในช่วงจึงไม่ค้าง)
+    แถวเก่าที่อ่านวันที่ไม่ได้จะถูกหักด้วย fingerprint ของแถวที่อ่านได้รอบนี้
+    แล้วตัดแถวที่เก่ากว่า 1 ปีออกตามวันที่ของรายงาน
+    """
+    inside, outside, undated = split_window(previous_rows, window)
+    undated = _subtract(undated, Counter(row_fingerprint(row) for row in scanned_rows))
+    return prune_history(list(scanned_rows) + outside + undated, now)
+
+
+class ReportFingerprintStore:
+    def __init__(self, fingerprint_file=FINGERPRINT_FILE):
+        self.fingerprint_file = fingerprint_file
+        self.data = load_json(self.fingerprint_file, {})
+
+    def _key(self, account):
+        return str(account or "").strip().lower() or "(unknown)"
+
+    def previous_rows(self, account):
+        """คืนค่าแถวที่เก็บไว้จากรอบก่อนของบัญชีนี้"""
+        return self.data.get(self._key(account), {}).get("rows", [])
+
+    def baseline_at(self, account):
+        """
+        เวลาที่บันทึกฐานแบบครบ 1 ปีของบัญชีนี้ (หรือ None)
+        ฐานที่บันทึกก่อนมี flag complete ถือว่าไม่ครบ (อาจเป็นแถวเฉพาะช่วงวันที่) - รอบถัดไปจะดึงทั้งปีใหม่
+        """
+        entry = self.data.get(self._key(account), {})
+        if not entry.get("complete"):
+            return None
+        try:
+            return datetime.strptime(entry.get("updated_at", ""), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+
+    def covers(self, account, window):
+        """True ถ้าฐานที่เก็บไว้ต่อกับช่วงวันที่นี้ได้ครบ 1 ปี (ช่วงเริ่มไม่หลังเวลาที่บันทึกฐาน)"""
+        baseline_at = self.baseline_at(account)
+        return baseline_at is not None and window[0] <= baseline_at
+
+    def compute_delta(self, account, rows, window=None):
+        """
+        คำนวณ delta ของรอบนี้ คืนค่า (delta, full_rows, complete)
+
+        full_rows คือรายงานเต็ม 1 ปี (รวมแถวเก่านอกช่วงวันที่เมื่อรายงานถูกจำกัดด้วย window)
+        complete=False เมื่อฐานที่เก็บไว้ไม่ครอบคลุมส่วนที่เหลือของปี - full_rows เป็นแถวเฉพาะช่วงวันที่
+        และ delta เทียบเฉพาะแถวเก่าในช่วงเดียวกัน (ห้าม commit เป็นฐาน)
+        """
+        previous = prune_history(self.previous_rows(account))
+        if not window:
+            full_rows = prune_history(rows)
+            return diff_rows(previous, full_rows), full_rows, True
+        if self.covers(account, window):
+            full_rows = merge_window(previous, rows, window)
+            return diff_rows(previous, full_rows), full_rows, True
+        inside, outside, undated = split_window(previous, window)
+        return diff_rows(inside, rows), list(rows), False
+
+    def commit(self, account, rows):
+        """
+        บันทึกแถวรายงานเต็ม 1 ปีเป็นฐานสำหรับรอบถัดไป (เรียกหลังประมวลผล delta สำเร็จ
+        และเฉพาะเมื่อ compute_delta คืนค่า complete=True)
+        """
+        entry = {
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "complete": True,
+            "rows": [{k: row.get(k, "") for k in row} for row in rows],
+        }
+
+        # โหลดไฟล์ล่าสุดภายใต้ lock - store อื่นใน process เดียวกัน (เช่น warm-up ของบัญชีก่อนหน้า)
+        # อาจบันทึกบัญชีอื่นไว้หลังจาก store นี้โหลด ไม่ให้ self.data ที่เก่าทับบัญชีเหล่านั้น
+        def update(data):
+            data[self._key(account)] = entry
+
+        self.data = update_json(self.fingerprint_file, update, {})
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+กำหนดช่วงวันที่ของรายงาน TYFCB Given
+
+ค่าเริ่มต้นคือดึงตั้งแต่การรันที่สำเร็จครั้งล่าสุด (เก็บไว้ใน state) ถึงวันนี้
+เพื่อให้ขนาดรายงานแปรตามข้อมูลใหม่ ไม่ใช่ข้อมูลย้อนหลังทั้งปี
+
+Environment variables:
+- TYFCB_DATE_WINDOW: auto (ค่าเริ่มต้น) หรือ full (ไม่กรอกวันที่ ใช้ค่าเริ่มต้น 1 ปีของ BNI)
+- TYFCB_DATE_FROM / TYFCB_DATE_TO: กำหนดช่วงวันที่เอง (YYYY-MM-DD)
+- TYFCB_WINDOW_OVERLAP_DAYS: ย้อนหลังเพิ่มจากการรันครั้งล่าสุด เผื่อรายการที่ลงวันที่ย้อนหลัง (ค่าเริ่มต้น 7)
+- TYFCB_DATE_FORMAT: รูปแบบวันที่ของช่อง From/To ใน popup (ค่าเริ่มต้น %m/%d/%Y)
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from bni.parsing import parse_amount
+from bni.state import load_json, update_json
+
+LAST_RUN_FILE = "last_run.json"
+REPORT_HISTORY_DAYS = 365
+
+ROW_DATE_FORMATS = ["%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d", "%b %d, %Y", "%d %b %Y"]
+
+# คำใน name / id / placeholder / label ที่ใช้ระบุช่อง From และ To ใน popup
+FROM_FIELD_WORDS = {"from", "start", "begin"}
+TO_FIELD_WORDS = {"to", "end", "until"}
+
+
+def _account_key(account):
+    return str(account or "").strip().lower() or "(unknown)"
+
+
+def get_last_successful_run(account):
+    """คืนค่า datetime ของการรันที่สำเร็จครั้งล่าสุดของบัญชีนี้ (หรือ None)"""
+    value = load_json(LAST_RUN_FILE, {}).get(_account_key(account), {}).get("last_success")
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def record_successful_run(account, when=None):
+    """บันทึกเวลาที่รันสำเร็จ ใช้เป็นจุดเริ่มของช่วงวันที่ในรอบถัดไป"""
+    when = when or datetime.now()
+
+    def update(data):
+        data[_account_key(account)] = {"last_success": when.strftime("%Y-%m-%d %H:%M:%S")}
+
+    update_json(LAST_RUN_FILE, update, {})
+
+
+@lru_cache(maxsize=None)
+def _explicit_window(date_from, date_to):
+    """
+    ตรวจ TYFCB_DATE_FROM / TYFCB_DATE_TO ครั้งเดียวต่อค่า คืนค่า (start, end หรือ None)
+    ค่าที่ไม่ถูกต้องจะแจ้งเตือนและคืนค่า None (ใช้ค่าเริ่มต้น 1 ปี)
+    """
+    try:
+        start = datetime.strptime(date_from.strip(), "%Y-%m-%d")
+        end = datetime.strptime(date_to.strip(), "%Y-%m-%d") if date_to else None
+    except ValueError:
+        print(f"⚠️  TYFCB_DATE_FROM / TYFCB_DATE_TO ไม่ถูกต้อง ({date_from} / {date_to}) "
+              f"ต้องเป็น YYYY-MM-DD - ใช้ค่าเริ่มต้น 1 ปี")
+        return None
+    if end is not None and end < start:
+        print(f"⚠️  TYFCB_DATE_TO ({date_to}) อยู่ก่อน TYFCB_DATE_FROM ({date_from}) - ใช้ค่าเริ่มต้น 1 ปี")
+        return None
+    return start, end
+
+
+def resolve_report_window(account, now=None, baseline_at=None):
+    """
+    คำนวณช่วงวันที่ของรายงาน คืนค่า (date_from, date_to) หรือ None ถ้าใช้ค่าเริ่มต้น 1 ปีของ BNI
+
+    baseline_at : datetime
+        เวลาที่บันทึกฐานแถวรายงานแบบครบ 1 ปีครั้งล่าสุด (ReportFingerprintStore.baseline_at)
+        โหมด auto จะจำกัดช่วงวันที่เฉพาะเมื่อมีฐานนี้ เพราะต้องรวมกับแถวเก่าให้ได้ยอดทั้งปี
+    """
+    now = now or datetime.now()
+    mode = os.getenv("TYFCB_DATE_WINDOW", "auto").lower()
+    if mode == "full":
+        return None
+
+    date_from = os.getenv("TYFCB_DATE_FROM")
+    if date_from:
+        explicit = _explicit_window(date_from, os.getenv("TYFCB_DATE_TO") or "")
+        if explicit is None:
+            return None
+        start, end = explicit
+        return start, end or now
+
+    last_success = get_last_successful_run(account)
+    if not last_success or baseline_at is None:
+        # ยังไม่เคยรันสำเร็จหรือยังไม่มีฐานครบปี ต้องดึงทั้งปีเพื่อสร้างฐานข้อมูลก่อน
+        return None
+
+    try:
+        overlap_days = int(os.getenv("TYFCB_WINDOW_OVERLAP_DAYS", "7"))
+    except ValueError:
+        overlap_days = 7
+    start = min(last_success, baseline_at) - timedelta(days=overlap_days)
+    if now - start >= timedelta(days=REPORT_HISTORY_DAYS):
+        return None
+    return start, now
+
+
+def format_window_date(value):
+    """แปลงวันที่เป็นข้อความตามรูปแบบของช่อง From/To ใน popup"""
+    return value.strftime(os.getenv("TYFCB_DATE_FORMAT", "%m/%d/%Y"))
+
+
+def _field_words(text):
+    """แยกคำจาก name / id / label (รองรับ dateFrom, date_from, Start Date)"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text or ""))
+    return set(re.findall(r"[a-z]+", text.lower()))
+
+
+def match_date_range_fields(descriptions):
+    """
+    หาช่อง From/To จากข้อความอธิบายของแต่ละช่อง (name, id, placeholder, aria-label, label)
+    คืนค่า (index ของช่อง From, index ของช่อง To) หรือ None ถ้าระบุไม่ได้
+    """
+    from_index = to_index = None
+    for index, description in enumerate(descriptions):
+        words = _field_words(description)
+        if from_index is None and words & FROM_FIELD_WORDS:
+            from_index = index
+        elif to_index is None and words & TO_FIELD_WORDS:
+            to_index = index
+    if from_index is None or to_index is None:
+        return None
+    return from_index, to_index
+
+
+def parse_row_date(text):
+    """แปลงวันที่ในแถวรายงานเป็น datetime (หรือ None ถ้าไม่รู้จักรูปแบบ)"""
+    text = str(text or "").strip()
+    formats = [os.getenv("TYFCB_DATE_FORMAT", "%m/%d/%Y")] + ROW_DATE_FORMATS
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def prune_history(rows, now=None):
+    """ตัดแถวที่เก่ากว่า 1 ปีออก (แถวที่อ่านวันที่ไม่ได้จะถูกเก็บไว้)"""
+    cutoff = (now or datetime.now()) - timedelta(days=REPORT_HISTORY_DAYS)
+    kept = []
+    for row in rows:
+        row_date = parse_row_date(row.get("date"))
+        if row_date is None or row_date >= cutoff:
+            kept.append(row)
+    return kept
+
+
+def sum_amounts(rows):
+    """รวมยอดเงินของทุกแถว (ใช้แทนแถว Total เมื่อรายงานถูกจำกัดช่วงวันที่)"""
+    return sum((parse_amount(row.get("amount"), Decimal(0)) for row in rows), Decimal(0))
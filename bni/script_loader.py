@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+โหลดสคริปต์หลัก (ชื่อไฟล์มีขีด import ตรงๆ ไม่ได้) เป็น module
+ใช้โดย benchmark และเครื่องมืออื่นที่ต้องเรียกฟังก์ชันในสคริปต์
+"""
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "scraper": "BNI-Lifetime-Selenuim-V5.py",
+    "integrated": "bni-integrated-automation.py",
+    "monitor": "google-form-automation.py",
+    "form": "google-form-selenium-automation.py",
+}
+
+
+def load_script(name):
+    """โหลดสคริปต์ตามชื่อย่อใน SCRIPTS (โหลดครั้งเดียวต่อ process)"""
+    module_name = f"bni_script_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    path = os.path.join(REPO_ROOT, SCRIPTS[name])
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Selector registry ที่จำว่าวิธีค้นหา element แบบไหนสำเร็จล่าสุด
+
+แต่ละ element (เช่น ปุ่ม Go, ปุ่ม Next ของ Google Form) มีหลายวิธีค้นหา
+ทุกครั้งที่ค้นหาจะบันทึกสถิติ hit/miss และเวลาที่ใช้ไว้ใน state
+ครั้งถัดไปจะลองวิธีที่สำเร็จล่าสุดก่อน แล้วตามด้วยวิธีที่สำเร็จบ่อยที่สุด
+ทำให้ไม่ต้องเสียเวลารอ timeout ของวิธีที่รู้อยู่แล้วว่าใช้ไม่ได้
+
+วิธีที่ไม่แม่นยำ (เช่น "ปุ่ม contained ปุ่มแรก") ให้ห่อด้วย heuristic() - จะถูกลองหลังวิธีที่แม่นยำเสมอ
+และไม่ถูกจำเป็นวิธีที่สำเร็จล่าสุด เพื่อไม่ให้วิธีสำรองที่บังเอิญเจอ element ผิดตัวขึ้นมาอยู่ลำดับแรกถาวร
+"""
+import time
+from datetime import datetime
+
+from bni.state import load_json, save_json
+
+SELECTOR_STATS_FILE = "selector_stats.json"
+
+
+def heuristic(label, finder):
+    """วิธีค้นหาสำรองที่ไม่แม่นยำ - ลองหลังวิธีอื่นเสมอและไม่ถูกเรียนรู้ลำดับ"""
+    return (label, finder, False)
+
+
+def _unpack(strategy):
+    """คืนค่า (label, finder, learnable) จาก (label, finder) หรือ heuristic()"""
+    label, finder = strategy[0], strategy[1]
+    learnable = strategy[2] if len(strategy) > 2 else True
+    return label, finder, learnable
+
+
+class SelectorRegistry:
+    def __init__(self, stats_file=SELECTOR_STATS_FILE):
+        self.stats_file = stats_file
+        self.stats = load_json(self.stats_file, {})
+
+    def ordered(self, name, strategies):
+        """
+        เรียงวิธีค้นหา: วิธีที่สำเร็จล่าสุดก่อน แล้วตามจำนวน hit (มากไปน้อย)
+        วิธี heuristic() อยู่ท้ายสุดตามลำดับเดิมเสมอ - คืนค่า list ของ (label, finder, learnable)
+        """
+        entry = self.stats.get(name, {})
+        last_winner = entry.get("last_winner")
+        strategy_stats = entry.get("strategies", {})
+        unpacked = [_unpack(strategy) for strategy in strategies]
+        precise = [strategy for strategy in unpacked if strategy[2]]
+        fallbacks = [strategy for strategy in unpacked if not strategy[2]]
+
+        def sort_key(indexed):
+            index, (label, _, _) = indexed
+            hits = strategy_stats.get(label, {}).get("hits", 0)
+            return (label != last_winner, -hits, index)
+
+        return [strategy for _, strategy in sorted(enumerate(precise), key=sort_key)] + fallbacks
+
+    def _record(self, name, label, hit, elapsed, learnable=True):
+        entry = self.stats.setdefault(name, {"strategies": {}})
+        stats = entry["strategies"].setdefault(label, {"hits": 0, "misses": 0, "total_ms": 0.0})
+        stats["hits" if hit else "misses"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + elapsed * 1000, 1)
+        stats["last_ms"] = round(elapsed * 1000, 1)
+        if hit and learnable:
+            entry["last_winner"] = label
+            entry["last_hit_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def find(self, name, strategies):
+        """
+        ลองค้นหา element ตามลำดับที่เรียนรู้ไว้
+
+        Parameters:
+        -----------
+        name : str
+            ชื่อ element เช่น "bni.go_button"
+        strategies : list
+            list ของ (label, finder) โดย finder เป็นฟังก์ชันที่คืนค่า element
+            (หรือ list ที่ไม่ว่าง) ถ้าพบ และคืนค่า None/ว่าง หรือ raise exception ถ้าไม่พบ
+            วิธีสำรองที่ไม่แม่นยำให้ส่งเป็น heuristic(label, finder)
+
+        คืนค่า (label, result) ของวิธีที่สำเร็จ หรือ (None, None) ถ้าไม่พบ
+        """
+        found_label, found = None, None
+        for label, finder, learnable in self.ordered(name, strategies):
+            start = time.time()
+            try:
+                result = finder()
+            except Exception:
+                result = None
+            self._record(name, label, bool(result), time.time() - start, learnable)
+            if result:
+                found_label, found = label, result
+                break
+
+        save_json(self.stats_file, self.stats)
+        return found_label, found
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+เชื่อมต่อ Google Sheets ด้วย service account (ใช้ร่วมกันทุกสคริปต์)
+
+gspread และ google-auth ใช้เวลา import หลายร้อยมิลลิวินาที จึง import ตอนเชื่อมต่อจริงเท่านั้น
+sheets_available() ตรวจเพียงว่าติดตั้ง package แล้วหรือไม่ (ไม่ import)
+
+credential อ่านจาก GOOGLE_SHEETS_CREDENTIALS (JSON, สำหรับ GitHub Actions)
+หรือไฟล์ google-sheets-credentials.json ในโฟลเดอร์ที่รัน
+"""
+import importlib.util
+import json
+import os
+
+CREDENTIALS_ENV = "GOOGLE_SHEETS_CREDENTIALS"
+CREDENTIALS_FILE = "google-sheets-credentials.json"
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+def sheets_available():
+    """True ถ้าติดตั้ง gspread และ google-auth แล้ว"""
+    try:
+        return all(importlib.util.find_spec(name) is not None for name in ("gspread", "google.oauth2"))
+    except ImportError:
+        return False
+
+
+def load_credentials_info():
+    """ข้อมูล service account (dict) จาก environment variable หรือไฟล์ - None ถ้าไม่พบ"""
+    credentials_json = os.getenv(CREDENTIALS_ENV)
+    if credentials_json:
+        return json.loads(credentials_json)
+
+    if not os.path.exists(CREDENTIALS_FILE):
+        print(f"ไม่พบไฟล์ {CREDENTIALS_FILE} กรุณาวางไฟล์ credentials ไว้ในโฟลเดอร์เดียวกัน")
+        return None
+    with open(CREDENTIALS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def authorize_sheets_client():
+    """
+    สร้าง gspread client คืนค่า (client, service account email)
+    คืนค่า (None, None) ถ้าไม่พบ credential - ข้อผิดพลาดอื่นจะ raise ให้สคริปต์จัดการ
+    """
+    credentials_info = load_credentials_info()
+    if credentials_info is None:
+        return None, None
+
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    credentials = Credentials.from_service_account_info(credentials_info, scopes=SCOPES)
+    return gspread.authorize(credentials), credentials_info.get("client_email", "ไม่พบ email")
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+ตัวจัดคิว request ของ Google Sheets API (ใช้ร่วมกันทุก gspread client ใน process)
+
+- นับ quota read/write ต่อนาทีในเครื่อง และรอก่อนส่งเมื่อใกล้เกิน (แทนการโดน 429)
+- retry เมื่อได้ 429 แบบ exponential backoff + jitter (เคารพ Retry-After ถ้ามี) ก่อนที่ gspread
+  จะโยน APIError ให้โค้ดด้านบน - 5xx และ connection error / timeout retry เฉพาะ request ที่ส่งซ้ำได้
+  (GET และ values:update ซึ่งเขียนค่าเดิมทับช่วงเดิม) เพราะอาจเกิดหลัง Sheets ประมวลผลไปแล้ว:
+  values:append ส่งซ้ำได้แถวซ้ำ และ :batchUpdate (deleteDimension / insertDimension) ส่งซ้ำจะลบ / แทรก
+  แถวที่เลื่อนเข้ามาแทน - request เหล่านี้ส่ง error ให้ผู้เรียกตรวจสอบแทน
+- append_rows(worksheet, rows) คืนค่าเลขแถวที่ถูกเขียนจากผลของ append (ไม่ต้องอ่านทั้ง sheet)
+- append_cells_request / update_cells_request สร้าง request ของ spreadsheets.batchUpdate สำหรับเขียนหลายแท็บ
+  ใน request เดียว (Sheets ทำทั้งชุดหรือไม่ทำเลย)
+- เก็บสถิติ queue depth, เวลาที่ถูก throttle และจำนวน retry ลง tracer
+
+ค่าที่ตั้งได้ผ่าน environment variable:
+SHEETS_READ_QUOTA / SHEETS_WRITE_QUOTA (ต่อนาที, ค่าเริ่มต้น 60 ตาม quota ต่อผู้ใช้ของ Sheets API),
+SHEETS_MAX_RETRIES (5), SHEETS_BACKOFF_BASE (1 วินาที), SHEETS_BACKOFF_MAX (64 วินาที)
+"""
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from bni.tracing import get_tracer, sheets_session
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# request ที่ไม่ idempotent (values:append, :batchUpdate, ...) - ลองใหม่เฉพาะเมื่อถูกจำกัด rate
+# (request ยังไม่ถูกประมวลผล)
+WRITE_RETRY_STATUSES = (429,)
+QUOTA_WINDOW_S = 60.0
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return cast(default)
+
+
+def _retryable_exceptions():
+    """
+    exception ของ connection error / timeout ที่ retry ได้
+    import requests ตอนส่ง request แรก (ไม่เพิ่มเวลา import ของสคริปต์ที่ไม่ได้ใช้ Sheets)
+    """
+    try:
+        from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+        return (RequestsConnectionError, RequestsTimeout)
+    except ImportError:
+        return (ConnectionError, TimeoutError)
+
+
+def _is_idempotent(method, url):
+    """GET และ values:update (PUT .../values/<range>) ส่งซ้ำได้โดยผลไม่เปลี่ยน"""
+    method = method.upper()
+    return method == "GET" or (method == "PUT" and "/values/" in str(url))
+
+
+def _updated_rows(response):
+    """ดึงช่วงแถวจาก updatedRange ของผล append เช่น 'Sheet1'!A5:F7 -> (5, 7)"""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+    except (KeyError, TypeError):
+        return None
+    rows = [int(number) for number in re.findall(r"[A-Za-z]+(\d+)", updated_range.split("!")[-1])]
+    if not rows:
+        return None
+    return rows[0], rows[-1]
+
+
+class SheetsScheduler:
+    def __init__(self, read_quota=None, write_quota=None, max_retries=None,
+                 backoff_base=None, backoff_max=None):
+        self.quotas = {
+            "read": read_quota or _env_number("SHEETS_READ_QUOTA", 60, int),
+            "write": write_quota or _env_number("SHEETS_WRITE_QUOTA", 60, int),
+        }
+        self.max_retries = max_retries if max_retries is not None else _env_number("SHEETS_MAX_RETRIES", 5, int)
+        self.backoff_base = backoff_base or _env_number("SHEETS_BACKOFF_BASE", 1.0)
+        self.backoff_max = backoff_max or _env_number("SHEETS_BACKOFF_MAX", 64.0)
+
+        self._sent = {"read": deque(), "write": deque()}
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+        self.requests = 0
+        self.retries = 0
+        self.throttle_s = 0.0
+        self.max_queue_depth = 0
+
+    # ---- quota ----
+    @property
+    def queue_depth(self):
+        """จำนวน request ที่รอ quota อยู่"""
+        return self._waiting
+
+    def _note_depth(self):
+        depth = self.queue_depth
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+            get_tracer().peak("sheets_queue_depth_max", depth)
+
+    def acquire(self, kind):
+        """รอจนกว่าจะมี quota ว่างสำหรับ request ชนิด kind ('read' หรือ 'write')"""
+        sent = self._sent[kind]
+        quota = self.quotas[kind]
+        waited = 0.0
+        with self._lock:
+            self._waiting += 1
+            self._note_depth()
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    while sent and now - sent[0] >= QUOTA_WINDOW_S:
+                        sent.popleft()
+                    if len(sent) < quota:
+                        sent.append(now)
+                        break
+                    wait = QUOTA_WINDOW_S - (now - sent[0])
+                if not waited:
+                    print(f"⏳ ใกล้ถึง Sheets {kind} quota ({quota}/นาที) - รอ {wait:.1f} วินาที")
+                time.sleep(wait)
+                waited += wait
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if waited:
+            self.throttle_s += waited
+            get_tracer().count("sheets_throttle_ms", round(waited * 1000))
+
+    # ---- retry ----
+    def backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return min(self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base), self.backoff_max)
+
+    def send(self, request, method, url, *args, **kwargs):
+        """
+        ส่ง request ผ่าน quota และ retry เมื่อได้ 429 - 5xx / connection error retry เฉพาะ GET
+        และ values:update (request อื่น retry เฉพาะ 429 - ดู WRITE_RETRY_STATUSES)
+        """
+        kind = "read" if method.upper() == "GET" else "write"
+        idempotent = _is_idempotent(method, url)
+        retry_statuses = RETRY_STATUSES if idempotent else WRITE_RETRY_STATUSES
+        retryable = _retryable_exceptions()
+        attempt = 0
+        while True:
+            self.acquire(kind)
+            self.requests += 1
+            try:
+                response = request(method, url, *args, **kwargs)
+            except retryable as e:
+                # request ที่ timeout / หลุดการเชื่อมต่ออาจถูกประมวลผลไปแล้ว - ให้ผู้เรียกตรวจสอบแทนการส่งซ้ำ
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                reason, retry_after = type(e).__name__, None
+            else:
+                status = getattr(response, "status_code", 200)
+                if status not in retry_statuses or attempt >= self.max_retries:
+                    return response
+                reason, retry_after = f"HTTP {status}", response.headers.get("Retry-After")
+
+            delay = self.backoff_delay(attempt, retry_after)
+            attempt += 1
+            self.retries += 1
+            get_tracer().count("sheets_retries")
+            print(f"🔁 Sheets API {reason} - ลองใหม่ครั้งที่ {attempt}/{self.max_retries} ใน {delay:.1f} วินาที")
+            time.sleep(delay)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttle_s": round(self.throttle_s, 3),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "quota_per_minute": dict(self.quotas),
+        }
+
+
+def append_rows(worksheet, rows):
+    """
+    เพิ่มหลายแถวด้วย append_rows ครั้งเดียว คืนค่า list ของเลขแถวที่ถูกเขียนตามลำดับของ rows
+    (None ถ้าอ่านเลขแถวจากผลลัพธ์ไม่ได้)
+    """
+    rows = [list(values) for values in rows]
+    updated = _updated_rows(worksheet.append_rows(rows))
+    if not updated:
+        return [None] * len(rows)
+    return [updated[0] + offset for offset in range(len(rows))]
+
+
+DATE_TIME_FORMAT = {"numberFormat": {"type": "DATE_TIME", "pattern": "mm/dd/yyyy hh:mm:ss"}}
+CELL_FIELDS = "userEnteredValue,userEnteredFormat.numberFormat"
+
+
+def _cell_data(value, date=False):
+    """ค่าใน row เป็น CellData (เหมือน value_input_option RAW) - date=True จัดรูปแบบเป็นวันที่และเวลา"""
+    if value is None or value == "":
+        cell = {}
+    elif isinstance(value, bool):
+        cell = {"userEnteredValue": {"boolValue": value}}
+    elif isinstance(value, (int, float)):
+        cell = {"userEnteredValue": {"numberValue": value}}
+    else:
+        cell = {"userEnteredValue": {"stringValue": str(value)}}
+    if date and cell:
+        cell["userEnteredFormat"] = DATE_TIME_FORMAT
+    return cell
+
+
+def _row_data(values, date_columns=()):
+    return {"values": [_cell_data(value, index in date_columns) for index, value in enumerate(values)]}
+
+
+def append_cells_request(sheet_id, rows, date_columns=()):
+    """request appendCells - ต่อท้ายหลังแถวสุดท้ายที่มีข้อมูลของแท็บ (ไม่ทับแถวของ runner อื่น)"""
+    return {"appendCells": {"sheetId": sheet_id, "rows": [_row_data(row, date_columns) for row in rows],
+                            "fields": CELL_FIELDS}}
+
+
+def update_cells_request(sheet_id, row_number, values, column=1, date_columns=()):
+    """request updateCells ที่เขียน values ลงแถว row_number เริ่มที่คอลัมน์ column (นับจาก 1)"""
+    return {"updateCells": {"start": {"sheetId": sheet_id, "rowIndex": row_number - 1, "columnIndex": column - 1},
+                            "rows": [_row_data(values, date_columns)], "fields": CELL_FIELDS}}
+
+
+_scheduler = None
+
+
+def get_sheets_scheduler():
+    """คืนค่า scheduler ของ process นี้ (quota เป็นของ service account จึงใช้ร่วมกันทุก client)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SheetsScheduler()
+    return _scheduler
+
+
+def schedule_sheets_client(client):
+    """ส่งทุก request ของ gspread client ผ่าน scheduler (เรียกหลัง instrument_sheets_client)"""
+    session = sheets_session(client)
+    if session is None or getattr(session, "_bni_scheduled", False):
+        return client
+
+    scheduler = get_sheets_scheduler()
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        return scheduler.send(original_request, method, url, *args, **kwargs)
+
+    session.request = request
+    session._bni_scheduled = True
+    return client
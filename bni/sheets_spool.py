@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind spool สำหรับข้อมูลที่จะเขียนลง Google Sheets
+
+ทุกรายการถูกเขียนลงไฟล์ใน .bni_state/spool/<name>/ ก่อน (fsync + rename) แล้วคืนค่าทันที
+thread เบื้องหลังจะส่งรายการที่ค้างอยู่ไปยัง Sheets เป็นชุดผ่าน writer ที่สคริปต์กำหนด
+และลบไฟล์เมื่อ writer ยืนยัน (ack) แล้วเท่านั้น
+
+รายการที่ค้างจากการรันก่อน (เช่น process ตายหรือ Sheets ล่ม) จะถูกส่งใหม่ตอนเริ่ม
+รายการเหล่านี้และรายการของรอบนี้ที่เคยส่งแล้วแต่ยังไม่ถูก ack (writer ล้มกลางคัน เช่น append สำเร็จ
+แต่ขั้นตอนหลังจากนั้นล้ม) มี flag replayed=True ให้ writer ตรวจสอบซ้ำใน Sheet ก่อนเขียน เพื่อไม่ให้เกิดแถวซ้ำ
+
+writer(entries) รับ list ของ dict และคืนค่า list ของ id ที่เขียนสำเร็จ
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from bni.state import state_path
+
+SPOOL_DIR = "spool"
+
+# แยกรายการของ process นี้ออกจากรายการที่ค้างจากการรันก่อน
+_SESSION = uuid.uuid4().hex
+
+
+class SheetsSpool:
+    def __init__(self, name, writer, retry_delay=5.0, max_retry_delay=60.0):
+        self.name = name
+        self.writer = writer
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.directory = state_path(os.path.join(SPOOL_DIR, name))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._drain_lock = threading.Lock()
+        # id ของรายการที่ส่งให้ writer แล้วแต่ยังไม่ถูก ack - อาจถูกเขียนลง Sheet ไปแล้ว
+        self._attempted = set()
+        self._thread = None
+        self.flushed = 0
+        self.failures = 0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    # ---- ไฟล์ spool ----
+    def _entry_path(self, entry_id):
+        return os.path.join(self.directory, f"{entry_id}.json")
+
+    def submit(self, kind, payload):
+        """บันทึกรายการลง spool แบบ durable แล้วปลุก thread ที่ส่งข้อมูล คืนค่า id ของรายการ"""
+        entry = {
+            "id": f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}",
+            "kind": kind,
+            "session": _SESSION,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "payload": payload,
+        }
+        path = self._entry_path(entry["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._wake.set()
+        return entry["id"]
+
+    def pending(self):
+        """รายการที่ยังไม่ได้ ack เรียงตามเวลาที่ส่งเข้า spool"""
+        entries = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except Exception as e:
+                print(f"⚠️  ข้ามไฟล์ spool ที่อ่านไม่ได้ {filename}: {e}")
+                continue
+            entry["replayed"] = entry.get("session") != _SESSION or entry["id"] in self._attempted
+            entries.append(entry)
+        return entries
+
+    def _ack(self, entry_ids):
+        for entry_id in entry_ids:
+            try:
+                os.remove(self._entry_path(entry_id))
+            except FileNotFoundError:
+                pass
+
+    # ---- ส่งข้อมูล ----
+    def drain(self):
+        """ส่งทุกรายการที่ค้างอยู่ในครั้งเดียว คืนค่า True ถ้า spool ว่างแล้ว"""
+        with self._drain_lock:
+            entries = self.pending()
+            if not entries:
+                return True
+            replayed = sum(1 for entry in entries if entry["replayed"])
+            if replayed:
+                print(f"♻️  ส่งรายการที่ค้างอยู่ซ้ำ {replayed} รายการ ({self.name}) - ตรวจกับ Sheet ก่อนเขียน")
+            self._attempted.update(entry["id"] for entry in entries)
+            try:
+                acked = self.writer(entries) or []
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️  ส่งข้อมูลจาก spool ไม่สำเร็จ ({len(entries)} รายการค้างอยู่): {e}")
+                return False
+            self._ack(acked)
+            self._attempted.difference_update(acked)
+            self.flushed += len(acked)
+            return len(acked) == len(entries)
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stop.is_set():
+            self._wake.wait(timeout=delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.drain():
+                delay = self.retry_delay
+            else:
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def start(self):
+        """เริ่ม thread เบื้องหลัง (และส่งรายการที่ค้างจากการรันก่อนทันที)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"spool-{self.name}", daemon=True)
+            self._thread.start()
+            if os.listdir(self.directory):
+                self._wake.set()
+        return self
+
+    def close(self, timeout=120.0):
+        """หยุด thread แล้วส่งรายการที่เหลือ รายการที่ส่งไม่สำเร็จจะค้างใน spool ไว้ส่งรอบหน้า"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+        deadline = time.monotonic() + timeout
+        while not self.drain() and time.monotonic() < deadline:
+            time.sleep(min(self.retry_delay, max(deadline - time.monotonic(), 0)))
+
+        remaining = len(self.pending())
+        if remaining:
+            print(f"⚠️  ยังมี {remaining} รายการค้างใน spool {self.directory} - จะส่งใหม่ในการรันครั้งถัดไป")
+        return remaining == 0
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+อ่าน Google Sheet แบบ stream ผ่าน CSV export แทน get_all_records()
+
+get_all_records() ดึงทั้ง sheet เป็น JSON แล้วสร้าง list ของ dict ทั้งหมดในหน่วยความจำก่อนกรอง
+open_sheet_records() ดาวน์โหลด CSV export ของ worksheet ด้วย HTTP session ที่ยืนยันตัวตนแล้วของ gspread client
+(ผ่าน quota / retry ของ sheets_scheduler เหมือน request อื่น) และแปลงทีละแถวด้วย csv module
+ผู้ใช้วนผ่าน generator เป็นชุดละ CHUNK_ROWS แถว (chunked) หน่วยความจำจึงไม่โตตามขนาดของ sheet
+
+ค่าที่ได้เป็นข้อความแบบที่ Sheet แสดง (เหมือน FORMATTED_VALUE) - ตั้ง SHEETS_READER=records
+เพื่อใช้ get_all_records() ตามเดิม และถ้าเปิด CSV export ไม่ได้ (เช่น client ไม่มี session) จะใช้ get_all_records() แทน
+"""
+import csv
+import io
+import os
+from itertools import islice
+
+from bni.tracing import get_tracer, sheets_session
+
+CSV_EXPORT_URL = "https://docs.google.com/spreadsheets/d/{key}/export?format=csv&gid={gid}"
+READER_ENV = "SHEETS_READER"
+CHUNK_ROWS = 5000
+EXPORT_TIMEOUT_S = 60
+
+
+def csv_reader_enabled():
+    return os.getenv(READER_ENV, "csv").lower() != "records"
+
+
+def _open_csv_export(session, worksheet):
+    url = CSV_EXPORT_URL.format(key=worksheet.spreadsheet.id, gid=worksheet.id)
+    response = session.get(url, stream=True, timeout=EXPORT_TIMEOUT_S)
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+
+def _iter_csv_records(response):
+    """แปลง CSV export เป็น dict ทีละแถว (แถวแรกเป็น header เหมือน get_all_records)"""
+    rows = 0
+    try:
+        response.raw.decode_content = True
+        reader = csv.reader(io.TextIOWrapper(response.raw, encoding="utf-8-sig", newline=""))
+        headers = next(reader, None)
+        if not headers:
+            return
+        width = len(headers)
+        for values in reader:
+            if not values:
+                continue
+            if len(values) < width:
+                values += [""] * (width - len(values))
+            rows += 1
+            yield dict(zip(headers, values))
+    finally:
+        response.close()
+        get_tracer().count("sheets_stream_rows", rows)
+
+
+def open_sheet_records(client, worksheet):
+    """
+    iterator ของแถวใน worksheet (dict ตาม header) - CSV export แบบ stream ถ้าทำได้
+    ไม่เช่นนั้นใช้ get_all_records() ตามเดิม
+    """
+    session = sheets_session(client)
+    if csv_reader_enabled() and session is not None:
+        try:
+            response = _open_csv_export(session, worksheet)
+        except Exception as e:
+            print(f"⚠️  อ่าน CSV export ของ Google Sheets ไม่ได้ ({e}) - ใช้ get_all_records แทน")
+        else:
+            return _iter_csv_records(response)
+    return iter(worksheet.get_all_records())
+
+
+def chunked(records, size=CHUNK_ROWS):
+    """แบ่ง iterator เป็น list ชุดละ size แถว (ให้ recent_mask ทำงานแบบ vectorised ทีละชุด)"""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+จัดการไฟล์ state ภายในเครื่อง
+
+ไฟล์ทั้งหมดเก็บไว้ในโฟลเดอร์ .bni_state (เปลี่ยนได้ด้วย BNI_STATE_DIR)
+เพื่อให้ GitHub Actions cache ทั้งโฟลเดอร์ข้ามการรันได้
+"""
+import json
+import os
+import tempfile
+import threading
+
+# lock ต่อไฟล์สำหรับ update_json (main thread และ thread ของ spool เขียนไฟล์เดียวกัน)
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def state_dir():
+    """คืนค่า path ของโฟลเดอร์ state (สร้างให้ถ้ายังไม่มี)"""
+    path = os.getenv('BNI_STATE_DIR', '.bni_state')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def state_path(filename):
+    """คืนค่า path เต็มของไฟล์ใน state directory"""
+    return os.path.join(state_dir(), filename)
+
+
+def load_json(filename, default=None):
+    """โหลดไฟล์ JSON จาก state directory ถ้าไม่มีหรือเสียให้คืนค่า default"""
+    path = state_path(filename)
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"⚠️  ไม่สามารถโหลด state {filename}: {e}")
+    return {} if default is None else default
+
+
+def save_json(filename, data):
+    """
+    บันทึกไฟล์ JSON แบบ atomic (เขียนไฟล์ชั่วคราวแล้ว rename ทับ)
+    ไฟล์ชั่วคราวมีชื่อไม่ซ้ำ (mkstemp ในโฟลเดอร์เดียวกัน) จึงเรียกพร้อมกันหลาย thread ได้โดยไฟล์ไม่เสีย
+    """
+    path = state_path(filename)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                        dir=os.path.dirname(path) or '.')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"⚠️  ไม่สามารถบันทึก state {filename}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return False
+
+
+def state_lock(filename):
+    """lock ของไฟล์ state นี้ (ใช้ร่วมกันทุก thread ใน process)"""
+    with _file_locks_guard:
+        return _file_locks.setdefault(filename, threading.RLock())
+
+
+def update_json(filename, update, default=None):
+    """
+    โหลดไฟล์ล่าสุด แก้ไขด้วย update(data) แล้วบันทึก ภายใต้ lock ของไฟล์
+    ใช้แทน load_json + save_json เมื่อหลาย thread แก้ไขไฟล์เดียวกัน (ไม่ทับการแก้ไขของ thread อื่น)
+    คืนค่าข้อมูลหลังแก้ไข
+    """
+    with state_lock(filename):
+        data = load_json(filename, default)
+        update(data)
+        save_json(filename, data)
+        return data
+
+
+_run_dir = None
+
+
+def run_dir():
+    """
+    คืนค่าโฟลเดอร์ของการรันครั้งนี้ (.bni_state/runs/YYYYmmdd-HHMMSS)
+    สร้างครั้งเดียวต่อ process ใช้เก็บ run report และไฟล์ประกอบอื่นๆ
+    (ถ้า runner อื่นเริ่มในวินาทีเดียวกัน จะต่อท้ายชื่อด้วย pid)
+    """
+    global _run_dir
+    if _run_dir is None:
+        from datetime import datetime
+        path = os.path.join(state_dir(), 'runs', datetime.now().strftime('%Y%m%d-%H%M%S'))
+        try:
+            os.makedirs(path)
+        except FileExistsError:
+            path = f"{path}-{os.getpid()}"
+            os.makedirs(path, exist_ok=True)
+        _run_dir = path
+    return _run_dir
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+วัดเวลาของแต่ละขั้นตอนและนับจำนวน WebDriver / Sheets API calls
+
+ใช้งาน:
+- tracer.phase("login") สำหรับโค้ดที่ทำงานต่อเนื่องเป็นช่วงๆ (เริ่ม phase ใหม่ = จบ phase เดิม)
+  ผู้เรียกควร end_phase(status="error", ...) เมื่อล้มเหลว - phase ที่ยังเปิดตอน finish() จะได้สถานะของการรัน
+- with tracer.span("export"): หรือ @traced("export") สำหรับฟังก์ชัน
+- instrument_driver(driver) / instrument_sheets_client(client) เพื่อนับ calls
+  (sheets_session(client) คืนค่า HTTP session ของ gspread ให้โมดูลอื่นครอบต่อได้)
+  (ตั้ง BNI_PROFILE=1 เพื่อแยก WebDriver calls ตามชนิดคำสั่งและบรรทัดที่เรียก - ดู bni/profiler.py)
+- tracer.mark("first_navigation_s") บันทึกเวลาที่เกิดเหตุการณ์ครั้งแรก (instrument_driver บันทึก driver.get แรกให้)
+- ทุก span / phase ถูกบันทึกลง ring buffer ของ bni/diagnostics.py (ใช้เมื่อการรันล้มเหลว)
+- tracer.finish() เขียน run_report.json ลงโฟลเดอร์ของการรัน และต่อท้าย metrics.jsonl หนึ่งบรรทัด
+"""
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from bni.diagnostics import get_diagnostics, reset_diagnostics
+from bni.profiler import get_profiler, profile_top_n
+from bni.state import run_dir, state_path
+
+METRICS_FILE = "metrics.jsonl"
+
+
+class Tracer:
+    def __init__(self, name="bni"):
+        self.name = name
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.marks = {}
+        self._phase = None
+
+    def count(self, key, amount=1):
+        """เพิ่มตัวนับ เช่น webdriver_calls, sheets_calls"""
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def peak(self, key, value):
+        """เก็บค่าสูงสุดที่เคยพบ เช่น sheets_queue_depth_max"""
+        if value > self.counters.get(key, 0):
+            self.counters[key] = value
+
+    def mark(self, key):
+        """บันทึกเวลา (วินาทีนับจากเริ่มรัน) ที่เกิดเหตุการณ์ครั้งแรก เช่น first_navigation_s"""
+        self.marks.setdefault(key, round(time.perf_counter() - self._start, 3))
+
+    def _open(self, name):
+        get_diagnostics().step(name)
+        return {
+            "name": name,
+            "start": time.perf_counter(),
+            "counters_at_start": dict(self.counters),
+        }
+
+    def _close(self, span, status="ok", error=None):
+        elapsed = time.perf_counter() - span.pop("start")
+        before = span.pop("counters_at_start")
+        span["offset_s"] = round(span.get("offset_s", 0.0), 3)
+        span["duration_s"] = round(elapsed, 3)
+        span["status"] = status
+        if error:
+            span["error"] = str(error)
+            get_diagnostics().step(span["name"], status=status, error=str(error))
+        span["counts"] = {key: value - before.get(key, 0)
+                          for key, value in self.counters.items()
+                          if value - before.get(key, 0)}
+        self.spans.append(span)
+
+    @contextmanager
+    def span(self, name):
+        """วัดเวลาของบล็อกโค้ด"""
+        span = self._open(name)
+        span["offset_s"] = span["start"] - self._start
+        try:
+            yield span
+        except Exception as e:
+            self._close(span, status="error", error=e)
+            raise
+        else:
+            self._close(span)
+
+    def phase(self, name):
+        """เริ่ม phase ใหม่ (และปิด phase ก่อนหน้า) สำหรับโค้ดที่เขียนต่อเนื่องกันยาวๆ"""
+        self.end_phase()
+        self._phase = self._open(name)
+        self._phase["offset_s"] = self._phase["start"] - self._start
+
+    def end_phase(self, status="ok", error=None):
+        if self._phase:
+            self._close(self._phase, status=status, error=error)
+            self._phase = None
+
+    def report(self, status="ok", extra=None):
+        """สร้าง run report เป็น dict (phase ที่ยังเปิดอยู่จะถูกปิดด้วยสถานะของการรัน)"""
+        self.end_phase(status=status)
+        report = {
+            "script": self.name,
+            "run_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": status,
+            "total_s": round(time.perf_counter() - self._start, 3),
+            "counters": dict(self.counters),
+            "marks": dict(self.marks),
+            "spans": sorted(self.spans, key=lambda span: span["offset_s"]),
+        }
+        profiler = get_profiler()
+        if profiler and profiler.stats:
+            report["webdriver_profile"] = profiler.report(profile_top_n())
+        if extra:
+            report.update(extra)
+        return report
+
+    def finish(self, status="ok", extra=None):
+        """เขียน run_report.json และต่อท้ายสรุปหนึ่งบรรทัดใน metrics.jsonl"""
+        report = self.report(status, extra)
+
+        try:
+            report_path = os.path.join(run_dir(), "run_report.json")
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+            summary = {
+                "run_at": report["run_at"],
+                "script": report["script"],
+                "status": status,
+                "total_s": report["total_s"],
+                "spans": {span["name"]: span["duration_s"] for span in report["spans"]},
+                "counters": report["counters"],
+                "marks": report["marks"],
+            }
+            with open(state_path(METRICS_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"⚠️  ไม่สามารถบันทึก run report: {e}")
+            return report
+
+        print("\n⏱️  สรุปเวลาแต่ละขั้นตอน:")
+        for span in report["spans"]:
+            counts = ", ".join(f"{key}={value}" for key, value in span["counts"].items())
+            print(f"   {span['name']:<28} {span['duration_s']:>8.2f} s  {counts}")
+        print(f"   {'รวม':<28} {report['total_s']:>8.2f} s")
+        for key, value in report["marks"].items():
+            print(f"   {key:<28} {value:>8.2f} s")
+        profiler = get_profiler()
+        if profiler and profiler.stats:
+            profiler.print_table(profile_top_n())
+        print(f"📄 Run report: {report_path}")
+        return report
+
+
+_tracer = None
+
+
+def get_tracer():
+    """คืนค่า tracer ของ process นี้ (สร้างใหม่ถ้ายังไม่มี)"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def start_run(name):
+    """เริ่ม tracer (และ ring buffer ของ diagnostics) ใหม่สำหรับการรันครั้งนี้"""
+    global _tracer
+    reset_diagnostics()
+    _tracer = Tracer(name)
+    return _tracer
+
+
+def traced(name):
+    """Decorator สำหรับวัดเวลาของฟังก์ชัน"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_driver(driver):
+    """
+    ครอบ driver.execute เพื่อนับทุกคำสั่งที่ส่งไปยัง WebDriver (รวมคำสั่งของ WebElement)
+    listener อื่นเพิ่มได้ผ่าน driver._bni_listeners - เรียกด้วย (command, params, elapsed)
+    """
+    if getattr(driver, "_bni_listeners", None) is not None:
+        return driver
+
+    listeners = []
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        start = time.perf_counter()
+        try:
+            return original_execute(driver_command, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            for listener in listeners:
+                listener(driver_command, params, elapsed)
+
+    def count_call(driver_command, params, elapsed):
+        tracer = get_tracer()
+        tracer.count("webdriver_calls")
+        tracer.count("webdriver_time_ms", round(elapsed * 1000))
+        if driver_command == "get":
+            # เวลาตั้งแต่เริ่มรันจนถึงการเปิดหน้าเว็บครั้งแรก (รวมเวลาเตรียม Chrome / Sheets)
+            tracer.mark("first_navigation_s")
+
+    listeners.append(count_call)
+    profiler = get_profiler()
+    if profiler:
+        listeners.append(profiler)
+    driver.execute = execute
+    driver._bni_listeners = listeners
+    return driver
+
+
+def sheets_session(client):
+    """HTTP session (requests.Session) ของ gspread client - None ถ้าหาไม่พบ"""
+    # gspread 6 เก็บ session ไว้ใน http_client, gspread 5 เก็บไว้ที่ client.session
+    http_client = getattr(client, "http_client", None)
+    return getattr(http_client, "session", None) or getattr(client, "session", None)
+
+
+def instrument_sheets_client(client):
+    """ครอบ HTTP session ของ gspread client เพื่อนับ Sheets API calls (แยก read/write)"""
+    session = sheets_session(client)
+    if session is None or getattr(session, "_bni_instrumented", False):
+        return client
+
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        tracer = get_tracer()
+        tracer.count("sheets_calls")
+        tracer.count("sheets_reads" if method.upper() == "GET" else "sheets_writes")
+        return original_request(method, url, *args, **kwargs)
+
+    session.request = request
+    session._bni_instrumented = True
+    return client
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+เตรียมทรัพยากรตอนเริ่มโปรแกรมพร้อมกันบน thread pool
+
+งานเริ่มต้นส่วนใหญ่เป็นการรอ I/O (ติดตั้ง chromedriver + เปิด Chrome, ยืนยันตัวตนกับ Google
+และเปิด spreadsheet, อ่านไฟล์ state) จึงทำพร้อมกันได้ - เวลาเริ่มต้นรวมเท่ากับงานที่ช้าที่สุด
+แทนผลรวมของทุกงาน
+
+fail fast: งานใดล้มเหลวจะหยุดทันที (เช่น credential ของ Sheets ผิด) ก่อนเริ่ม scrape
+ผลของงานที่เสร็จแล้วจะถูกเก็บกวาดผ่าน cleanup (เช่น ปิด Chrome) แล้ว raise RuntimeError
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bni.tracing import get_tracer
+
+
+def warm_up(tasks, cleanup=None):
+    """
+    รันงานเริ่มต้นพร้อมกัน คืนค่า dict ของ {ชื่องาน: ผลลัพธ์}
+
+    Parameters:
+    -----------
+    tasks : list
+        list ของ (ชื่องาน, ฟังก์ชันที่ไม่รับ argument)
+    cleanup : dict
+        {ชื่องาน: ฟังก์ชันที่รับผลลัพธ์} สำหรับเก็บกวาดเมื่องานอื่นล้มเหลว
+    """
+    tracer = get_tracer()
+    cleanup = cleanup or {}
+    results = {}
+    failure = None
+
+    def run(name, func):
+        with tracer.span(f"warmup:{name}"):
+            return func()
+
+    with tracer.span("warmup"):
+        executor = ThreadPoolExecutor(max_workers=max(len(tasks), 1), thread_name_prefix="warmup")
+        futures = {executor.submit(run, name, func): name for name, func in tasks}
+        try:
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    failure = (name, e)
+                    break
+        finally:
+            # งานที่ยังไม่เริ่มถูกยกเลิก งานที่กำลังทำ (เช่น Chrome กำลังเปิด) ต้องรอให้เสร็จเพื่อปิดได้
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    if failure is None:
+        return results
+
+    for future, name in futures.items():
+        if name not in results and future.done() and not future.cancelled() and future.exception() is None:
+            results[name] = future.result()
+    for name, result in results.items():
+        if name in cleanup and result is not None:
+            try:
+                cleanup[name](result)
+            except Exception as e:
+                print(f"⚠️  เก็บกวาด {name} ไม่สำเร็จ: {e}")
+
+    name, error = failure
+    raise RuntimeError(f"เตรียม {name} ไม่สำเร็จ: {error}") from error
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+แบ่งรายชื่อบัญชี BNI ให้หลาย runner ทำพร้อมกัน
+
+รายชื่อบัญชี (roster) อ่านจาก BNI_ACCOUNTS (JSON) หรือไฟล์ใน BNI_ACCOUNTS_FILE
+รูปแบบ [{"username": "...", "password": "..."}, ...] - ถ้าไม่มีจะใช้ BNI_USERNAME / BNI_PASSWORD บัญชีเดียว
+
+แบ่งได้สองแบบ:
+- --shard i/n: runner ที่ i จาก n ทำบัญชีลำดับที่ i, i+n, i+2n, ... ของรายชื่อที่เรียงตาม username
+  (ไม่ต้องใช้ไฟล์ร่วมกัน เหมาะกับ matrix job)
+- --queue PATH: คิวในไฟล์ SQLite ที่หลาย runner ใช้ร่วมกัน แต่ละ runner claim บัญชีทีละบัญชีพร้อม lease
+  ต่ออายุ lease (heartbeat) ระหว่างทำงาน และคืนบัญชีเข้าคิวเมื่อล้มเหลว (สูงสุด MAX_ATTEMPTS ครั้ง)
+  บัญชีที่ lease หมดอายุ (runner ตาย) จะถูก runner อื่น claim ต่อ
+
+ผลของแต่ละบัญชีเก็บในตาราง results - runner ที่พบว่าคิวไม่มีบัญชีค้างแล้วจะเป็นผู้รวมผล (claim_merge)
+และเขียนลง Sheet ประวัติครั้งเดียว รอบ (batch) ของคิวคือสัปดาห์ ISO - รอบใหม่จะเริ่มคิวใหม่อัตโนมัติ
+"""
+import json
+import os
+import platform
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+ACCOUNTS_ENV = "BNI_ACCOUNTS"
+ACCOUNTS_FILE_ENV = "BNI_ACCOUNTS_FILE"
+LEASE_ENV = "BNI_QUEUE_LEASE_S"
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 3
+BUSY_TIMEOUT_S = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS accounts (
+    username TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    username TEXT PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    merged INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def account_key(username):
+    return str(username or "").strip().lower() or "(unknown)"
+
+
+def load_roster():
+    """รายชื่อบัญชี [{"username", "password"}, ...] จาก BNI_ACCOUNTS / BNI_ACCOUNTS_FILE / BNI_USERNAME"""
+    raw = os.getenv(ACCOUNTS_ENV)
+    path = os.getenv(ACCOUNTS_FILE_ENV)
+    try:
+        if raw:
+            accounts = json.loads(raw)
+        elif path:
+            with open(path, "r", encoding="utf-8") as f:
+                accounts = json.load(f)
+        elif os.getenv("BNI_USERNAME") and os.getenv("BNI_PASSWORD"):
+            accounts = [{"username": os.getenv("BNI_USERNAME"), "password": os.getenv("BNI_PASSWORD")}]
+        else:
+            accounts = []
+    except Exception as e:
+        print(f"❌ อ่านรายชื่อบัญชีไม่ได้ ({ACCOUNTS_ENV} / {ACCOUNTS_FILE_ENV}): {e}")
+        return []
+
+    roster = {}
+    for account in accounts:
+        if isinstance(account, dict) and account.get("username") and account.get("password"):
+            roster[account_key(account["username"])] = account
+    return [roster[key] for key in sorted(roster)]
+
+
+def parse_shard(value):
+    """แปลง "i/n" (เริ่มที่ 1) เป็น (i, n) - ใช้เป็น type ของ argparse"""
+    try:
+        index, count = (int(part) for part in str(value).split("/"))
+    except ValueError:
+        raise ValueError(f"รูปแบบ shard ต้องเป็น i/n เช่น 1/3 (ได้ '{value}')")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard ต้องอยู่ในช่วง 1/n ถึง n/n (ได้ '{value}')")
+    return index, count
+
+
+def shard_accounts(accounts, index, count):
+    """บัญชีของ shard ที่ index จาก count (ลำดับตาม username เหมือนกันทุก runner)"""
+    ordered = sorted(accounts, key=lambda account: account_key(account["username"]))
+    return ordered[index - 1::count]
+
+
+def _lease_seconds():
+    try:
+        return max(30.0, float(os.getenv(LEASE_ENV, LEASE_SECONDS)))
+    except ValueError:
+        return float(LEASE_SECONDS)
+
+
+class LeaseQueue:
+    def __init__(self, path, owner=None, lease_s=None, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.owner = owner or f"{platform.node() or 'runner'}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_s = lease_s or _lease_seconds()
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connect()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self):
+        """เชื่อมต่อใหม่ทุกครั้ง (ใช้ได้จาก thread ของ heartbeat) และล็อกไฟล์ตลอด transaction"""
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def seed(self, usernames, batch=None):
+        """เพิ่มบัญชีเข้าคิว - ถ้าเป็นรอบใหม่ (batch ต่างจากเดิม) จะล้างคิวและผลของรอบก่อน"""
+        batch = batch or datetime.now().strftime("%G-W%V")
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT value FROM meta WHERE key = 'batch'").fetchone()
+            if row is None or row[0] != batch:
+                db.execute("DELETE FROM accounts")
+                db.execute("DELETE FROM results")
+                db.execute("DELETE FROM meta")
+                db.execute("INSERT INTO meta (key, value) VALUES ('batch', ?)", (batch,))
+            db.executemany(
+                "INSERT OR IGNORE INTO accounts (username, updated_at) VALUES (?, ?)",
+                [(username, now) for username in usernames])
+        return batch
+
+    def claim(self):
+        """claim บัญชีถัดไป (pending หรือ lease หมดอายุ) คืนค่า username หรือ None ถ้าไม่มีบัญชีเหลือ"""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT username FROM accounts"
+                " WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?)) AND attempts < ?"
+                " ORDER BY attempts, username LIMIT 1",
+                (now, self.max_attempts)).fetchone()
+            if row is None:
+                # lease ที่หมดอายุหลังครบจำนวนครั้งแล้ว - ไม่ claim อีก
+                db.execute("UPDATE accounts SET state = 'failed', owner = NULL, updated_at = ?"
+                           " WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                           (now, now, self.max_attempts))
+                return None
+            db.execute(
+                "UPDATE accounts SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE username = ?",
+                (self.owner, now + self.lease_s, now, row[0]))
+            return row[0]
+
+    def heartbeat(self, username):
+        """ต่ออายุ lease คืนค่า False ถ้า lease ไม่ใช่ของ runner นี้แล้ว"""
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE accounts SET lease_until = ?, updated_at = ?"
+                " WHERE username = ? AND owner = ? AND state = 'leased'",
+                (now + self.lease_s, now, username, self.owner)).rowcount
+        return updated == 1
+
+    @contextmanager
+    def holding(self, username):
+        """ต่ออายุ lease ใน thread เบื้องหลังทุก 1/3 ของอายุ lease ระหว่างประมวลผลบัญชี"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_s / 3):
+                try:
+                    if not self.heartbeat(username):
+                        print(f"⚠️  lease ของ {username} ถูก runner อื่นรับไปแล้ว")
+                        return
+                except sqlite3.Error as e:
+                    print(f"⚠️  ต่ออายุ lease ของ {username} ไม่สำเร็จ: {e}")
+
+        thread = threading.Thread(target=beat, name=f"lease-{username}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, username, result):
+        """บันทึกผลของบัญชีและปิดงาน (ผลใหม่แทนผลเดิมของบัญชีเดียวกัน)"""
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        with self._transaction() as db:
+            db.execute("UPDATE accounts SET state = 'done', owner = NULL, error = NULL, updated_at = ?"
+                       " WHERE username = ?", (now, username))
+            db.execute("INSERT OR REPLACE INTO results (username, finished_at, payload, merged)"
+                       " VALUES (?, ?, ?, 0)", (username, now, payload))
+
+    def release(self, username, error=None):
+        """คืนบัญชีเข้าคิวให้ runner อื่นลองใหม่ (หรือ failed เมื่อครบ max_attempts)"""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE accounts SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " owner = NULL, lease_until = NULL, error = ?, updated_at = ?"
+                " WHERE username = ? AND owner = ?",
+                (self.max_attempts, str(error or "")[:500], now, username, self.owner))
+
+    def counts(self):
+        """จำนวนบัญชีในแต่ละสถานะ เช่น {"done": 3, "failed": 1}"""
+        with self._transaction() as db:
+            return dict(db.execute("SELECT state, COUNT(*) FROM accounts GROUP BY state").fetchall())
+
+    def claim_merge(self):
+        """
+        รับหน้าที่รวมผลเมื่อไม่มีบัญชีที่ pending / leased เหลือแล้ว
+        คืนค่า list ของผลที่ยังไม่ถูกรวม (เรียงตามเวลาที่เสร็จ) หรือ None ถ้ายังมีบัญชีค้าง / runner อื่นกำลังรวมอยู่
+        """
+        now = time.time()
+        with self._transaction() as db:
+            busy = db.execute("SELECT COUNT(*) FROM accounts WHERE state IN ('pending', 'leased')").fetchone()[0]
+            if busy:
+                return None
+            row = db.execute("SELECT value FROM meta WHERE key = 'merge_lease'").fetchone()
+            if row is not None:
+                owner, _, until = row[0].rpartition("@")
+                if owner != self.owner and float(until) > now:
+                    return None
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('merge_lease', ?)",
+                       (f"{self.owner}@{now + self.lease_s}",))
+            rows = db.execute("SELECT payload FROM results WHERE merged = 0 ORDER BY finished_at").fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def finish_merge(self, usernames):
+        """บันทึกว่าผลของบัญชีเหล่านี้ถูกเขียนลง Sheet แล้ว และปล่อยหน้าที่รวมผล"""
+        with self._transaction() as db:
+            db.executemany("UPDATE results SET merged = 1 WHERE username = ?",
+                           [(username,) for username in usernames])
+            db.execute("DELETE FROM meta WHERE key = 'merge_lease'")
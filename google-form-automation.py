@@ -1,22 +1,29 @@
 # Google Form Automation for BNI Data - Clean Version
 # -*- coding: utf-8 -*-
 
-import requests
 import json
 import os
+import sys
 import time
 from datetime import datetime, timedelta
-import re
-from bs4 import BeautifulSoup
-
-# Google Sheets API imports
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GOOGLE_SHEETS_AVAILABLE = True
-except ImportError:
+
+from bni.handoff import display_amount, read_handoff
+from bni.latest_index import LATEST_TAB, read_latest_tab
+from bni.work_queue import load_roster
+from bni.parsing import TimestampParser, amount_text, parse_amount, recent_mask, sheet_number, sheets_serial
+from bni.sheets_auth import authorize_sheets_client, sheets_available
+from bni.sheets_stream import chunked, open_sheet_records
+from bni.sheets_scheduler import append_rows, schedule_sheets_client
+
+# ผลของ submit_to_form: ส่งแล้ว / ข้ามเพราะเคยส่งยอดนี้แล้ว / เขียนไม่สำเร็จ
+SUBMIT_SENT = "sent"
+SUBMIT_SKIPPED = "skipped"
+SUBMIT_FAILED = "failed"
+
+# Google Sheets API (gspread / google-auth ถูก import ตอนเชื่อมต่อจริง - ดู bni/sheets_auth.py)
+GOOGLE_SHEETS_AVAILABLE = sheets_available()
+if not GOOGLE_SHEETS_AVAILABLE:
     print("Google Sheets API ไม่พร้อมใช้งาน กรุณาติดตั้ง: pip install gspread google-auth")
-    GOOGLE_SHEETS_AVAILABLE = False
 
 class GoogleFormSubmitter:
     def __init__(self):
@@ -56,35 +63,12 @@ class GoogleFormSubmitter:
             return None
 
         try:
-            # ลองใช้ environment variable ก่อน
-            credentials_json = os.getenv('GOOGLE_SHEETS_CREDENTIALS')
-            if credentials_json:
-                credentials_info = json.loads(credentials_json)
-                scope = [
-                    "https://spreadsheets.google.com/feeds",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-                credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-                service_email = credentials_info.get('client_email', 'ไม่พบ email')
-            else:
-                # ใช้ไฟล์ local
-                credentials_file = "google-sheets-credentials.json"
-                if not os.path.exists(credentials_file):
-                    print(f"ไม่พบไฟล์ {credentials_file}")
-                    return None
-
-                scope = [
-                    "https://spreadsheets.google.com/feeds",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-                credentials = Credentials.from_service_account_file(credentials_file, scopes=scope)
-
-                # อ่าน service email จากไฟล์
-                with open(credentials_file, 'r') as f:
-                    creds_data = json.load(f)
-                    service_email = creds_data.get('client_email', 'ไม่พบ email')
-
-            client = gspread.authorize(credentials)
+            # ลองใช้ environment variable ก่อน ถ้าไม่มีให้ใช้ไฟล์ local
+            client, service_email = authorize_sheets_client()
+            if not client:
+                return None
+
+            schedule_sheets_client(client)
             print(f"✅ เชื่อมต่อ Google Sheets สำเร็จ")
             print(f"📧 Service Account: {service_email}")
             return client
@@ -129,20 +113,15 @@ class GoogleFormSubmitter:
             # Google Sheets ใช้ serial date จาก 1899-12-30 เป็น day 1
             now = datetime.now()
 
-            # คำนวณ serial number สำหรับ Google Sheets
-            # Google Sheets epoch: December 30, 1899
-            sheets_epoch = datetime(1899, 12, 30)
-            days_since_epoch = (now - sheets_epoch).total_seconds() / (24 * 60 * 60)
-
             # ใช้ serial number แทน string
-            timestamp = days_since_epoch
+            timestamp = sheets_serial(now)
 
             # แปลงยอดธุรกิจเป็นตัวเลข
-            try:
-                business_amount_clean = str(business_amount).replace(',', '').replace(' ', '')
-                business_amount_num = float(business_amount_clean)
+            business_value = parse_amount(business_amount)
+            if business_value is not None:
+                business_amount_num = sheet_number(business_value)
                 print(f"💰 แปลงยอดธุรกิจ: '{business_amount}' → {business_amount_num}")
-            except ValueError:
+            else:
                 print(f"⚠️  ไม่สามารถแปลงยอดธุรกิจเป็นตัวเลข: '{business_amount}' - ใช้เป็น string")
                 business_amount_num = str(business_amount)
 
@@ -154,11 +133,10 @@ class GoogleFormSubmitter:
 
             print(f"📤 เพิ่มแถวใหม่: [{timestamp:.6f}, {name}, {business_amount_num}]")
 
-            # เพิ่มแถวใหม่
-            worksheet.append_row(new_row)
-
-            # หา row ที่เพิ่มไป
-            last_row_num = len(worksheet.get_all_values())
+            # เพิ่มแถวใหม่ (เลขแถวอ่านจากผลของ append - ไม่ต้องดึงทั้ง sheet)
+            last_row_num = append_rows(worksheet, [new_row])[0]
+            if not last_row_num:
+                last_row_num = len(worksheet.get_all_values())
 
             # Format timestamp cell ให้เป็น datetime format
             try:
@@ -192,12 +170,14 @@ class GoogleFormSubmitter:
         """ทำความสะอาดข้อมูลยอดเงิน"""
         if not amount_str:
             return "0"
-        cleaned = re.sub(r'[^\d,.]', '', str(amount_str))
-        cleaned = cleaned.replace(',', '')
+        cleaned = amount_text(amount_str).replace(',', '')
         return cleaned if cleaned else "0"
 
     def submit_to_form(self, name, business_amount):
-        """ส่งข้อมูลไป Google Sheets (ไม่ใช่ form อีกต่อไป)"""
+        """
+        ส่งข้อมูลไป Google Sheets (ไม่ใช่ form อีกต่อไป)
+        คืนค่า SUBMIT_SENT, SUBMIT_SKIPPED (เคยส่งยอดนี้แล้ว) หรือ SUBMIT_FAILED
+        """
         try:
             # ทำความสะอาดข้อมูล
             clean_amount = self.clean_amount(business_amount)
@@ -206,7 +186,7 @@ class GoogleFormSubmitter:
             data_key = f"{name}_{clean_amount}"
             if data_key in self.sent_data:
                 print(f"ข้ามการส่ง: ข้อมูลของ {name} ยอด {clean_amount} เคยส่งไปแล้ว")
-                return False
+                return SUBMIT_SKIPPED
 
             print(f"📝 บันทึกข้อมูลใน Google Sheets: '{name}' = {clean_amount}")
 
@@ -218,20 +198,22 @@ class GoogleFormSubmitter:
                 self.sent_data[data_key] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 self.save_sent_data()
                 print("✅ บันทึกข้อมูลสำเร็จ")
-                return True
+                return SUBMIT_SENT
             else:
                 print("❌ ไม่สามารถบันทึกข้อมูลได้")
-                return False
+                return SUBMIT_FAILED
 
         except Exception as e:
             print(f"❌ เกิดข้อผิดพลาดในการส่งข้อมูล: {e}")
-            return False
+            return SUBMIT_FAILED
 
 
 class BNIDataMonitor:
     def __init__(self):
         self.form_submitter = GoogleFormSubmitter()
         self.last_data_file = "last_bni_data.json"
+        # คอลัมน์ Timestamp ใช้รูปแบบเดียวกันเกือบทุกแถว - parser จำรูปแบบที่แปลงสำเร็จไว้
+        self.timestamp_parser = TimestampParser()
         self.load_last_data()
 
     def setup_google_sheets(self):
@@ -265,24 +247,10 @@ class BNIDataMonitor:
             return None
 
         try:
-            formats = [
-                "%Y-%m-%d %H:%M:%S",
-                "%m/%d/%Y %H:%M:%S",
-                "%d/%m/%Y %H:%M:%S",
-                "%Y-%m-%dT%H:%M:%S",
-                "%Y-%m-%d",
-                "%m/%d/%Y",
-                "%d/%m/%Y",
-            ]
-
-            for fmt in formats:
-                try:
-                    return datetime.strptime(str(timestamp_str).strip(), fmt)
-                except ValueError:
-                    continue
-
-            print(f"⚠️  ไม่สามารถแปลง timestamp: {timestamp_str}")
-            return None
+            timestamp = self.timestamp_parser.parse(timestamp_str)
+            if timestamp is None:
+                print(f"⚠️  ไม่สามารถแปลง timestamp: {timestamp_str}")
+            return timestamp
 
         except Exception as e:
             print(f"⚠️  ข้อผิดพลาดในการแปลง timestamp {timestamp_str}: {e}")
@@ -303,44 +271,81 @@ class BNIDataMonitor:
 
         return is_recent
 
+    def get_handoff_data(self, rows):
+        """ข้อมูลใหม่ (ไม่เกิน 7 วัน) จาก handoff.json ของ scraper - รูปแบบเดียวกับ get_current_sheet_data"""
+        recent = recent_mask([row.get('timestamp') for row in rows], days_limit=7)
+        recent_data = {}
+        for row, is_recent in zip(rows, recent):
+            running_user = str(row.get('running_user', '')).strip()
+            tyfcb_received = display_amount(row.get('tyfcb_received'))
+            if not (running_user and tyfcb_received and is_recent):
+                continue
+            timestamp_str = row.get('timestamp_text', '')
+            recent_data[f"{running_user}_{timestamp_str}"] = {
+                'running_user': running_user,
+                'tyfcb_received': tyfcb_received,
+                'timestamp': timestamp_str,
+                'chapter': str(row.get('chapter', '')),
+                'total_amount': str(row.get('total_given_amount', '')),
+                'records_count': row.get('records_count', 0)
+            }
+
+        print(f"📦 ใช้ข้อมูลจาก scraper (handoff): {len(rows)} รายการ, ข้อมูลใหม่ (ไม่เกิน 7 วัน): {len(recent_data)} รายการ")
+        return recent_data
+
     def get_current_sheet_data(self):
-        """ดึงข้อมูลปัจจุบันจาก Google Sheets (เฉพาะข้อมูลที่อัปเดตมาไม่เกิน 7 วัน)"""
+        """ดึงข้อมูลปัจจุบันจาก Google Sheets (เฉพาะข้อมูลที่อัปเดตมาไม่เกิน 7 วัน) - None ถ้าอ่าน Sheet ไม่ได้"""
+        # ผลของ scraper รอบล่าสุดอยู่ในเครื่องแล้ว - อ่าน Sheet เมื่อไม่มี handoff หรือ handoff ไม่ครบทุกบัญชี
+        # (runner ของ --shard / --queue มีเฉพาะบัญชีของตัวเอง)
+        handoff_rows = read_handoff(expected_accounts=[account['username'] for account in load_roster()])
+        if handoff_rows is not None:
+            return self.get_handoff_data(handoff_rows)
+
         try:
             client = self.setup_google_sheets()
             if not client:
-                return {}
+                return None
 
             sheet_name = os.getenv('GOOGLE_SHEET_NAME', 'BNI TYFCB Data')
             spreadsheet = client.open(sheet_name)
             worksheet = spreadsheet.sheet1
 
-            # ดึงข้อมูลทั้งหมด
-            all_records = worksheet.get_all_records()
-            print(f"ดึงข้อมูลจาก Google Sheets: {len(all_records)} รายการทั้งหมด")
-
-            # กรองเฉพาะข้อมูลใหม่
+            # แท็บ TYFCB Latest มีหนึ่งแถวต่อ Running User - ถ้าไม่มีจึงอ่านทั้ง sheet แบบ stream (CSV export)
+            # แล้วกรองเฉพาะข้อมูลใหม่ทีละชุด - ตรวจคอลัมน์ Timestamp ของทั้งชุดในครั้งเดียว
+            source = read_latest_tab(spreadsheet)
+            if source is not None:
+                print(f"📇 อ่านจากแท็บ {LATEST_TAB}: {len(source)} Running User")
+            else:
+                source = open_sheet_records(client, worksheet)
+            now = datetime.now()
+            total_count = 0
             recent_data = {}
             old_data_count = 0
 
-            for record in all_records:
-                running_user = str(record.get('Running User', '')).strip()
-                tyfcb_received = str(record.get('TYFCB Received', '')).strip()
-                timestamp_str = str(record.get('Timestamp', '')).strip()
-
-                if running_user and tyfcb_received:
-                    if self.is_data_recent(timestamp_str, days_limit=7):
-                        data_key = f"{running_user}_{timestamp_str}"
-                        recent_data[data_key] = {
-                            'running_user': running_user,
-                            'tyfcb_received': tyfcb_received,
-                            'timestamp': timestamp_str,
-                            'chapter': str(record.get('Chapter', '')),
-                            'total_amount': str(record.get('Total Given Amount', '')),
-                            'records_count': record.get('Records Count', 0)
-                        }
-                    else:
-                        old_data_count += 1
-
+            for records in chunked(source):
+                total_count += len(records)
+                recent = recent_mask([record.get('Timestamp', '') for record in records], days_limit=7, now=now)
+
+                for record, is_recent in zip(records, recent):
+                    running_user = str(record.get('Running User', '')).strip()
+                    tyfcb_received = str(record.get('TYFCB Received', '')).strip()
+                    timestamp_str = str(record.get('Timestamp', '')).strip()
+
+                    if running_user and tyfcb_received:
+                        if is_recent:
+                            data_key = f"{running_user}_{timestamp_str}"
+                            recent_data[data_key] = {
+                                'running_user': running_user,
+                                'tyfcb_received': tyfcb_received,
+                                'timestamp': timestamp_str,
+                                'chapter': str(record.get('Chapter', '')),
+                                'total_amount': str(record.get('Total Given Amount', '')),
+                                'records_count': record.get('Records Count', 0)
+                            }
+                        else:
+                            old_data_count += 1
+
+            print(f"ดึงข้อมูลจาก Google Sheets: {total_count} รายการทั้งหมด")
             print(f"✅ ข้อมูลใหม่ (ไม่เกิน 7 วัน): {len(recent_data)} รายการ")
             print(f"⏰ ข้อมูลเก่า (เกิน 7 วัน): {old_data_count} รายการ")
 
@@ -348,10 +353,10 @@ class BNIDataMonitor:
 
         except Exception as e:
             print(f"ไม่สามารถดึงข้อมูลจาก Google Sheets: {e}")
-            return {}
+            return None
 
     def detect_new_data(self, force_check=False):
-        """ตรวจสอบข้อมูลใหม่และส่งไปยัง Google Form"""
+        """ตรวจสอบข้อมูลใหม่และส่งไปยัง Google Form - คืนค่า False ถ้าอ่านข้อมูลไม่ได้หรือส่งไม่ครบ"""
         print("=" * 50)
         print("เริ่มตรวจสอบข้อมูลใหม่...")
 
@@ -361,9 +366,12 @@ class BNIDataMonitor:
 
         # ดึงข้อมูลปัจจุบัน
         current_data = self.get_current_sheet_data()
+        if current_data is None:
+            print("❌ อ่านข้อมูลจาก Google Sheets ไม่ได้")
+            return False
         if not current_data:
             print("ไม่พบข้อมูลใหม่")
-            return
+            return True
 
         # เปรียบเทียบกับข้อมูลครั้งสุดท้าย
         new_entries = []
@@ -373,26 +381,31 @@ class BNIDataMonitor:
 
         if len(new_entries) == 0:
             print("ไม่พบข้อมูลใหม่ที่ต้องส่ง")
-            return
+            return True
 
         print(f"🔍 พบข้อมูลใหม่ที่ต้องส่ง: {len(new_entries)} รายการ")
 
         # ส่งข้อมูลไปยัง Google Sheets
-        success_count = 0
+        results = {SUBMIT_SENT: 0, SUBMIT_SKIPPED: 0, SUBMIT_FAILED: 0}
+        failed_keys = set()
         for data_key, data in new_entries:
             running_user = data['running_user']
             tyfcb_received = data['tyfcb_received']
             timestamp = data['timestamp']
 
             print(f"\n[ใหม่] {running_user}: {tyfcb_received} (Timestamp: {timestamp})")
-            if self.form_submitter.submit_to_form(running_user, tyfcb_received):
-                success_count += 1
+            result = self.form_submitter.submit_to_form(running_user, tyfcb_received)
+            results[result] += 1
+            if result == SUBMIT_FAILED:
+                failed_keys.add(data_key)
             time.sleep(2)
 
-        print(f"\n✅ บันทึกข้อมูลสำเร็จ: {success_count}/{len(new_entries)} รายการ")
+        print(f"\n✅ บันทึกข้อมูลสำเร็จ: {results[SUBMIT_SENT]}/{len(new_entries)} รายการ "
+              f"(ข้ามเพราะเคยส่งแล้ว {results[SUBMIT_SKIPPED]}, ล้มเหลว {results[SUBMIT_FAILED]})")
 
-        # บันทึกข้อมูลปัจจุบัน
-        self.save_last_data(current_data)
+        # บันทึกข้อมูลปัจจุบัน - ไม่รวมรายการที่ส่งไม่สำเร็จ เพื่อให้รอบถัดไปส่งใหม่
+        self.save_last_data({key: data for key, data in current_data.items() if key not in failed_keys})
+        return not failed_keys
 
 
 def main():
@@ -403,7 +416,7 @@ def main():
     force_check = os.getenv('FORCE_CHECK', 'false').lower() == 'true'
 
     monitor = BNIDataMonitor()
-    monitor.detect_new_data(force_check=force_check)
+    success = monitor.detect_new_data(force_check=force_check)
 
     print("=" * 60)
     print("การตรวจสอบเสร็จสิ้น")
@@ -413,6 +426,8 @@ def main():
         print("\nกด Enter เพื่อออกจากโปรแกรม...")
         input()
 
+    return success
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file
@@ -3,8 +3,8 @@
 
 import time
 import os
-import json
-import re
+import sys
+from collections import deque
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -13,25 +13,32 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
 
-# Google Sheets API imports
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GOOGLE_SHEETS_AVAILABLE = True
-except ImportError:
+from bni.browser import apply_low_memory_options
+from bni.diagnostics import get_diagnostics
+from bni.selector_cache import SelectorRegistry
+from bni.handoff import read_handoff
+from bni.latest_index import LATEST_TAB, read_latest_tab
+from bni.work_queue import load_roster
+from bni.parsing import amount_text, format_amount, parse_amount
+from bni.sheets_auth import authorize_sheets_client, sheets_available
+from bni.sheets_stream import open_sheet_records
+from bni.sheets_scheduler import schedule_sheets_client
+
+# Google Sheets API (gspread / google-auth ถูก import ตอนเชื่อมต่อจริง - ดู bni/sheets_auth.py)
+GOOGLE_SHEETS_AVAILABLE = sheets_available()
+if not GOOGLE_SHEETS_AVAILABLE:
     print("Google Sheets API ไม่พร้อมใช้งาน กรุณาติดตั้ง: pip install gspread google-auth")
-    GOOGLE_SHEETS_AVAILABLE = False
 
 class GoogleFormSeleniumAutomation:
     def __init__(self):
-        self.form_url = "https://docs.google.com/forms/d/e/1FAIpQLSfBkXWsGZXP3IXJ8gR2vZbyAi7VP3R2FSF6YB9ohkr94rIb8g/viewform"
+        self.form_url = os.getenv('GOOGLE_FORM_URL', "https://docs.google.com/forms/d/e/1FAIpQLSfBkXWsGZXP3IXJ8gR2vZbyAi7VP3R2FSF6YB9ohkr94rIb8g/viewform")
         self.prefill_name = "Maitri+Boonkijrungpaisan"  # URL encoded name
         self.sheet_id = "1MmuiQ2gRNbaA84YTXB2HvDR7MDIyW_buwELkkVm95Qs"  # Google Sheets ID
         self.sheet_name = "BNI TYFCB Data"
         self.driver = None
+        self.selector_registry = SelectorRegistry()
 
     def setup_google_sheets_client(self):
         """ตั้งค่าการเชื่อมต่อ Google Sheets API"""
@@ -40,35 +47,12 @@ class GoogleFormSeleniumAutomation:
             return None
 
         try:
-            # ลองใช้ environment variable ก่อน
-            credentials_json = os.getenv('GOOGLE_SHEETS_CREDENTIALS')
-            if credentials_json:
-                credentials_info = json.loads(credentials_json)
-                scope = [
-                    "https://spreadsheets.google.com/feeds",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-                credentials = Credentials.from_service_account_info(credentials_info, scopes=scope)
-                service_email = credentials_info.get('client_email', 'ไม่พบ email')
-            else:
-                # ใช้ไฟล์ local
-                credentials_file = "google-sheets-credentials.json"
-                if not os.path.exists(credentials_file):
-                    print(f"ไม่พบไฟล์ {credentials_file}")
-                    return None
-
-                scope = [
-                    "https://spreadsheets.google.com/feeds",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-                credentials = Credentials.from_service_account_file(credentials_file, scopes=scope)
-
-                # อ่าน service email จากไฟล์
-                with open(credentials_file, 'r') as f:
-                    creds_data = json.load(f)
-                    service_email = creds_data.get('client_email', 'ไม่พบ email')
-
-            client = gspread.authorize(credentials)
+            # ลองใช้ environment variable ก่อน ถ้าไม่มีให้ใช้ไฟล์ local
+            client, service_email = authorize_sheets_client()
+            if not client:
+                return None
+
+            schedule_sheets_client(client)
             print(f"✅ เชื่อมต่อ Google Sheets สำเร็จ")
             print(f"📧 Service Account: {service_email}")
             return client
@@ -77,8 +61,37 @@ class GoogleFormSeleniumAutomation:
             print(f"ไม่สามารถเชื่อมต่อ Google Sheets: {str(e)}")
             return None
 
+    def format_tyfcb_received(self, tyfcb_received):
+        """ตัวเลขจาก Sheets หรือ string ที่ทำความสะอาดแล้วเป็นตัวเลข -> จัดรูปแบบพร้อมจุลภาค"""
+        numeric_value = parse_amount(tyfcb_received)
+        if numeric_value is not None:
+            return format_amount(numeric_value)
+        cleaned = amount_text(tyfcb_received)
+        return cleaned if cleaned else str(tyfcb_received).strip()
+
+    def get_handoff_tyfcb_received(self):
+        """TYFCB Received ล่าสุดจาก handoff.json ของ scraper (None ถ้าต้องอ่านจาก Google Sheets)"""
+        rows = read_handoff(expected_accounts=[account['username'] for account in load_roster()])
+        if not rows:
+            return None
+
+        for row in rows:
+            value = row.get('tyfcb_received')
+            if value not in (None, '') and str(value).strip() != '':
+                tyfcb_received_str = self.format_tyfcb_received(value)
+                print(f"📦 ใช้ข้อมูลจาก scraper (handoff) ของ {row.get('running_user') or 'ผู้ใช้'} "
+                      f"({row.get('timestamp_text')}): {tyfcb_received_str}")
+                return tyfcb_received_str
+
+        print("ℹ️  handoff ไม่มี TYFCB Received - อ่านจาก Google Sheets แทน")
+        return None
+
     def get_latest_tyfcb_received(self):
-        """ดึงข้อมูล TYFCB Received ล่าสุดจาก Google Sheets"""
+        """ดึงข้อมูล TYFCB Received ล่าสุด (จาก handoff ของ scraper หรือ Google Sheets)"""
+        tyfcb_received_str = self.get_handoff_tyfcb_received()
+        if tyfcb_received_str:
+            return tyfcb_received_str
+
         try:
             client = self.setup_google_sheets_client()
             if not client:
@@ -89,35 +102,36 @@ class GoogleFormSeleniumAutomation:
             spreadsheet = client.open_by_key(self.sheet_id)
             worksheet = spreadsheet.sheet1
 
-            # ดึงข้อมูลทั้งหมด
-            all_records = worksheet.get_all_records()
-            print(f"📊 ดึงข้อมูลจาก Google Sheets: {len(all_records)} รายการ")
-
-            if not all_records:
-                print("ไม่พบข้อมูลใน Google Sheets")
-                return None
-
-            # แสดงข้อมูล headers เพื่อ debug
-            headers = list(all_records[0].keys()) if all_records else []
-            print(f"🔍 Headers ที่พบ: {headers}")
-
-            # ค้นหา TYFCB Received ที่ไม่ว่าง โดยเริ่มจากแถวล่าสุด
+            # ลองหา column ที่มีคำว่า TYFCB หรือ Received
+            possible_columns = [
+                'TYFCB Received',
+                'TYFCB received',
+                'tyfcb received',
+                'TYFCB_Received',
+                'Received',
+                'ยอดธุรกิจ Lifetime'  # กรณีที่เป็นภาษาไทย
+            ]
+
+            # แท็บ TYFCB Latest มีหนึ่งแถวต่อ Running User (เรียงจากเก่าไปใหม่) - ถ้าไม่มีจึงอ่านทั้ง sheet
+            # แบบ stream ทีละแถว (CSV export) จำเฉพาะแถวล่าสุดที่ TYFCB Received ไม่ว่าง
+            # และ 3 แถวสุดท้ายไว้แสดงเมื่อไม่พบข้อมูล แทนการเก็บทั้ง sheet ในหน่วยความจำ
+            source = read_latest_tab(spreadsheet)
+            if source is not None:
+                print(f"📇 อ่านจากแท็บ {LATEST_TAB}: {len(source)} Running User")
+            else:
+                source = open_sheet_records(client, worksheet)
             tyfcb_received = None
             valid_record = None
+            found = None
+            headers = None
+            last_records = deque(maxlen=3)
+            total_count = 0
 
-            # วนลูปจากแถวสุดท้ายไปแถวแรก
-            for i in range(len(all_records) - 1, -1, -1):
-                record = all_records[i]
-
-                # ลองหา column ที่มีคำว่า TYFCB หรือ Received
-                possible_columns = [
-                    'TYFCB Received',
-                    'TYFCB received',
-                    'tyfcb received',
-                    'TYFCB_Received',
-                    'Received',
-                    'ยอดธุรกิจ Lifetime'  # กรณีที่เป็นภาษาไทย
-                ]
+            for row_number, record in enumerate(source, start=2):
+                total_count += 1
+                if headers is None:
+                    headers = list(record.keys())
+                last_records.append(record)
 
                 for col in possible_columns:
                     if col in record:
@@ -125,34 +139,31 @@ class GoogleFormSeleniumAutomation:
                         if value and str(value).strip() != '':
                             tyfcb_received = value
                             valid_record = record
-                            print(f"🎯 พบข้อมูลใน column '{col}' ที่แถว {i+2}: {value}")
+                            found = (col, record.get('Row') or row_number)
                             break
 
-                if tyfcb_received:
-                    break
+            print(f"📊 ดึงข้อมูลจาก Google Sheets: {total_count} รายการ")
+
+            if not total_count:
+                print("ไม่พบข้อมูลใน Google Sheets")
+                return None
+
+            # แสดงข้อมูล headers เพื่อ debug
+            print(f"🔍 Headers ที่พบ: {headers}")
 
             if not tyfcb_received:
                 print("❌ ไม่พบข้อมูล TYFCB Received ที่ไม่ว่าง")
                 # แสดงตัวอย่างข้อมูลจากแถวสุดท้าย 3 แถว
                 print("📋 ตัวอย่างข้อมูลจากแถวสุดท้าย 3 แถว:")
-                for i, record in enumerate(all_records[-3:]):
-                    print(f"   แถว {len(all_records)-2+i}: {record}")
+                for i, record in enumerate(last_records):
+                    print(f"   แถว {total_count-len(last_records)+2+i}: {record}")
                 return None
 
+            col, row_number = found
+            print(f"🎯 พบข้อมูลใน column '{col}' ที่แถว {row_number}: {tyfcb_received}")
+
             # แปลงข้อมูลให้เป็นรูปแบบที่เหมาะสม
-            if isinstance(tyfcb_received, (int, float)):
-                tyfcb_received_str = f"{tyfcb_received:,.0f}"
-            else:
-                # ถ้าเป็น string ให้ทำความสะอาดและเช็คว่าเป็นตัวเลขไหม
-                cleaned = re.sub(r'[^\d,.]', '', str(tyfcb_received))
-                if cleaned and cleaned.replace(',', '').replace('.', '').isdigit():
-                    try:
-                        numeric_value = float(cleaned.replace(',', ''))
-                        tyfcb_received_str = f"{numeric_value:,.0f}"
-                    except:
-                        tyfcb_received_str = cleaned
-                else:
-                    tyfcb_received_str = str(tyfcb_received).strip()
+            tyfcb_received_str = self.format_tyfcb_received(tyfcb_received)
 
             print(f"💰 TYFCB Received ที่พบ: {tyfcb_received_str}")
 
@@ -184,10 +195,12 @@ class GoogleFormSeleniumAutomation:
         chrome_options.add_argument("--disable-notifications")
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        apply_low_memory_options(chrome_options)
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
 
         try:
+            from webdriver_manager.chrome import ChromeDriverManager
             service = Service(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=chrome_options)
             return driver
@@ -197,6 +210,8 @@ class GoogleFormSeleniumAutomation:
 
     def fill_and_submit_form(self, tyfcb_amount):
         """เปิด Google Form, กรอกข้อมูล และ submit"""
+        submitted = False
+        diagnostics = get_diagnostics()
         try:
             print("🚀 เริ่มต้นการกรอก Google Form...")
 
@@ -214,49 +229,29 @@ class GoogleFormSeleniumAutomation:
             # รอให้หน้าเว็บโหลดเสร็จ
             time.sleep(3)
 
-            # บันทึกภาพหน้าจอหน้าแรกเพื่อตรวจสอบ
-            if not os.getenv('GITHUB_ACTIONS'):
-                self.driver.save_screenshot("form_page1.png")
-                print("📸 บันทึกภาพหน้าจอหน้าแรกไว้ที่ form_page1.png")
+            diagnostics.step("form_page1")
 
-            # หาและคลิกปุ่ม Next เพื่อไปหน้าถัดไป
+            # หาและคลิกปุ่ม Next เพื่อไปหน้าถัดไป (ลองวิธีที่สำเร็จล่าสุดก่อน)
             print("🔍 กำลังหาปุ่ม Next...")
-            try:
-                # วิธีที่ 1: หาด้วย jsname="OCpkoe" (จาก HTML ที่ให้มา)
-                next_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div[jsname='OCpkoe']"))
-                )
-                print("✅ พบปุ่ม Next (วิธีที่ 1: jsname)")
-
-            except TimeoutException:
-                try:
-                    # วิธีที่ 2: หาด้วย class และข้อความ "Next"
-                    next_button = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//div[@role='button']//span[contains(text(), 'Next')]"))
-                    )
-                    print("✅ พบปุ่ม Next (วิธีที่ 2: XPath)")
-
-                except TimeoutException:
-                    try:
-                        # วิธีที่ 3: หาด้วย class combinations
-                        next_button = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, "div.uArJ5e.UQuaGc.YhQJj.zo8FOc.ctEux"))
-                        )
-                        print("✅ พบปุ่ม Next (วิธีที่ 3: CSS classes)")
-
-                    except TimeoutException:
-                        # วิธีที่ 4: หาทุกปุ่มและเลือกที่มีข้อความ Next
-                        all_buttons = self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
-                        next_button = None
-                        for button in all_buttons:
-                            if 'Next' in button.text or 'ต่อไป' in button.text:
-                                next_button = button
-                                print("✅ พบปุ่ม Next (วิธีที่ 4: ค้นหาทั่วไป)")
-                                break
-
-                        if not next_button:
-                            print("❌ ไม่พบปุ่ม Next")
-                            return False
+            label, next_button = self.selector_registry.find("form.next_button", [
+                # วิธีที่ 1: หาด้วย jsname="OCpkoe"
+                ("jsname", lambda: WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div[jsname='OCpkoe']")))),
+                # วิธีที่ 2: หาด้วย class และข้อความ "Next"
+                ("XPath", lambda: WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((By.XPATH, "//div[@role='button']//span[contains(text(), 'Next')]")))),
+                # วิธีที่ 3: หาด้วย class combinations
+                ("CSS classes", lambda: WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "div.uArJ5e.UQuaGc.YhQJj.zo8FOc.ctEux")))),
+                # วิธีที่ 4: หาทุกปุ่มและเลือกที่มีข้อความ Next
+                ("ค้นหาทั่วไป", lambda: next((button for button in self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
+                                              if 'Next' in button.text or 'ต่อไป' in button.text), None)),
+            ])
+
+            if not next_button:
+                print("❌ ไม่พบปุ่ม Next")
+                return False
+            print(f"✅ พบปุ่ม Next ({label})")
 
             # คลิกปุ่ม Next
             if next_button:
@@ -268,10 +263,7 @@ class GoogleFormSeleniumAutomation:
                     # รอให้หน้าถัดไปโหลด
                     time.sleep(3)
 
-                    # บันทึกภาพหน้าจอหน้าที่ 2
-                    if not os.getenv('GITHUB_ACTIONS'):
-                        self.driver.save_screenshot("form_page2.png")
-                        print("📸 บันทึกภาพหน้าจอหน้าที่ 2 ไว้ที่ form_page2.png")
+                    diagnostics.step("form_page2")
 
                 except Exception as e:
                     print(f"❌ ไม่สามารถคลิกปุ่ม Next: {e}")
@@ -315,28 +307,20 @@ class GoogleFormSeleniumAutomation:
 
             # หาปุ่ม Submit
             print("🔍 กำลังหาปุ่ม Submit...")
-            try:
+            label, submit_button = self.selector_registry.find("form.submit_button", [
                 # วิธีที่ 1: หาปุ่มที่มีข้อความ Submit หรือ ส่ง
-                submit_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Submit') or contains(text(), 'ส่ง') or contains(text(), 'ยืนยัน')]/ancestor::div[@role='button']"))
-                )
-
-            except TimeoutException:
-                # วิธีที่ 2: หาปุ่มด้วย role="button"
+                ("ข้อความ Submit", lambda: WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Submit') or contains(text(), 'ส่ง') or contains(text(), 'ยืนยัน')]/ancestor::div[@role='button']")))),
+                # วิธีที่ 2: หาปุ่มด้วย role="button" แล้วตรวจข้อความ
+                ("role=button", lambda: next((button for button in self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
+                                              if any(word in button.text.lower() for word in ['submit', 'ส่ง', 'ยืนยัน', 'send'])), None)),
+            ])
+
+            if not submit_button:
+                # ใช้ปุ่มสุดท้าย (มักจะเป็นปุ่ม Submit) - ไม่นับเป็นวิธีที่เรียนรู้
                 try:
                     submit_buttons = self.driver.find_elements(By.CSS_SELECTOR, "div[role='button']")
-                    submit_button = None
-
-                    for button in submit_buttons:
-                        button_text = button.text.lower()
-                        if any(word in button_text for word in ['submit', 'ส่ง', 'ยืนยัน', 'send']):
-                            submit_button = button
-                            break
-
-                    if not submit_button and submit_buttons:
-                        # ใช้ปุ่มสุดท้าย (มักจะเป็นปุ่ม Submit)
-                        submit_button = submit_buttons[-1]
-
+                    submit_button = submit_buttons[-1] if submit_buttons else None
                 except Exception as e:
                     print(f"❌ ไม่สามารถหาปุ่ม Submit: {e}")
                     return False
@@ -357,10 +341,12 @@ class GoogleFormSeleniumAutomation:
                     current_url = self.driver.current_url
                     if "formResponse" in current_url or "thanks" in current_url.lower():
                         print("🎉 Submit form สำเร็จ!")
+                        submitted = True
                         return True
                     else:
                         print("⚠️  ไม่แน่ใจว่า submit สำเร็จหรือไม่")
                         print(f"URL ปัจจุบัน: {current_url}")
+                        submitted = True
                         return True
 
                 except Exception as e:
@@ -377,13 +363,9 @@ class GoogleFormSeleniumAutomation:
         finally:
             # ปิด WebDriver
             if self.driver:
-                if not os.getenv('GITHUB_ACTIONS'):
-                    # บันทึกภาพหน้าจอสุดท้าย
-                    try:
-                        self.driver.save_screenshot("form_final.png")
-                        print("📸 บันทึกภาพหน้าจอสุดท้ายไว้ที่ form_final.png")
-                    except:
-                        pass
+                # ภาพหน้าจอและ HTML บันทึกเฉพาะเมื่อ submit ไม่สำเร็จ (ดู bni/diagnostics.py)
+                if not submitted:
+                    diagnostics.capture(self.driver, "form_submit")
 
                 print("🔒 ปิด WebDriver")
                 self.driver.quit()
@@ -393,8 +375,8 @@ class GoogleFormSeleniumAutomation:
         print("🤖 เริ่มต้นโปรแกรม Google Form Automation")
         print("=" * 60)
 
-        # ดึงข้อมูล TYFCB Received จาก Google Sheets
-        print("📊 ดึงข้อมูล TYFCB Received จาก Google Sheets...")
+        # ดึงข้อมูล TYFCB Received (handoff ของ scraper หรือ Google Sheets)
+        print("📊 ดึงข้อมูล TYFCB Received (handoff ของ scraper หรือ Google Sheets)...")
         tyfcb_amount = self.get_latest_tyfcb_received()
 
         if not tyfcb_amount:
@@ -433,4 +415,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file